@@ -0,0 +1,454 @@
+"""
+Request instrumentation for the /api/v1 endpoints.
+
+ApiInstrumentationMiddleware wraps every database call made while serving
+an API request, so each view reports:
+
+- requests, status codes and a latency histogram
+- SQL queries per request, DB time and the remaining Python time
+- slow requests (sampled), with the repeated SQL and the code location
+  that first issued each statement, which makes N+1 patterns obvious
+
+Aggregates are kept per process in ``metrics`` and published to the shared
+Django cache at most every API_METRICS_PUBLISH_SECONDS, so whichever worker
+answers a scrape, ``metrics_view`` renders the sum over all live processes
+in Prometheus text format, together with cache hit rates. A process that
+stops publishing drops out after API_METRICS_PROCESS_TTL. When
+API_DEBUG_HEADERS is enabled the per-request numbers are also returned as
+response headers.
+"""
+
+import copy
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Paths under the API prefix that are not instrumented.
+EXCLUDED_VIEWS = frozenset({'api_metrics', 'api_metrics_slow', 'health_check'})
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class _Histogram:
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class ViewStats:
+    """Aggregated measurements for one view."""
+
+    __slots__ = ('responses', 'queries', 'db_seconds', 'python_seconds', 'latency', 'query_counts')
+
+    def __init__(self):
+        self.responses: Dict[tuple, int] = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.python_seconds = 0.0
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.query_counts = _Histogram(QUERY_BUCKETS)
+
+    def merge(self, other: 'ViewStats') -> None:
+        for key, count in other.responses.items():
+            self.responses[key] = self.responses.get(key, 0) + count
+        self.queries += other.queries
+        self.db_seconds += other.db_seconds
+        self.python_seconds += other.python_seconds
+        for mine, theirs in ((self.latency, other.latency), (self.query_counts, other.query_counts)):
+            mine.counts = [a + b for a, b in zip(mine.counts, theirs.counts)]
+            mine.total += theirs.total
+            mine.count += theirs.count
+
+
+class QueryTracker:
+    """
+    Database execute wrapper counting queries and time for one request.
+
+    The first time each distinct SQL statement runs, the calling frames
+    outside Django and third-party packages are captured; Django SQL keeps
+    parameters as placeholders, so repeated statements (N+1) collapse into
+    one entry with a count.
+    """
+
+    def __init__(self, capture_stacks: bool):
+        self.capture_stacks = capture_stacks
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, dict] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            entry = self.statements.get(sql)
+            if entry is None:
+                entry = self.statements[sql] = {
+                    'count': 0,
+                    'seconds': 0.0,
+                    'stack': self._stack() if self.capture_stacks else [],
+                }
+            entry['count'] += 1
+            entry['seconds'] += elapsed
+
+    @staticmethod
+    def _stack() -> List[str]:
+        frames = traceback.extract_stack()[:-2]
+        return [
+            f"{f.filename}:{f.lineno} in {f.name}"
+            for f in frames
+            if 'site-packages' not in f.filename and '/django/' not in f.filename
+        ][-8:]
+
+    def top_statements(self, limit: int = 5) -> List[dict]:
+        ranked = sorted(
+            self.statements.items(),
+            key=lambda item: (item[1]['count'], item[1]['seconds']),
+            reverse=True,
+        )
+        return [
+            {
+                'sql': sql[:500],
+                'count': entry['count'],
+                'ms': round(entry['seconds'] * 1000, 3),
+                'stack': entry['stack'],
+            }
+            for sql, entry in ranked[:limit]
+        ]
+
+
+class MetricsRegistry:
+    """
+    Process-wide API metrics. Use the module-level ``metrics`` instance.
+
+    ``views`` and ``slow_requests`` hold this process's numbers only;
+    ``collect`` and ``render_prometheus`` combine every process that has
+    published to the shared cache.
+    """
+
+    cache_prefix = 'api:metrics'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views: Dict[str, ViewStats] = {}
+        self.slow_requests: deque = deque(maxlen=_setting('API_SLOW_REQUEST_SAMPLES', 50))
+        self.process_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._published = 0.0
+
+    @property
+    def _processes_key(self) -> str:
+        return f"{self.cache_prefix}:processes"
+
+    def _process_key(self, process_id: str) -> str:
+        return f"{self.cache_prefix}:process:{process_id}"
+
+    def record(self, view: str, method: str, status: int, total: float, tracker: QueryTracker) -> None:
+        python_seconds = max(total - tracker.seconds, 0.0)
+        with self._lock:
+            stats = self.views.get(view)
+            if stats is None:
+                stats = self.views[view] = ViewStats()
+            key = (method, status)
+            stats.responses[key] = stats.responses.get(key, 0) + 1
+            stats.queries += tracker.count
+            stats.db_seconds += tracker.seconds
+            stats.python_seconds += python_seconds
+            stats.latency.observe(total)
+            stats.query_counts.observe(tracker.count)
+        self.publish()
+
+    def add_slow_request(self, sample: dict) -> None:
+        with self._lock:
+            self.slow_requests.append(sample)
+        self.publish(force=True)
+
+    def publish(self, force: bool = False) -> None:
+        """
+        Write this process's aggregates to the shared cache, at most every
+        API_METRICS_PUBLISH_SECONDS unless ``force``.
+        """
+        now = time.monotonic()
+        if not force and now - self._published < _setting('API_METRICS_PUBLISH_SECONDS', 10):
+            return
+        self._published = now
+        with self._lock:
+            state = {
+                'views': copy.deepcopy(self.views),
+                'slow_requests': list(self.slow_requests),
+            }
+        state['caches'] = _cache_stats()
+        cache.set(
+            self._process_key(self.process_id), state,
+            timeout=_setting('API_METRICS_PROCESS_TTL', 3600),
+        )
+        processes = cache.get(self._processes_key) or set()
+        if self.process_id not in processes:
+            cache.set(self._processes_key, processes | {self.process_id}, timeout=None)
+
+    def collect(self) -> dict:
+        """
+        Views, slow request samples and cache statistics combined over
+        every live process.
+        """
+        self.publish(force=True)
+        processes = cache.get(self._processes_key) or set()
+        states = cache.get_many([self._process_key(p) for p in processes])
+        live = {p for p in processes if self._process_key(p) in states}
+        if live != processes:
+            cache.set(self._processes_key, live, timeout=None)
+
+        views: Dict[str, ViewStats] = {}
+        slow: List[dict] = []
+        caches: Dict[str, dict] = {}
+        for state in states.values():
+            for view, stats in state['views'].items():
+                views.setdefault(view, ViewStats()).merge(stats)
+            slow.extend(state['slow_requests'])
+            for name, stats in state['caches'].items():
+                total = caches.setdefault(name, {'hits': 0, 'misses': 0, 'entries': 0})
+                for key in total:
+                    total[key] += stats[key]
+        for total in caches.values():
+            lookups = total['hits'] + total['misses']
+            total['hit_rate'] = round(total['hits'] / lookups, 4) if lookups else 0.0
+        slow.sort(key=lambda sample: sample['timestamp'], reverse=True)
+        return {
+            'views': views,
+            'slow_requests': slow[:self.slow_requests.maxlen],
+            'caches': caches,
+        }
+
+    def recent_slow_requests(self) -> List[dict]:
+        """Sampled slow requests across all processes, newest first."""
+        return self.collect()['slow_requests']
+
+    def reset(self) -> None:
+        with self._lock:
+            self.views.clear()
+            self.slow_requests.clear()
+        processes = cache.get(self._processes_key) or set()
+        cache.delete_many([self._process_key(p) for p in processes] + [self._processes_key])
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        collected = self.collect()
+        views = sorted(collected['views'].items())
+
+        header('api_requests_total', 'counter', 'API responses by view, method and status.')
+        for view, stats in views:
+            for (method, status), count in sorted(stats.responses.items()):
+                lines.append(
+                    f'api_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}'
+                )
+
+        header('api_request_duration_seconds', 'histogram', 'API request latency.')
+        for view, stats in views:
+            _render_histogram(lines, 'api_request_duration_seconds', view, stats.latency)
+
+        header('api_request_queries', 'histogram', 'SQL queries issued per API request.')
+        for view, stats in views:
+            _render_histogram(lines, 'api_request_queries', view, stats.query_counts)
+
+        for name, attr, help_text in (
+            ('api_db_queries_total', 'queries', 'SQL queries issued by API views.'),
+            ('api_db_seconds_total', 'db_seconds', 'Time spent in SQL by API views.'),
+            ('api_python_seconds_total', 'python_seconds', 'Time spent outside SQL by API views.'),
+        ):
+            header(name, 'counter', help_text)
+            for view, stats in views:
+                lines.append(f'{name}{{view="{view}"}} {_number(getattr(stats, attr))}')
+
+        cache_stats = sorted(collected['caches'].items())
+        for name, key, kind, help_text in (
+            ('api_cache_hits_total', 'hits', 'counter', 'Cache lookups answered from cache.'),
+            ('api_cache_misses_total', 'misses', 'counter', 'Cache lookups that had to compute.'),
+            ('api_cache_hit_ratio', 'hit_rate', 'gauge', 'Hits divided by lookups.'),
+            ('api_cache_entries', 'entries', 'gauge', 'Entries held in the local cache tiers.'),
+        ):
+            header(name, kind, help_text)
+            for cache_name, stats in cache_stats:
+                lines.append(f'{name}{{cache="{cache_name}"}} {_number(stats[key])}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _render_histogram(lines: List[str], name: str, view: str, histogram: _Histogram) -> None:
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{view="{view}"}} {_number(histogram.total)}')
+    lines.append(f'{name}_count{{view="{view}"}} {histogram.count}')
+
+
+def _number(value: float) -> str:
+    return f"{value:.6f}".rstrip('0').rstrip('.') if isinstance(value, float) else str(value)
+
+
+def _cache_stats() -> Dict[str, dict]:
+    from pricing.services.quote_cache import quote_cache
+
+    return {'pricing_quotes': quote_cache.stats()}
+
+
+metrics = MetricsRegistry()
+
+
+class ApiInstrumentationMiddleware:
+    """
+    Measure queries and time for requests under API_INSTRUMENTATION_PREFIX.
+
+    Install after SecurityMiddleware so the measured time covers the rest of
+    the middleware stack as well as the view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _setting('API_INSTRUMENTATION_ENABLED', True) or not request.path.startswith(
+            _setting('API_INSTRUMENTATION_PREFIX', '/api/v1/')
+        ):
+            return self.get_response(request)
+
+        tracker = QueryTracker(_setting('API_CAPTURE_QUERY_STACKS', False))
+        started = time.perf_counter()
+        with _wrap_connections(tracker):
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        if view in EXCLUDED_VIEWS:
+            return response
+
+        metrics.record(view, request.method, response.status_code, total, tracker)
+        self._maybe_sample_slow(request, response, view, total, tracker)
+
+        if _setting('API_DEBUG_HEADERS', False):
+            db_ms = tracker.seconds * 1000
+            total_ms = total * 1000
+            response['X-Query-Count'] = str(tracker.count)
+            response['X-DB-Time-Ms'] = f"{db_ms:.2f}"
+            response['X-Python-Time-Ms'] = f"{max(total_ms - db_ms, 0.0):.2f}"
+            response['X-Response-Time-Ms'] = f"{total_ms:.2f}"
+            response['Server-Timing'] = (
+                f"db;dur={db_ms:.2f}, app;dur={max(total_ms - db_ms, 0.0):.2f}"
+            )
+        return response
+
+    @staticmethod
+    def _maybe_sample_slow(request, response, view, total, tracker) -> None:
+        threshold = _setting('API_SLOW_REQUEST_MS', 500) / 1000
+        if total < threshold or random.random() >= _setting('API_SLOW_REQUEST_SAMPLE_RATE', 1.0):
+            return
+        sample = {
+            'timestamp': time.time(),
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'db_ms': round(tracker.seconds * 1000, 3),
+            'queries': tracker.count,
+            'statements': tracker.top_statements(),
+        }
+        metrics.add_slow_request(sample)
+        logger.warning(
+            "Slow API request %s %s: %.1fms, %d queries",
+            request.method, request.path, sample['total_ms'], tracker.count,
+        )
+
+
+class _wrap_connections:
+    """Install one execute wrapper on every configured database connection."""
+
+    def __init__(self, tracker: QueryTracker):
+        self.tracker = tracker
+        self._contexts = []
+
+    def __enter__(self):
+        for alias in connections:
+            context = connections[alias].execute_wrapper(self.tracker)
+            context.__enter__()
+            self._contexts.append(context)
+        return self.tracker
+
+    def __exit__(self, *exc_info):
+        while self._contexts:
+            self._contexts.pop().__exit__(*exc_info)
+        return False
+
+
+def _authorized(request) -> bool:
+    """
+    Bearer API_METRICS_TOKEN when one is configured; otherwise only staff
+    users (or anyone under DEBUG), since slow samples include SQL and
+    source paths.
+    """
+    token = _setting('API_METRICS_TOKEN', '')
+    if token:
+        return request.headers.get('Authorization', '') == f"Bearer {token}"
+    if settings.DEBUG:
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_active and user.is_staff)
+
+
+def metrics_view(request):
+    """
+    GET /api/v1/metrics
+    Prometheus text exposition of the API metrics of every worker process.
+    """
+    if not _authorized(request):
+        return HttpResponse(status=403)
+    return HttpResponse(
+        metrics.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def slow_requests_view(request):
+    """
+    GET /api/v1/metrics/slow
+    Recently sampled slow requests with their most repeated SQL.
+    """
+    if not _authorized(request):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    return JsonResponse({'slow_requests': metrics.recent_slow_requests()})
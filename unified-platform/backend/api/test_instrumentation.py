@@ -0,0 +1,96 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.instrumentation import MetricsRegistry, QueryTracker, metrics
+from loans import choices
+from loans.models import Lender
+from loans.tests.test_eligibility import create_program
+
+QUALIFY_REQUEST = {
+    "loan_amount": 200000,
+    "property_value": 300000,
+    "loan_purpose": choices.LOAN_PURPOSE_PURCHASE,
+    "property_type": choices.PROPERTY_TYPE_RESIDENTIAL,
+    "property_state": "CA",
+    "occupancy": choices.OCCUPANCY_OWNER_OCCUPIED,
+    "credit_score": 700
+}
+
+
+class ApiInstrumentationTests(APITestCase):
+    def setUp(self):
+        metrics.reset()
+        create_program(Lender.objects.create(company_name="Metrics Lender", include_states=["CA"]))
+
+    @override_settings(API_DEBUG_HEADERS=True)
+    def test_debug_headers_report_queries_and_timing(self):
+        response = self.client.post(reverse('qualify'), QUALIFY_REQUEST, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertIn('X-Python-Time-Ms', response)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    def test_headers_hidden_by_default(self):
+        response = self.client.post(reverse('qualify'), QUALIFY_REQUEST, format='json')
+        self.assertNotIn('X-Query-Count', response)
+
+    @override_settings(API_METRICS_TOKEN='secret')
+    def test_metrics_endpoint_exposes_per_view_counters(self):
+        self.client.post(reverse('qualify'), QUALIFY_REQUEST, format='json')
+        self.client.post(reverse('qualify'), QUALIFY_REQUEST, format='json')
+
+        response = self.client.get(reverse('api_metrics'), HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('api_requests_total{view="qualify",method="POST",status="200"} 2', body)
+        self.assertIn('api_request_duration_seconds_count{view="qualify"} 2', body)
+        self.assertIn('api_db_queries_total{view="qualify"}', body)
+        self.assertIn('api_cache_hit_ratio{cache="pricing_quotes"}', body)
+        self.assertNotIn('view="api_metrics"', body)
+
+    @override_settings(API_SLOW_REQUEST_MS=0, API_CAPTURE_QUERY_STACKS=True)
+    def test_slow_requests_sampled_with_statements(self):
+        self.client.post(reverse('qualify'), QUALIFY_REQUEST, format='json')
+
+        self.client.force_login(User.objects.create_user('ops', is_staff=True))
+        response = self.client.get(reverse('api_metrics_slow'))
+
+        sample = response.json()['slow_requests'][0]
+        self.assertEqual(sample['view'], 'qualify')
+        self.assertGreater(sample['queries'], 0)
+        self.assertTrue(sample['statements'][0]['sql'])
+        self.assertTrue(sample['statements'][0]['stack'])
+
+    @override_settings(API_METRICS_TOKEN='secret')
+    def test_metrics_token_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('api_metrics')).status_code, 403)
+        response = self.client.get(reverse('api_metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_denied_without_token_for_anonymous_and_non_staff(self):
+        for url in (reverse('api_metrics'), reverse('api_metrics_slow')):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(User.objects.create_user('member'))
+        self.assertEqual(self.client.get(reverse('api_metrics')).status_code, 403)
+
+    @override_settings(API_METRICS_TOKEN='secret')
+    def test_scrape_sums_every_published_process(self):
+        self.client.post(reverse('qualify'), QUALIFY_REQUEST, format='json')
+        other = MetricsRegistry()
+        other.process_id = 'other-worker:1'
+        other.record('qualify', 'POST', 200, 0.01, QueryTracker(capture_stacks=False))
+        other.publish(force=True)
+
+        response = self.client.get(reverse('api_metrics'), HTTP_AUTHORIZATION='Bearer secret')
+
+        body = response.content.decode()
+        self.assertIn('api_requests_total{view="qualify",method="POST",status="200"} 2', body)
+        self.assertIn('api_request_duration_seconds_count{view="qualify"} 2', body)
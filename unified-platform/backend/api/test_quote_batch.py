@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from pricing.models import Lender, LenderProgramOffering, ProgramType
+
+
+class BatchQuoteViewTests(APITestCase):
+    def setUp(self):
+        lender = Lender.objects.create(
+            company_name="Batch Lender",
+            include_states=["CA"]
+        )
+        program_type = ProgramType.objects.create(
+            name="Batch DSCR",
+            category="non_qm",
+            property_types=["residential"],
+            entity_types=["individual"],
+            purposes=["purchase"],
+            occupancy=["investment"]
+        )
+        LenderProgramOffering.objects.create(
+            lender=lender,
+            program_type=program_type,
+            min_rate=7.25,
+            max_rate=9.0,
+            min_fico=680,
+            max_ltv=75.0,
+            min_loan=Decimal("100000.00"),
+            max_loan=Decimal("2000000.00"),
+        )
+        self.scenario = {
+            "property_state": "CA",
+            "loan_amount": 300000,
+            "property_value": 500000,
+            "credit_score": 700,
+            "occupancy": "investment",
+        }
+
+    def test_batch_quote_prices_each_scenario(self):
+        scenarios = [
+            self.scenario,
+            dict(self.scenario, credit_score=650),
+            {"property_state": "CA"},
+        ]
+
+        response = self.client.post(
+            reverse('quote_batch'), {"scenarios": scenarios}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(response.data['scenarios_priced'], 2)
+        self.assertEqual(results[0]['matches_found'], 1)
+        self.assertEqual(results[0]['quotes'][0]['lender'], "Batch Lender")
+        self.assertEqual(results[0]['ltv'], 60.0)
+        self.assertEqual(results[1]['matches_found'], 0)
+        self.assertEqual(results[2]['error'], 'Missing required fields')
+
+    def test_batch_quote_rejects_empty_payload(self):
+        response = self.client.post(reverse('quote_batch'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_quote_rejects_bare_list(self):
+        response = self.client.post(reverse('quote_batch'), [{'property_state': 'CA'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
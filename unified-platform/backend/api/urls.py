@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import instrumentation, views
 # Import explicitly if not exposed in views/__init__.py yet, 
 # or ensure views/__init__.py exposes it.
 # Let's assume we modify views/__init__.py next, or import directly here.
@@ -14,6 +14,10 @@ urlpatterns = [
     # Health check
     path('health', views.health_check, name='health_check'),
 
+    # Instrumentation
+    path('metrics', instrumentation.metrics_view, name='api_metrics'),
+    path('metrics/slow', instrumentation.slow_requests_view, name='api_metrics_slow'),
+
     # Locations
     path('locations', views.location_list, name='location_list'),
     path('locations/nearest', views.location_nearest, name='location_nearest'),
@@ -21,6 +25,7 @@ urlpatterns = [
 
     # Pricing & quotes
     path('quote', views.QuoteView.as_view(), name='quote'),
+    path('quote/batch', views.BatchQuoteView.as_view(), name='quote_batch'),
     path('qualify', views.QualifyView.as_view(), name='qualify'),
 
     # Lead submission (Floify integration)
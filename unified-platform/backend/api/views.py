@@ -1,7 +1,6 @@
 """API views for the Unified CMTG Platform."""
 
 import logging
-from math import radians, sin, cos, sqrt, asin
 
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
@@ -13,12 +12,12 @@ from django.utils.decorators import method_decorator
 from django.conf import settings
 from django.db.models import Q
 
-from pricing.services.matching import LoanMatchingService
+from pricing.services.matching import LoanMatchingService, QualifyingInfoDTO
 from applications.models import Application
 from cms.models import LocationPage
+from cms.services.spatial_index import location_index, resolve
 from decimal import Decimal
-from django.db import connection
-from loans.models import LoanProgram, Lender
+from loans.services.eligibility import program_eligibility
 from .serializers import (
     LeadSubmitSerializer, 
     ApplicationSerializer, 
@@ -125,20 +124,6 @@ def location_detail(request, slug):
         )
 
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two GPS points in miles."""
-    EARTH_RADIUS_MILES = 3959
-    
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    
-    return EARTH_RADIUS_MILES * c
-
-
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def location_nearest(request):
@@ -173,22 +158,19 @@ def location_nearest(request):
     limit = min(int(request.query_params.get('limit', 5)), 20)
     max_distance = request.query_params.get('max_distance')
     
-    # Get all locations with coordinates
-    locations = LocationPage.objects.live().exclude(
-        latitude__isnull=True
-    ).exclude(longitude__isnull=True)
-    
-    # Calculate distances
-    results = []
-    for loc in locations:
-        distance = haversine_distance(
-            user_lat, user_lng,
-            float(loc.latitude), float(loc.longitude)
+    try:
+        max_miles = float(max_distance) if max_distance else None
+    except ValueError:
+        return Response(
+            {'error': 'Invalid max_distance value'},
+            status=status.HTTP_400_BAD_REQUEST
         )
-        
-        if max_distance and distance > float(max_distance):
-            continue
-        
+
+    # k-nearest query against the in-memory spatial index of live locations
+    hits = location_index.nearest(user_lat, user_lng, k=limit, max_miles=max_miles)
+
+    results = []
+    for loc, distance in resolve(LocationPage.objects.live(), hits):
         results.append({
             'id': loc.id,
             'title': loc.title,
@@ -201,10 +183,6 @@ def location_nearest(request):
             'distance_miles': round(distance, 1),
         })
     
-    # Sort by distance and limit
-    results.sort(key=lambda x: x['distance_miles'])
-    results = results[:limit]
-    
     return Response({
         'user_location': {'lat': user_lat, 'lng': user_lng},
         'count': len(results),
@@ -221,6 +199,67 @@ def health_check(request):
     """Health check endpoint."""
     return Response({'status': 'healthy'})
 
+
+QUOTE_REQUIRED_FIELDS = [
+    'property_state',
+    'loan_amount',
+    'credit_score',
+    'property_value'
+]
+
+MAX_BATCH_SCENARIOS = 50
+
+
+def _parse_quote_scenario(data):
+    """
+    Validate a quote request body and build qualification data.
+
+    Returns:
+        Tuple of (qualification_data, property_value, error). ``error`` is
+        a response payload dict when the input is invalid, else None.
+    """
+    missing_fields = [f for f in QUOTE_REQUIRED_FIELDS if f not in data]
+    if missing_fields:
+        return None, None, {
+            'error': 'Missing required fields',
+            'missing': missing_fields
+        }
+
+    # Calculate LTV
+    try:
+        loan_amount = float(data['loan_amount'])
+        property_value = float(data['property_value'])
+        ltv = (loan_amount / property_value) * 100
+        credit_score = int(data['credit_score'])
+        lock_period = int(data['lock_period']) if data.get('lock_period') else None
+    except (ValueError, TypeError, ZeroDivisionError) as e:
+        return None, None, {'error': f'Invalid numeric values: {str(e)}'}
+
+    # Build qualification data
+    qualification_data = {
+        'state': data['property_state'],
+        'property_type': data.get('property_type', 'residential'),
+        'entity_type': data.get('entity_type', 'individual'),
+        'purpose': data.get('loan_purpose', 'purchase'),
+        'occupancy': data.get('occupancy', 'owner occupied'),
+        'loan_amount': loan_amount,
+        'ltv': ltv,
+        'estimated_credit_score': credit_score,
+        'lock_period': lock_period,
+    }
+    return qualification_data, property_value, None
+
+
+def _quote_response_payload(qualification_data, property_value, quotes):
+    return {
+        'quotes': quotes,
+        'ltv': round(qualification_data['ltv'], 2),
+        'loan_amount': qualification_data['loan_amount'],
+        'property_value': property_value,
+        'matches_found': len(quotes)
+    }
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class QuoteView(APIView):
     """
@@ -233,63 +272,82 @@ class QuoteView(APIView):
 
     def post(self, request):
         """Handle POST request for loan quotes."""
-        data = request.data
-
-        # Validate required fields
-        required_fields = [
-            'property_state',
-            'loan_amount',
-            'credit_score',
-            'property_value'
-        ]
-        missing_fields = [f for f in required_fields if f not in data]
-        if missing_fields:
+        qualification_data, property_value, error = _parse_quote_scenario(request.data)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        # Get matching loan programs with real pricing adjustments
+        try:
+            quotes = LoanMatchingService.get_quotes_with_adjustments(
+                qualification_data,
+                limit=10
+            )
+
+            return Response(
+                _quote_response_payload(qualification_data, property_value, quotes)
+            )
+
+        except Exception as e:
             return Response(
                 {
-                    'error': 'Missing required fields',
-                    'missing': missing_fields
+                    'error': 'Error matching loan programs',
+                    'detail': str(e)
                 },
-                status=status.HTTP_400_BAD_REQUEST
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        # Calculate LTV
-        try:
-            loan_amount = float(data['loan_amount'])
-            property_value = float(data['property_value'])
-            ltv = (loan_amount / property_value) * 100
-        except (ValueError, ZeroDivisionError) as e:
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchQuoteView(APIView):
+    """
+    Batch loan quote API endpoint.
+
+    POST /api/v1/quote/batch
+
+    Prices many borrower scenarios in one request. The body is
+    ``{"scenarios": [...]}`` where each scenario has the same fields as
+    a QuoteView request. Results are returned in input order; invalid
+    scenarios carry an ``error`` entry instead of quotes.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        """Handle POST request for batch loan quotes."""
+        if not isinstance(request.data, dict):
             return Response(
-                {'error': f'Invalid numeric values: {str(e)}'},
+                {'error': 'Request body must be an object with a scenarios list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        scenarios = request.data.get('scenarios')
+        if not isinstance(scenarios, list) or not scenarios:
+            return Response(
+                {'error': 'scenarios must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(scenarios) > MAX_BATCH_SCENARIOS:
+            return Response(
+                {'error': f'At most {MAX_BATCH_SCENARIOS} scenarios per request'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Build qualification data
-        qualification_data = {
-            'state': data['property_state'],
-            'property_type': data.get('property_type', 'residential'),
-            'entity_type': data.get('entity_type', 'individual'),
-            'purpose': data.get('loan_purpose', 'purchase'),
-            'occupancy': data.get('occupancy', 'owner occupied'),
-            'loan_amount': loan_amount,
-            'ltv': ltv,
-            'estimated_credit_score': int(data['credit_score'])
-        }
+        results = [None] * len(scenarios)
+        parsed = []
+        for index, scenario in enumerate(scenarios):
+            if not isinstance(scenario, dict):
+                results[index] = {'error': 'Scenario must be an object'}
+                continue
+            qualification_data, property_value, error = _parse_quote_scenario(scenario)
+            if error:
+                results[index] = error
+                continue
+            parsed.append((index, qualification_data, property_value))
 
-        # Get matching loan programs with real pricing adjustments
         try:
-            quotes = LoanMatchingService.get_quotes_with_adjustments(
-                qualification_data,
+            quote_lists = LoanMatchingService.get_quotes_for_scenarios(
+                [QualifyingInfoDTO.from_dict(qd) for _, qd, _ in parsed],
                 limit=10
             )
-
-            return Response({
-                'quotes': quotes,
-                'ltv': round(ltv, 2),
-                'loan_amount': loan_amount,
-                'property_value': property_value,
-                'matches_found': len(quotes)
-            })
-
         except Exception as e:
             return Response(
                 {
@@ -299,6 +357,16 @@ class QuoteView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        for (index, qualification_data, property_value), quotes in zip(parsed, quote_lists):
+            results[index] = _quote_response_payload(
+                qualification_data, property_value, quotes
+            )
+
+        return Response({
+            'results': results,
+            'scenarios_priced': len(parsed),
+        })
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class LeadSubmitView(APIView):
@@ -613,50 +681,21 @@ class QualifyView(APIView):
         
         data = serializer.validated_data
         
-        # Find matching programs
-        # Note: property_state needs to be upper case for matching.
-        # Also, using 'contains' for ChoiceArrayFields.
-        if connection.vendor == 'sqlite':
-            # SQLite fallback: Filter strictly by scalar fields first, then filter array fields in Python
-            initial_programs = LoanProgram.objects.select_related('lender').filter(
-                min_loan_amount__lte=data['loan_amount'],
-                max_loan_amount__gte=data['loan_amount'],
-                min_credit__lte=data['credit_score'],
-                max_loan_to_value__gte=data['calculated_ltv'],
-            )
-            programs = []
-            for p in initial_programs:
-                if data['property_state'].upper() not in p.lender.include_states: continue
-                if data['property_type'] not in p.property_types: continue
-                if data['loan_purpose'] not in p.purpose: continue
-                if data['occupancy'] not in p.occupancy: continue
-                programs.append(p)
-        else:
-            programs = LoanProgram.objects.select_related('lender').filter(
-                lender__include_states__contains=[data['property_state'].upper()],
-                min_loan_amount__lte=data['loan_amount'],
-                max_loan_amount__gte=data['loan_amount'],
-                min_credit__lte=data['credit_score'],
-                max_loan_to_value__gte=data['calculated_ltv'],
-                property_types__contains=[data['property_type']],
-                purpose__contains=[data['loan_purpose']],
-                occupancy__contains=[data['occupancy']],
-            )
+        # Find and rank matching programs via the in-memory eligibility
+        # bitmap index, which behaves the same on SQLite and Postgres.
+        top_matches = program_eligibility.top_matches(data, limit=10)
         
         matched_programs = []
-        for program in programs[:10]:
-            match_score = self._calculate_match_score(program, data)
+        for match_score, program in top_matches:
             matched_programs.append({
                 'program_id': program.id,
                 'program_name': program.name,
-                'lender_name': program.lender.company_name,
+                'lender_name': program.lender_name,
                 'estimated_rate_range': f"{program.potential_rate_min:.2f}% - {program.potential_rate_max:.2f}%",
                 'match_score': match_score,
                 'notes': self._get_program_notes(program, data),
             })
         
-        matched_programs.sort(key=lambda x: x['match_score'], reverse=True)
-        
         result = {
             'matched_programs': matched_programs,
             'total_matches': len(matched_programs),
@@ -669,10 +708,6 @@ class QualifyView(APIView):
     def _get_program_notes(self, program, data):
         from loans.services.matching import MatchingService
         return MatchingService.get_program_notes(program, data)
-        
-    def _calculate_match_score(self, program, data):
-        from loans.services.matching import MatchingService
-        return MatchingService.calculate_match_score(program, data)
 
 
 # ============================================================================
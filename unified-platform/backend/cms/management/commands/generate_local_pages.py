@@ -3,7 +3,7 @@ from django.db import transaction
 from django.utils.text import slugify
 from cms.models import ProgramPage, City, LocalProgramPage, Office
 from cms.services.ai_content_generator import AiContentGenerator
-from cms.services.proximity import ProximityService
+from cms.services import office_assignment
 from cms.services.schema_generator import SchemaGenerator
 import time
 import logging
@@ -90,6 +90,10 @@ class Command(BaseCommand):
              self.stdout.write(self.style.ERROR(f"Failed to init AI: {e}"))
              return
 
+        # Nearest office per city from the precomputed assignments (one query)
+        cities = list(cities)
+        offices = office_assignment.offices_for(cities)
+
         count = 0
         
         # 3. Generate Pages
@@ -99,12 +103,12 @@ class Command(BaseCommand):
                     self.stdout.write("Sleeping for rate limit...")
                     time.sleep(1)
 
-                self.generate_page(program, city, ai_generator, dry_run)
+                self.generate_page(program, city, offices.get(city.pk), ai_generator, dry_run)
                 count += 1
 
         self.stdout.write(self.style.SUCCESS(f"Completed! Processed {count} pages."))
 
-    def generate_page(self, program, city, ai_generator, dry_run):
+    def generate_page(self, program, city, office, ai_generator, dry_run):
         # slug logic match model
         slug = f"{program.slug}-{city.slug}"
         
@@ -116,10 +120,7 @@ class Command(BaseCommand):
             return
 
         try:
-            # 1. Proximity
-            office = ProximityService.find_nearest_office(city)
-            
-            # 2. AI Content
+            # 1. AI Content
             self.stdout.write("  Generating AI content...")
             intro = ai_generator.generate_local_intro(
                 program.title, city.name, city.state
@@ -139,14 +140,14 @@ class Command(BaseCommand):
                     }
                 })
 
-            # 3. Schema
+            # 2. Schema
             schema_json = SchemaGenerator.generate_local_schema(program, city, office)
 
             if dry_run:
                 self.stdout.write(self.style.SUCCESS(f"  [DRY RUN] Would create page for {city.name}"))
                 return
 
-            # 4. Save Page
+            # 3. Save Page
             # We need a parent page. Assuming program page is the parent or a flat structure?
             # Model says parent_page_types = ['cms.ProgramIndexPage'] for ProgramPage.
             # LocalProgramPage doesn't have specific parent types defined yet in correct file?
@@ -1,9 +1,16 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from cms.models import City
+from cms.services import office_assignment, route_table
+from cms.services.slug_index import seo_slug_index
+from cms.services.spatial_index import city_index
 import csv
 from decimal import Decimal
 import os
 
+CITY_FIELDS = ('name', 'state', 'state_name', 'latitude', 'longitude', 'population')
+
+
 class Command(BaseCommand):
     help = 'Import US cities from simplemaps CSV'
 
@@ -17,6 +24,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'File not found: {csv_path}'))
             return
 
+        cities = {}
         with open(csv_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             count = 0
@@ -34,17 +42,16 @@ class Command(BaseCommand):
                     if not (name and state and lat and lng):
                          continue
                          
-                    city, created = City.objects.update_or_create(
-                        slug=f"{name.lower().replace(' ', '-')}-{state.lower()}",
-                        defaults={
-                            'name': name,
-                            'state': state,
-                            'state_name': state_name,
-                            'latitude': Decimal(lat),
-                            'longitude': Decimal(lng),
-                            'population': int(float(row.get('population', 0) or 0)),
-                            # 'median_income' not in simplemaps basic, requires census merge. Left null.
-                        }
+                    slug = f"{name.lower().replace(' ', '-')}-{state.lower()}"
+                    cities[slug] = City(
+                        slug=slug,
+                        name=name,
+                        state=state,
+                        state_name=state_name,
+                        latitude=Decimal(lat),
+                        longitude=Decimal(lng),
+                        population=int(float(row.get('population', 0) or 0)),
+                        # 'median_income' not in simplemaps basic, requires census merge. Left null.
                     )
                     count += 1
                     if count % 100 == 0:
@@ -53,4 +60,29 @@ class Command(BaseCommand):
                 except Exception as e:
                     self.stdout.write(self.style.WARNING(f"Error importing row {row}: {e}"))
         
+        self._save(cities.values())
         self.stdout.write(self.style.SUCCESS(f'Successfully imported {count} cities'))
+
+        assigned = office_assignment.refresh_assignments()
+        self.stdout.write(self.style.SUCCESS(f'Assigned offices to {assigned} cities'))
+
+        # One rebuild of the router routes for the whole import
+        route_table.schedule_rebuild()
+
+    def _save(self, cities):
+        """
+        Create or update ``cities`` (matched by slug) in bulk. Bulk writes
+        send no per-city signals, so the indexes they would drop are dropped
+        once here; assignments and routes are refreshed by ``handle``.
+        """
+        existing = dict(City.objects.values_list('slug', 'pk'))
+        created, updated = [], []
+        for city in cities:
+            city.pk = existing.get(city.slug)
+            (updated if city.pk else created).append(city)
+
+        with transaction.atomic():
+            City.objects.bulk_create(created, batch_size=1000)
+            City.objects.bulk_update(updated, CITY_FIELDS, batch_size=1000)
+            city_index.invalidate()
+            seo_slug_index.invalidate()
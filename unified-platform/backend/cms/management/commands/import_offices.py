@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 import csv
 from pathlib import Path
+from django.db import transaction
 from cms.models import Office
 
 class Command(BaseCommand):
@@ -22,10 +23,13 @@ class Command(BaseCommand):
         csv_path = options.get('csv')
         dry_run = options['dry_run']
 
-        if csv_path:
-            self.import_from_csv(csv_path, dry_run)
-        else:
-            self.create_sample_offices(dry_run)
+        # One transaction so city office assignments are recomputed once
+        # on commit rather than after every office saved.
+        with transaction.atomic():
+            if csv_path:
+                self.import_from_csv(csv_path, dry_run)
+            else:
+                self.create_sample_offices(dry_run)
 
     def import_from_csv(self, csv_path: str, dry_run: bool):
         """Import offices from CSV file."""
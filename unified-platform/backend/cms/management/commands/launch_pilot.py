@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from cms.models.cities import City
+from cms.services.slug_index import seo_slug_index
 from django.utils import timezone
 
 class Command(BaseCommand):
@@ -19,6 +20,8 @@ class Command(BaseCommand):
         # 2. Set Launched At
         now = timezone.now()
         updated = cities.update(launched_at=now)
+        # update() bypasses signals; refresh the SEO slug index explicitly
+        seo_slug_index.invalidate()
         
         self.stdout.write(self.style.SUCCESS(f"Successfully launched {updated} cities."))
         for city in cities:
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from cms.services import route_table
+
+
+class Command(BaseCommand):
+    help = 'Pre-build the router/resolve route table from the SEO content cache'
+
+    def handle(self, *args, **options):
+        count = route_table.rebuild_routes()
+        self.stdout.write(self.style.SUCCESS(f'Built {count} routes'))
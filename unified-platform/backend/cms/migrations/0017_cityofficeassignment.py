@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0016_remove_city_cms_city_state_a7a24c_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CityOfficeAssignment',
+            fields=[
+                ('city', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='office_assignment', serialize=False, to='cms.city')),
+                ('distance_miles', models.FloatField(help_text='Distance from the city to the assigned office')),
+                ('is_fallback', models.BooleanField(default=False, help_text='Assigned to headquarters because the nearest office is over 500 miles away')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('office', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='city_assignments', to='cms.office')),
+            ],
+            options={
+                'verbose_name': 'City office assignment',
+            },
+        ),
+    ]
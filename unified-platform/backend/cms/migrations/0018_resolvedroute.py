@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0017_cityofficeassignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResolvedRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_path', models.CharField(help_text='Normalized path, e.g. /jumbo-loans/in-los-angeles-ca/', max_length=255, unique=True)),
+                ('payload', models.JSONField()),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.city')),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='routes', to='cms.seocontentcache')),
+                ('office', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.office')),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.programpage')),
+            ],
+            options={
+                'verbose_name': 'Resolved route',
+            },
+        ),
+    ]
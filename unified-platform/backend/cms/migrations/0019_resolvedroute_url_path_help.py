@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0018_resolvedroute'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resolvedroute',
+            name='url_path',
+            field=models.CharField(help_text='SEOContentCache.url_path, e.g. /jumbo-loans/in-los-angeles-ca/', max_length=255, unique=True),
+        ),
+    ]
@@ -2,9 +2,9 @@ from .legacy import HomePage, StandardPage, LegacyIndexPage, LegacyRecreatedPage
 from .programs import ProgramIndexPage, ProgramPage
 from .funded_loans import FundedLoanIndexPage, FundedLoanPage
 from .blog import BlogIndexPage, BlogPage
-from .offices import Office
+from .offices import CityOfficeAssignment, Office
 from .cities import City
 from .local_pages import LocalProgramPage
 from .locations import LocationIndexPage, LocationPage
 from .navigation import NavigationMenu, SiteConfiguration
-from .seo import SEOContentCache
+from .seo import ResolvedRoute, SEOContentCache
@@ -60,3 +60,38 @@ class Office(models.Model):
     @property
     def full_address(self):
         return f"{self.address}, {self.city}, {self.state} {self.zipcode}"
+
+
+class CityOfficeAssignment(models.Model):
+    """
+    Materialized nearest-office assignment for a City.
+
+    Maintained by ``cms.services.office_assignment``: recomputed for every
+    city in one pass when offices change, and per city when a city changes,
+    so page generation and path resolution look the office up with a single
+    indexed join instead of scanning offices per city.
+    """
+
+    city = models.OneToOneField(
+        'cms.City',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='office_assignment'
+    )
+    office = models.ForeignKey(
+        Office,
+        on_delete=models.CASCADE,
+        related_name='city_assignments'
+    )
+    distance_miles = models.FloatField(help_text="Distance from the city to the assigned office")
+    is_fallback = models.BooleanField(
+        default=False,
+        help_text="Assigned to headquarters because the nearest office is over 500 miles away"
+    )
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "City office assignment"
+
+    def __str__(self):
+        return f"{self.city_id} -> {self.office} ({self.distance_miles:.1f} mi)"
@@ -26,3 +26,28 @@ class SEOContentCache(models.Model):
 
     def __str__(self):
         return f"Cache for {self.url_path} ({self.last_updated.strftime('%Y-%m-%d')})"
+
+
+class ResolvedRoute(models.Model):
+    """
+    Denormalized ``router/resolve`` response for one programmatic SEO path.
+
+    Keyed by the SEO content path and holding the rendered payload, so the
+    router answers with a single indexed lookup. Maintained by
+    ``cms.services.route_table``: rows are dropped when their content,
+    program, city or office changes and rebuilt by a Celery task after
+    commit, or by the ``rebuild_route_table`` command.
+    """
+    url_path = models.CharField(max_length=255, unique=True, help_text="SEOContentCache.url_path, e.g. /jumbo-loans/in-los-angeles-ca/")
+    content = models.ForeignKey(SEOContentCache, on_delete=models.CASCADE, related_name='routes')
+    program = models.ForeignKey('cms.ProgramPage', on_delete=models.CASCADE, related_name='+')
+    city = models.ForeignKey('cms.City', on_delete=models.CASCADE, related_name='+')
+    office = models.ForeignKey('cms.Office', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    payload = models.JSONField()
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resolved route"
+
+    def __str__(self):
+        return self.url_path
@@ -0,0 +1,90 @@
+"""
+Great-circle distance kernels shared by the proximity services.
+
+``haversine`` is the scalar formula for a single pair. Batched queries go
+through ``CoordinateArray``: coordinates are converted from Decimal once and
+stored as unit-sphere (x, y, z) vectors in contiguous ``array('d')``
+columns, so ``distances_from`` (one to many) and ``distance_matrix`` (many
+to many) cost a few multiplications, one sqrt and one asin per pair instead
+of three trigonometric calls plus the float conversion. The chord between
+unit vectors converts to exactly the haversine distance.
+
+Each ``cms.services.spatial_index`` snapshot keeps the CoordinateArray of
+its model (``city_index.snapshot().coords``), cached and invalidated with
+the index.
+"""
+
+from array import array
+from math import asin, cos, radians, sin, sqrt
+from typing import Any, Iterable, List, Sequence, Tuple
+
+EARTH_RADIUS_MILES = 3959.0
+EARTH_RADIUS_KM = 6371.0
+
+
+def unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    """Point on the unit sphere for a latitude/longitude in degrees."""
+    phi, lam = radians(lat), radians(lon)
+    return cos(phi) * cos(lam), cos(phi) * sin(lam), sin(phi)
+
+
+def chord_to_miles(chord: float, radius: float = EARTH_RADIUS_MILES) -> float:
+    return 2 * radius * asin(min(1.0, chord / 2))
+
+
+def haversine(lat1, lon1, lat2, lon2, radius: float = EARTH_RADIUS_MILES) -> float:
+    """Great-circle distance between two points in degrees, in units of ``radius``."""
+    lat1, lon1, lat2, lon2 = map(radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * radius * asin(min(1.0, sqrt(a)))
+
+
+class CoordinateArray:
+    """Unit vectors of a set of points in three contiguous float columns."""
+
+    def __init__(self, ids: Sequence[Any], xs: array, ys: array, zs: array):
+        self.ids = list(ids)
+        self.xs, self.ys, self.zs = xs, ys, zs
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[Any, Any, Any]]) -> 'CoordinateArray':
+        """Build from ``(id, latitude, longitude)`` rows, skipping missing coordinates."""
+        ids, xs, ys, zs = [], array('d'), array('d'), array('d')
+        for pk, lat, lon in rows:
+            if lat is None or lon is None:
+                continue
+            x, y, z = unit_vector(float(lat), float(lon))
+            ids.append(pk)
+            xs.append(x)
+            ys.append(y)
+            zs.append(z)
+        return cls(ids, xs, ys, zs)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def points(self) -> List[Tuple[float, float, float]]:
+        return list(zip(self.xs, self.ys, self.zs))
+
+
+def distances_from(lat: float, lon: float, coords: CoordinateArray, radius: float = EARTH_RADIUS_MILES) -> array:
+    """Distance from (lat, lon) to every point of ``coords``, in ``coords`` order."""
+    qx, qy, qz = unit_vector(float(lat), float(lon))
+    diameter = 2 * radius
+    return array('d', [
+        diameter * asin(min(1.0, 0.5 * sqrt((x - qx) * (x - qx) + (y - qy) * (y - qy) + (z - qz) * (z - qz))))
+        for x, y, z in zip(coords.xs, coords.ys, coords.zs)
+    ])
+
+
+def distance_matrix(origins: CoordinateArray, targets: CoordinateArray, radius: float = EARTH_RADIUS_MILES) -> List[array]:
+    """One row of distances to every target for each origin."""
+    diameter = 2 * radius
+    txs, tys, tzs = targets.xs, targets.ys, targets.zs
+    return [
+        array('d', [
+            diameter * asin(min(1.0, 0.5 * sqrt((x - qx) * (x - qx) + (y - qy) * (y - qy) + (z - qz) * (z - qz))))
+            for x, y, z in zip(txs, tys, tzs)
+        ])
+        for qx, qy, qz in zip(origins.xs, origins.ys, origins.zs)
+    ]
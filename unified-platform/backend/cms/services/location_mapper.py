@@ -6,11 +6,10 @@ Includes distance calculation utilities for geographic queries.
 """
 
 import re
-import math
 from typing import List, Dict, Optional, Tuple
 from decimal import Decimal
 from cms.models.cities import City
-from cms.models.offices import Office
+from cms.services import geo, office_assignment
 
 class LocationMapper:
     """
@@ -21,38 +20,10 @@ class LocationMapper:
     @staticmethod
     def get_closest_office(city: City):
         """
-        Returns the closest active Office to the given City.
+        Returns the closest active Office to the given City (HQ beyond 500
+        miles), from the materialized city -> office assignment.
         """
-        offices = Office.objects.filter(is_active=True)
-        if not offices.exists():
-            return None
-            
-        closest_office = None
-        min_distance = float('inf')
-        
-        for office in offices:
-            if office.latitude is None or office.longitude is None:
-                continue
-                
-            if city.latitude is None or city.longitude is None:
-                continue
-                
-            # Use internal DistanceCalculator
-            dist = DistanceCalculator.haversine_distance(
-                float(city.latitude), float(city.longitude),
-                float(office.latitude), float(office.longitude)
-            )
-            
-            if dist < min_distance:
-                min_distance = dist
-                closest_office = office
-                
-        if closest_office is None:
-            return Office.objects.filter(is_headquarters=True).first()
-            
-        return closest_office
-
-
+        return office_assignment.assigned_office(city)
 
     def __init__(self):
         """Initialize location mapper."""
@@ -157,13 +128,14 @@ class DistanceCalculator:
     """
     Calculate distances between geographic coordinates.
 
-    Uses Haversine formula for great-circle distance calculation.
+    Uses Haversine formula for great-circle distance calculation, via the
+    shared kernels in ``cms.services.geo``.
     """
 
     # Earth's radius in kilometers
-    EARTH_RADIUS_KM = 6371.0
+    EARTH_RADIUS_KM = geo.EARTH_RADIUS_KM
     # Earth's radius in miles
-    EARTH_RADIUS_MI = 3958.8
+    EARTH_RADIUS_MI = geo.EARTH_RADIUS_MILES
 
     @staticmethod
     def haversine_distance(
@@ -186,30 +158,15 @@ class DistanceCalculator:
         Returns:
             Distance in specified unit
         """
-        # Convert to radians
-        lat1_rad = math.radians(lat1)
-        lon1_rad = math.radians(lon1)
-        lat2_rad = math.radians(lat2)
-        lon2_rad = math.radians(lon2)
-
-        # Haversine formula
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
-
-        a = (
-            math.sin(dlat / 2) ** 2 +
-            math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
-        )
-        c = 2 * math.asin(math.sqrt(a))
+        return geo.haversine(lat1, lon1, lat2, lon2, DistanceCalculator._radius(unit))
 
-        # Calculate distance
-        radius = (
+    @staticmethod
+    def _radius(unit: str) -> float:
+        return (
             DistanceCalculator.EARTH_RADIUS_MI if unit == 'mi'
             else DistanceCalculator.EARTH_RADIUS_KM
         )
 
-        return radius * c
-
     @staticmethod
     def find_nearest_locations(
         origin_lat: float,
@@ -233,21 +190,21 @@ class DistanceCalculator:
         Returns:
             List of tuples: (location_dict, distance) sorted by distance
         """
-        # Calculate distance for each location
-        locations_with_distance = []
-
-        for location in locations:
-            distance = DistanceCalculator.haversine_distance(
-                origin_lat,
-                origin_lon,
-                float(location['latitude']),
-                float(location['longitude']),
-                unit
-            )
+        # Calculate all distances in one batched pass
+        coords = geo.CoordinateArray.from_rows(
+            (index, location['latitude'], location['longitude'])
+            for index, location in enumerate(locations)
+        )
+        distances = geo.distances_from(
+            origin_lat, origin_lon, coords, DistanceCalculator._radius(unit)
+        )
 
-            # Filter by max distance if specified
-            if max_distance is None or distance <= max_distance:
-                locations_with_distance.append((location, distance))
+        # Filter by max distance if specified
+        locations_with_distance = [
+            (locations[index], distance)
+            for index, distance in zip(coords.ids, distances)
+            if max_distance is None or distance <= max_distance
+        ]
 
         # Sort by distance
         locations_with_distance.sort(key=lambda x: x[1])
@@ -0,0 +1,225 @@
+"""
+Materialized City -> nearest Office assignments.
+
+Each city is assigned its nearest active office, or headquarters when that
+office is more than FALLBACK_MILES away. ``refresh_assignments`` computes
+every city in one pass (one KD-tree over the active offices, one
+nearest-neighbour query per city) and writes the CityOfficeAssignment rows
+in bulk, so page generation and path resolution read the office with a
+single indexed join instead of scanning offices for each city.
+
+Only ``refresh_assignments`` writes them. An office change that can move
+assignments (a new or deleted office, or a change to ASSIGNMENT_FIELDS)
+queues the ``refresh_office_assignments`` Celery task for every city after
+commit, and a new or moved city queues it for that city (see
+``cms.signals``); requests are merged per transaction. Until the task has
+run, a city without an assignment gets its office computed from the
+in-memory office index, without storing it.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from cms.models import City, CityOfficeAssignment, Office
+from cms.services.geo import CoordinateArray, haversine
+from cms.services.spatial_index import KDTree, office_index
+from common.transactions import on_commit_once
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_MILES = 500
+
+# Office fields that decide which cities an office is assigned to
+ASSIGNMENT_FIELDS = ('latitude', 'longitude', 'is_active', 'is_headquarters')
+
+# City fields that decide its office
+CITY_ASSIGNMENT_FIELDS = ('latitude', 'longitude')
+
+# (id, latitude, longitude)
+Row = Tuple[int, float, float]
+
+
+@dataclass
+class Assignment:
+    city_id: int
+    office_id: int
+    distance_miles: float
+    is_fallback: bool = False
+
+
+def compute_assignments(cities: Iterable[Row], offices: KDTree, headquarters: Optional[Row]) -> List[Assignment]:
+    """
+    Assign each city its nearest office in ``offices``, falling back to
+    ``headquarters`` beyond FALLBACK_MILES (or when there is no office).
+    """
+    assignments = []
+    for city_id, lat, lon in cities:
+        hits = offices.nearest(float(lat), float(lon))
+        if hits and (hits[0][1] <= FALLBACK_MILES or headquarters is None):
+            office_id, distance = hits[0]
+            assignments.append(Assignment(city_id, office_id, distance))
+        elif headquarters is not None:
+            hq_id, hq_lat, hq_lon = headquarters
+            assignments.append(Assignment(city_id, hq_id, haversine(lat, lon, hq_lat, hq_lon), is_fallback=True))
+    return assignments
+
+
+def _headquarters() -> Optional[Row]:
+    return Office.objects.filter(is_headquarters=True).values_list('id', 'latitude', 'longitude').first()
+
+
+def _office_tree() -> KDTree:
+    coords = CoordinateArray.from_rows(Office.objects.active().values_list('id', 'latitude', 'longitude'))
+    return KDTree(coords.ids, coords.points())
+
+
+def refresh_assignments(city_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recompute assignments for ``city_ids``, or for every city.
+
+    Returns:
+        Number of assignments written
+    """
+    started = time.perf_counter()
+    cities = City.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    if city_ids is not None:
+        city_ids = list(city_ids)
+        cities = cities.filter(id__in=city_ids)
+
+    assignments = compute_assignments(
+        cities.values_list('id', 'latitude', 'longitude').iterator(), _office_tree(), _headquarters()
+    )
+
+    with transaction.atomic():
+        existing = CityOfficeAssignment.objects.all()
+        if city_ids is not None:
+            existing = existing.filter(city_id__in=city_ids)
+        existing.delete()
+        CityOfficeAssignment.objects.bulk_create(
+            [CityOfficeAssignment(**vars(assignment)) for assignment in assignments],
+            batch_size=1000,
+        )
+
+    logger.info(
+        "Assigned offices to %d cities in %.1fms", len(assignments), (time.perf_counter() - started) * 1000
+    )
+    return len(assignments)
+
+
+def _nearest_office(city: City) -> Optional[Office]:
+    """
+    Compute one city's office from the cached office index, in one query
+    and without storing it: the refresh task owns the writes.
+    """
+    hits = []
+    if city.latitude is not None and city.longitude is not None:
+        hits = office_index.nearest(float(city.latitude), float(city.longitude))
+    if hits and hits[0][1] <= FALLBACK_MILES:
+        return Office.objects.filter(pk=hits[0][0]).first()
+    # Headquarters, else the nearest office however far (as compute_assignments)
+    nearest = Q(pk=hits[0][0]) if hits else Q(pk__in=[])
+    return Office.objects.filter(Q(is_headquarters=True) | nearest).order_by('-is_headquarters').first()
+
+
+def assigned_office(city: City) -> Optional[Office]:
+    """
+    The office assigned to ``city``.
+
+    Free when the city was loaded with
+    ``select_related('office_assignment__office')``, one indexed query
+    otherwise; computed (not stored) if the city has no assignment yet.
+    """
+    if city.pk is not None:
+        if City.office_assignment.is_cached(city):
+            assignment = getattr(city, 'office_assignment', None)
+        else:
+            assignment = (
+                CityOfficeAssignment.objects.select_related('office').filter(city_id=city.pk).first()
+            )
+        if assignment is not None:
+            return assignment.office
+    return _nearest_office(city)
+
+
+def offices_for(cities: Iterable[City]) -> Dict[int, Office]:
+    """
+    Assigned office by city id, in one query when every city has an
+    assignment; missing ones are computed in one pass without storing them.
+    """
+    cities = list(cities)
+    offices = {
+        assignment.city_id: assignment.office
+        for assignment in CityOfficeAssignment.objects.filter(
+            city_id__in=[city.pk for city in cities]
+        ).select_related('office')
+    }
+
+    missing = [city for city in cities if city.pk not in offices]
+    if missing:
+        computed = {
+            assignment.city_id: assignment.office_id
+            for assignment in compute_assignments(
+                [(city.pk, city.latitude, city.longitude) for city in missing
+                 if city.latitude is not None and city.longitude is not None],
+                office_index.snapshot().tree, _headquarters(),
+            )
+        }
+        by_id = Office.objects.in_bulk(set(computed.values()))
+        offices.update((city_id, by_id.get(office_id)) for city_id, office_id in computed.items())
+    return offices
+
+
+def _changed(instance, fields, update_fields: Optional[Iterable[str]]) -> bool:
+    """Whether saving ``instance`` creates it or changes one of ``fields``. Call before saving."""
+    if instance._state.adding or instance.pk is None:
+        return True
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return False
+    model = type(instance)
+    stored = model._default_manager.filter(pk=instance.pk).values(*fields).first()
+    if stored is None:
+        return True
+    return any(
+        stored[name] != model._meta.get_field(name).to_python(getattr(instance, name))
+        for name in fields
+    )
+
+
+def affects_assignments(office: Office, update_fields: Optional[Iterable[str]] = None) -> bool:
+    """
+    Whether saving ``office`` can change city assignments: it is new, or an
+    ASSIGNMENT_FIELDS value differs from the stored row. Call before saving.
+    """
+    return _changed(office, ASSIGNMENT_FIELDS, update_fields)
+
+
+def city_moved(city: City, update_fields: Optional[Iterable[str]] = None) -> bool:
+    """Whether saving ``city`` creates it or changes its coordinates. Call before saving."""
+    return _changed(city, CITY_ASSIGNMENT_FIELDS, update_fields)
+
+
+def invalidate_all() -> None:
+    """
+    Queue a recompute of every assignment once the transaction commits.
+
+    Existing assignments keep being served until the task replaces them.
+    Several office changes in one transaction queue a single task.
+    """
+    from cms.tasks import refresh_office_assignments
+
+    on_commit_once('cms.office_assignment.all', refresh_office_assignments.delay)
+
+
+def invalidate_city(city_id: int) -> None:
+    """
+    Queue a recompute of one city's assignment once the transaction
+    commits; the cities saved in one transaction share a single task.
+    """
+    from cms.tasks import refresh_office_assignments
+
+    on_commit_once('cms.office_assignment.cities', refresh_office_assignments.delay, items=[city_id])
@@ -0,0 +1,206 @@
+"""
+Denormalized route table for the ``router/resolve`` endpoint.
+
+Resolving a program/location path used to take six or more queries (path
+validation, SEO content, program, city, office). Each SEO content entry
+whose path resolves is stored as a ResolvedRoute row keyed by its exact
+``url_path``, so a request is answered with one indexed lookup; a path
+without a row takes the full (read-only) resolution.
+
+Rows are written only by ``rebuild_routes``: the ``rebuild_route_table``
+management command, and the ``rebuild_route_table`` Celery task queued
+after commit when SEO content, a program, a city or an office changes
+(see ``cms.signals``) and after office assignments are recomputed
+(``cms.tasks``). The stale rows are dropped immediately and only the SEO
+content they belonged to, or whose path names the changed program or
+city, is rebuilt.
+"""
+
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from django.db.models import Q
+
+from cms.models import City, ProgramPage, ResolvedRoute, SEOContentCache
+from cms.services import office_assignment
+from common.transactions import on_commit_once
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def lookup(path: str) -> Optional[Dict[str, Any]]:
+    """The stored payload for exactly ``path``, or None if it has no route."""
+    return ResolvedRoute.objects.filter(url_path=path).values_list('payload', flat=True).first()
+
+
+def build_payload(content: SEOContentCache, program: ProgramPage, city: City, office) -> Dict[str, Any]:
+    """The ``program_location`` response body."""
+    office_data = {}
+    if office:
+        office_data = {
+            'name': office.name,
+            'address': f"{office.city}, {office.state}", # Simplified
+            'phone': getattr(office, 'phone', '555-0123') # fallback
+        }
+
+    return {
+        'type': 'program_location',
+        'data': {
+            'title': content.title_tag,
+            'h1': content.h1_header,
+            'meta_description': content.meta_description,
+            'content': content.content_body,
+            'schema': content.schema_json,
+            'program': {
+                'title': program.title,
+                'slug': program.slug,
+                'rates': program.interest_rates
+            },
+            'location': {
+                'city': city.name,
+                'state': city.state,
+                'office': office_data
+            }
+        }
+    }
+
+
+def store(path: str, content: SEOContentCache, program: ProgramPage, city: City, office) -> Dict[str, Any]:
+    """Render and save the route for ``path``; returns the payload."""
+    payload = build_payload(content, program, city, office)
+    ResolvedRoute.objects.update_or_create(
+        url_path=path,
+        defaults={
+            'content': content,
+            'program': program,
+            'city': city,
+            'office': office,
+            'payload': payload,
+        },
+    )
+    return payload
+
+
+def rebuild_routes(content_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Build a route for every SEO content entry whose path resolves to a
+    program and city, and drop the rows of entries that no longer resolve.
+
+    Args:
+        content_ids: Only rebuild these SEO content entries (all if None)
+
+    Returns:
+        Number of routes written
+    """
+    from cms.services.seo_resolver import SEOResolver
+
+    contents = SEOContentCache.objects.all()
+    if content_ids is not None:
+        contents = contents.filter(pk__in=list(content_ids))
+
+    count = 0
+    unresolved = []
+    for content in contents.iterator():
+        program_slug, city_slug, state_code = SEOResolver.resolve_path(content.url_path)
+        program = city = None
+        if program_slug:
+            program = ProgramPage.objects.filter(slug=program_slug).first()
+            city = City.objects.select_related('office_assignment__office').filter(
+                slug=city_slug, state=state_code
+            ).first()
+        if program is None or city is None:
+            unresolved.append(content.pk)
+            continue
+        store(content.url_path, content, program, city, office_assignment.assigned_office(city))
+        count += 1
+
+    for start in range(0, len(unresolved), BATCH_SIZE):
+        ResolvedRoute.objects.filter(content_id__in=unresolved[start:start + BATCH_SIZE]).delete()
+
+    logger.info("Rebuilt %d routes", count)
+    return count
+
+
+def rebuild_city_routes(city_ids: Iterable[int]) -> int:
+    """Rebuild the routes of the SEO content naming one of ``city_ids``."""
+    city_ids = list(city_ids)
+    cities = City.objects.filter(pk__in=city_ids).values_list('slug', 'state')
+    content_ids = _content_ids(
+        ResolvedRoute.objects.filter(city_id__in=city_ids),
+        [_city_path(slug, state) for slug, state in cities],
+    )
+    return rebuild_routes(content_ids) if content_ids else 0
+
+
+def schedule_rebuild(content_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Queue the ``rebuild_route_table`` task once the transaction commits.
+
+    Requests are merged per transaction: one full rebuild (``content_ids``
+    None), and one targeted rebuild of every content id requested.
+    """
+    from cms.tasks import rebuild_route_table
+
+    if content_ids is None:
+        on_commit_once('cms.route_table.all', rebuild_route_table.delay)
+        return
+
+    content_ids = list(content_ids)
+    if content_ids:
+        on_commit_once('cms.route_table.content', rebuild_route_table.delay, items=content_ids)
+
+
+def _city_path(slug: str, state: str) -> str:
+    # Paths resolved by ``SEOResolver.resolve_path``: /{program}/in-{city}-{state}/
+    return rf'^/*[^/]+/in-{re.escape(slug)}-{re.escape(state)}/*$'
+
+
+def _program_path(slug: str) -> str:
+    return rf'^/*{re.escape(slug)}/in-[a-z0-9-]+-[a-z]{{2}}/*$'
+
+
+def _content_ids(routes, paths: List[str]) -> Set[int]:
+    """Content ids of ``routes``, plus SEO content matching one of ``paths``."""
+    content_ids = set(routes.values_list('content_id', flat=True))
+    if paths:
+        matches = Q()
+        for path in paths:
+            matches |= Q(url_path__iregex=path)
+        content_ids.update(SEOContentCache.objects.filter(matches).values_list('pk', flat=True))
+    return content_ids
+
+
+def invalidate_content(content_id: int) -> None:
+    ResolvedRoute.objects.filter(content_id=content_id).delete()
+    schedule_rebuild([content_id])
+
+
+def invalidate_program(program: ProgramPage) -> None:
+    routes = ResolvedRoute.objects.filter(program_id=program.pk)
+    content_ids = _content_ids(routes, [_program_path(program.slug)])
+    routes.delete()
+    schedule_rebuild(content_ids)
+
+
+def invalidate_city(city: City, rebuild: bool = True) -> None:
+    """
+    Drop the routes of ``city``. With ``rebuild`` False the caller rebuilds
+    them (see ``cms.tasks.refresh_office_assignments``).
+    """
+    routes = ResolvedRoute.objects.filter(city_id=city.pk)
+    if not rebuild:
+        routes.delete()
+        return
+    content_ids = _content_ids(routes, [_city_path(city.slug, city.state)])
+    routes.delete()
+    schedule_rebuild(content_ids)
+
+
+def invalidate_office(office_id: int) -> None:
+    routes = ResolvedRoute.objects.filter(office_id=office_id)
+    content_ids = list(routes.values_list('content_id', flat=True))
+    routes.delete()
+    schedule_rebuild(content_ids)
@@ -1,7 +1,5 @@
 from django.http import Http404
-from django.db.models.functions import Length
-from cms.models.cities import City
-from cms.models.programs import ProgramPage
+from cms.services.slug_index import seo_slug_index
 
 class SEOResolver:
     """
@@ -10,6 +8,9 @@ class SEOResolver:
     
     Uses "Suffix Match" strategy to handle multi-hyphen cities safely.
     Example: /dscr-loan-salt-lake-city-ut/ -> Program: dscr-loan, City: salt-lake-city
+
+    Cities and programs are looked up in the in-memory ``seo_slug_index``,
+    so resolving a launched city issues no queries.
     """
     
     @classmethod
@@ -32,35 +33,28 @@ class SEOResolver:
             raise Http404("Invalid SEO URL format")
             
         state = parts[-1].upper()
-        
-        # 2. Get all cities in this state, ordered by slug length (longest first)
-        # This ensures we match "salt-lake-city" before "city"
-        cities = City.objects.filter(state=state).order_by(Length('slug').desc())
-        
-        if not cities.exists():
+        index = seo_slug_index.snapshot()
+
+        if not index.has_state(state):
             raise Http404(f"No cities found for state: {state}")
-        
-        # 3. Find the longest matching city suffix
-        for city in cities:
-            suffix = f"-{city.slug}-{state.lower()}"
-            if slug.endswith(suffix):
-                # Found match! Extract program slug
-                program_slug = slug[:-len(suffix)]
-                
-                # Validate program exists and is live
-                try:
-                    program = ProgramPage.objects.live().get(slug=program_slug)
-                except ProgramPage.DoesNotExist:
-                    raise Http404(f"Program not found: {program_slug}")
-                
-                # Check if city is launched
-                if not city.launched_at:
-                    raise Http404(f"City not yet launched: {city.name}")
-                
-                return (program, city)
-        
-        # No matching city found
-        raise Http404(f"Could not parse city from URL: {slug}")
+
+        # 2. Find the longest matching city suffix
+        # This ensures we match "salt-lake-city" before "city"
+        match = index.match(slug)
+        if match is None:
+            raise Http404(f"Could not parse city from URL: {slug}")
+
+        # Validate program exists and is live
+        program = index.program(match.program_slug)
+        if program is None:
+            raise Http404(f"Program not found: {match.program_slug}")
+
+        # Check if city is launched
+        city = index.launched_city(match.entry)
+        if city is None:
+            raise Http404(f"City not yet launched: {match.entry.name}")
+
+        return (program, city)
 
     @classmethod
     def resolve_path(cls, path):
@@ -84,8 +78,8 @@ class SEOResolver:
             state_code = match.group(3).upper()
             
             # Validation (required by tests)
-            if ProgramPage.objects.live().filter(slug=program_slug).exists() and \
-               City.objects.filter(slug=city_slug, state=state_code).exists():
+            index = seo_slug_index.snapshot()
+            if program_slug in index.programs and index.city(city_slug, state_code):
                 return program_slug, city_slug, state_code
             
         return None, None, None
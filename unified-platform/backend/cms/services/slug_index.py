@@ -0,0 +1,178 @@
+"""
+In-memory index of SEO slug suffixes.
+
+Programmatic SEO URLs end in ``-{city-slug}-{state}``. Instead of loading
+every City in the state and testing ``slug.endswith`` for each one, the
+suffixes of all cities are kept in a trie keyed by hyphen tokens from the
+right (state first), so the longest matching city is found in
+O(slug length). Launched cities and live program pages are held as tuples
+of their field values, and every lookup builds fresh instances from them,
+so resolving a launched program/city slug issues no queries and callers
+never share an instance. JSON fields are left deferred and load on access.
+
+As with the spatial indexes, the snapshot is dropped when a City or
+ProgramPage changes (see ``cms.signals``) and rebuilt lazily on the next
+lookup; other processes rebuild through a generation token in the Django
+cache. ``launch_pilot`` launches cities with a bulk ``update()`` and
+invalidates explicitly.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+logger = logging.getLogger(__name__)
+
+# Key of the CityEntry ending at a trie node (tokens are always strings)
+_CITY = None
+
+
+def _row_fields(model) -> Tuple[str, ...]:
+    """Concrete fields of ``model`` kept in the index, in model order."""
+    return tuple(
+        field.attname for field in model._meta.concrete_fields
+        if field.get_internal_type() != 'JSONField'
+    )
+
+
+class Row(NamedTuple):
+    """Field values of one model instance, as loaded by ``values_list``."""
+    model: Any
+    fields: Tuple[str, ...]
+    values: Tuple[Any, ...]
+
+    @classmethod
+    def load(cls, queryset) -> Dict[Any, 'Row']:
+        """Rows of ``queryset`` by primary key, in one query."""
+        fields = _row_fields(queryset.model)
+        pk_index = fields.index(queryset.model._meta.pk.attname)
+        return {
+            values[pk_index]: cls(queryset.model, fields, values)
+            for values in queryset.values_list(*fields)
+        }
+
+    def instance(self):
+        """A new model instance; fields not kept are deferred."""
+        return self.model.from_db(DEFAULT_DB_ALIAS, self.fields, self.values)
+
+
+class CityEntry(NamedTuple):
+    pk: int
+    name: str
+    launched: bool
+
+
+class SlugMatch(NamedTuple):
+    program_slug: str
+    entry: CityEntry
+
+
+class SlugSnapshot:
+    """Suffix trie of cities and live programs by slug at one generation."""
+
+    def __init__(self, cities, launched: Dict[int, Row], programs: Dict[Any, Row], generation: Any):
+        self.trie: Dict[Any, Any] = {}
+        self.cities: Dict[Tuple[str, str], CityEntry] = {}
+        for pk, slug, state, name, launched_at in cities:
+            entry = CityEntry(pk, name, launched_at is not None)
+            self.cities[(slug, state.upper())] = entry
+            node = self.trie
+            for token in reversed(f"{slug}-{state.lower()}".split('-')):
+                node = node.setdefault(token, {})
+            node[_CITY] = entry
+        self.launched = launched
+        self.programs: Dict[str, Row] = {
+            row.values[row.fields.index('slug')]: row for row in programs.values()
+        }
+        self.generation = generation
+        self.built_at = time.time()
+
+    def has_state(self, state: str) -> bool:
+        return state.lower() in self.trie
+
+    def match(self, slug: str) -> Optional[SlugMatch]:
+        """Longest ``-{city-slug}-{state}`` suffix of ``slug`` leaving a non-empty program slug."""
+        tokens = slug.split('-')
+        node, best = self.trie, None
+        for i in range(len(tokens) - 1, 0, -1):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if _CITY in node:
+                best = i
+                entry = node[_CITY]
+        if best is None:
+            return None
+        return SlugMatch('-'.join(tokens[:best]), entry)
+
+    def city(self, slug: str, state: str) -> Optional[CityEntry]:
+        return self.cities.get((slug, state.upper()))
+
+    def program(self, slug: str):
+        """A new instance of the live ProgramPage with ``slug``, or None."""
+        row = self.programs.get(slug)
+        return row.instance() if row is not None else None
+
+    def launched_city(self, entry: CityEntry):
+        """A new instance of the launched City of ``entry``, or None."""
+        row = self.launched.get(entry.pk) if entry.launched else None
+        return row.instance() if row is not None else None
+
+
+class SlugIndex:
+    """Process-wide, lazily built slug index. Use the ``seo_slug_index`` instance."""
+
+    generation_key = 'cms:slug_index:generation'
+
+    def __init__(self):
+        self._snapshot: Optional[SlugSnapshot] = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> SlugSnapshot:
+        """Return the current snapshot, rebuilding it if it is stale."""
+        generation = cache.get(self.generation_key)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != generation:
+                snapshot = self._build(generation)
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        """
+        Drop the index locally now and for other processes once the
+        surrounding transaction commits.
+        """
+        self._snapshot = None
+        transaction.on_commit(self._publish_generation)
+
+    def _publish_generation(self) -> None:
+        self._snapshot = None
+        cache.set(self.generation_key, time.time_ns(), timeout=None)
+
+    def _build(self, generation: Any) -> SlugSnapshot:
+        from cms.models import City, ProgramPage
+
+        started = time.perf_counter()
+        snapshot = SlugSnapshot(
+            City.objects.values_list('pk', 'slug', 'state', 'name', 'launched_at').iterator(),
+            Row.load(City.objects.filter(launched_at__isnull=False)),
+            Row.load(ProgramPage.objects.live()),
+            generation,
+        )
+        logger.info(
+            "Built SEO slug index: %d cities, %d programs in %.1fms",
+            len(snapshot.cities), len(snapshot.programs), (time.perf_counter() - started) * 1000,
+        )
+        return snapshot
+
+
+seo_slug_index = SlugIndex()
@@ -0,0 +1,255 @@
+"""
+In-memory spatial index for nearest-location queries.
+
+Coordinates of live LocationPages, Cities and active Offices are loaded once
+per process into a KD-tree over unit-sphere (x, y, z) points, so k-nearest
+and radius queries only visit nearby points instead of computing a
+haversine distance for every row. The straight-line (chord) distance
+between unit vectors orders points exactly like great-circle distance and
+converts to miles exactly, so results match a haversine scan. Each
+snapshot also keeps the model's ``CoordinateArray`` for batched distance
+kernels (see ``cms.services.geo``).
+
+As with the compiled pricing engine, an index is dropped when its model
+changes (see ``cms.signals``) and rebuilt lazily on the next query. The
+rebuild is published to other processes through a generation token in the
+Django cache.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from math import inf, pi, sin
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from cms.services.geo import EARTH_RADIUS_MILES, CoordinateArray, chord_to_miles, unit_vector
+
+logger = logging.getLogger(__name__)
+
+# (id, distance in miles)
+Hit = Tuple[int, float]
+
+
+def miles_to_chord(miles: float) -> float:
+    return 2 * sin(min(pi, max(0.0, miles) / EARTH_RADIUS_MILES) / 2)
+
+
+class KDTree:
+    """
+    Static 3-d tree over unit vectors.
+
+    Points are stored in flat coordinate lists arranged so the node for the
+    slice ``[lo, hi)`` sits at ``(lo + hi) // 2`` with its left subtree
+    before it and its right subtree after it; ``axes`` holds each node's
+    split axis (the axis of widest spread in its slice).
+    """
+
+    def __init__(self, ids: Sequence[int], points: Sequence[Tuple[float, float, float]]):
+        order = list(range(len(ids)))
+        axes = [0] * len(order)
+
+        stack = [(0, len(order))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= 1:
+                continue
+            spreads = [
+                max(points[i][axis] for i in order[lo:hi]) - min(points[i][axis] for i in order[lo:hi])
+                for axis in range(3)
+            ]
+            axis = spreads.index(max(spreads))
+            order[lo:hi] = sorted(order[lo:hi], key=lambda i: points[i][axis])
+            mid = (lo + hi) // 2
+            axes[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+        self.ids = [ids[i] for i in order]
+        self.coords = tuple([points[i][axis] for i in order] for axis in range(3))
+        self.axes = axes
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _search(self, query: Tuple[float, float, float], k: Optional[int], bound: float) -> List[Tuple[float, int]]:
+        """
+        Return (squared chord, position) of points within ``sqrt(bound)``:
+        the ``k`` closest, or all of them when ``k`` is None.
+        """
+        xs, ys, zs = self.coords
+        coords, axes = self.coords, self.axes
+        qx, qy, qz = query
+        found: List[Tuple[float, int]] = []  # max-heap by distance when k is set
+
+        stack = [(0, len(self.ids), 0.0)]
+        while stack:
+            lo, hi, plane = stack.pop()
+            if lo >= hi or plane > bound:
+                continue
+            mid = (lo + hi) >> 1
+            dx, dy, dz = xs[mid] - qx, ys[mid] - qy, zs[mid] - qz
+            d2 = dx * dx + dy * dy + dz * dz
+            if d2 <= bound:
+                if k is None:
+                    found.append((d2, mid))
+                elif len(found) < k:
+                    heapq.heappush(found, (-d2, mid))
+                    if len(found) == k:
+                        bound = -found[0][0]
+                elif d2 < -found[0][0]:
+                    heapq.heapreplace(found, (-d2, mid))
+                    bound = -found[0][0]
+
+            axis = axes[mid]
+            diff = query[axis] - coords[axis][mid]
+            if diff < 0:
+                stack.append((mid + 1, hi, diff * diff))
+                stack.append((lo, mid, 0.0))
+            else:
+                stack.append((lo, mid, diff * diff))
+                stack.append((mid + 1, hi, 0.0))
+
+        if k is not None:
+            found = [(-d2, position) for d2, position in found]
+        return found
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_miles: Optional[float] = None) -> List[Hit]:
+        """The ``k`` points closest to (lat, lon), optionally within ``max_miles``."""
+        if k <= 0 or not self.ids:
+            return []
+        bound = inf if max_miles is None else miles_to_chord(max_miles) ** 2
+        return self._hits(self._search(unit_vector(lat, lon), k, bound))
+
+    def within(self, lat: float, lon: float, miles: float) -> List[Hit]:
+        """All points within ``miles`` of (lat, lon), closest first."""
+        if not self.ids:
+            return []
+        return self._hits(self._search(unit_vector(lat, lon), None, miles_to_chord(miles) ** 2))
+
+    def _hits(self, found: Iterable[Tuple[float, int]]) -> List[Hit]:
+        ids = self.ids
+        hits = [(ids[position], chord_to_miles(d2 ** 0.5)) for d2, position in found]
+        hits.sort(key=lambda hit: (hit[1], hit[0]))
+        return hits
+
+
+class SpatialSnapshot:
+    """Coordinates and KD-tree of one model at one generation."""
+
+    def __init__(self, rows: Iterable[Tuple[int, Any, Any]], generation: Any):
+        self.coords = CoordinateArray.from_rows(rows)
+        self.tree = KDTree(self.coords.ids, self.coords.points())
+        self.generation = generation
+        self.built_at = time.time()
+
+
+class SpatialIndex:
+    """
+    Process-wide, lazily built spatial index over one model.
+
+    ``load`` returns ``(id, latitude, longitude)`` rows. Use the module-level
+    ``location_index``, ``city_index`` and ``office_index`` instances.
+    """
+
+    def __init__(self, name: str, load: Callable[[], Iterable[Tuple[int, Any, Any]]]):
+        self.name = name
+        self.load = load
+        self.generation_key = f'cms:spatial:{name}:generation'
+        self._snapshot: Optional[SpatialSnapshot] = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> SpatialSnapshot:
+        """Return the current snapshot, rebuilding it if it is stale."""
+        generation = cache.get(self.generation_key)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != generation:
+                snapshot = self._build(generation)
+                self._snapshot = snapshot
+        return snapshot
+
+    def rebuild(self) -> SpatialSnapshot:
+        """Force a rebuild from the database and return the new snapshot."""
+        with self._lock:
+            self._snapshot = self._build(cache.get(self.generation_key))
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        """
+        Drop the index.
+
+        The local snapshot is discarded immediately; the shared generation
+        token is bumped once the surrounding transaction commits so other
+        processes do not rebuild from uncommitted data.
+        """
+        self._snapshot = None
+        transaction.on_commit(self._publish_generation)
+
+    def _publish_generation(self) -> None:
+        self._snapshot = None
+        cache.set(self.generation_key, time.time_ns(), timeout=None)
+
+    def _build(self, generation: Any) -> SpatialSnapshot:
+        started = time.perf_counter()
+        snapshot = SpatialSnapshot(self.load(), generation)
+        logger.info(
+            "Built %s spatial index: %d points in %.1fms",
+            self.name, len(snapshot.tree), (time.perf_counter() - started) * 1000,
+        )
+        return snapshot
+
+    def nearest(self, lat: float, lon: float, k: int = 1, max_miles: Optional[float] = None) -> List[Hit]:
+        """(id, miles) of the ``k`` nearest points, closest first."""
+        return self.snapshot().tree.nearest(float(lat), float(lon), k, max_miles)
+
+    def within(self, lat: float, lon: float, miles: float) -> List[Hit]:
+        """(id, miles) of every point within ``miles``, closest first."""
+        return self.snapshot().tree.within(float(lat), float(lon), miles)
+
+
+def resolve(queryset, hits: List[Hit]) -> List[Tuple[Any, float]]:
+    """
+    Fetch the objects for ``hits`` in one query, keeping their order.
+
+    Ids missing from ``queryset`` (deleted, unpublished or filtered out
+    since the index was built) are skipped.
+    """
+    objects = queryset.in_bulk([pk for pk, _ in hits])
+    return [(objects[pk], distance) for pk, distance in hits if pk in objects]
+
+
+def _location_page_rows():
+    from cms.models import LocationPage
+
+    return LocationPage.objects.live().filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).values_list('id', 'latitude', 'longitude')
+
+
+def _city_rows():
+    from cms.models import City
+
+    return City.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).values_list('id', 'latitude', 'longitude')
+
+
+def _office_rows():
+    from cms.models import Office
+
+    return Office.objects.active().filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).values_list('id', 'latitude', 'longitude')
+
+
+location_index = SpatialIndex('location_page', _location_page_rows)
+city_index = SpatialIndex('city', _city_rows)
+office_index = SpatialIndex('office', _office_rows)
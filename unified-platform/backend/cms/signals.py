@@ -0,0 +1,94 @@
+"""
+Signal handlers for the cms app.
+
+Saving or deleting a model held in an in-memory spatial index drops that
+index, so the next nearest-location query sees fresh coordinates. Changes
+that can move materialized city -> office assignments (a new or moved
+city; an office's location, active or headquarters flags) queue a
+recompute in Celery. City and ProgramPage changes drop the SEO slug index.
+
+The router's denormalized routes are dropped when their SEO content,
+program, city or office changes, and rebuilt by a Celery task after commit.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from wagtail.signals import page_published, page_unpublished
+
+from cms.models import City, LocationPage, Office, ProgramPage, SEOContentCache
+from cms.services import office_assignment, route_table
+from cms.services.slug_index import seo_slug_index
+from cms.services.spatial_index import city_index, location_index, office_index
+
+
+@receiver(post_save, sender=LocationPage)
+@receiver(post_delete, sender=LocationPage)
+@receiver(page_published, sender=LocationPage)
+@receiver(page_unpublished, sender=LocationPage)
+def invalidate_location_index(sender, **kwargs):
+    location_index.invalidate()
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def invalidate_city_index(sender, **kwargs):
+    city_index.invalidate()
+
+
+@receiver(pre_save, sender=City)
+def track_city_assignment_fields(sender, instance, update_fields=None, **kwargs):
+    instance._affects_assignment = office_assignment.city_moved(instance, update_fields)
+
+
+@receiver(post_save, sender=City)
+def invalidate_city_office_assignment(sender, instance, **kwargs):
+    if getattr(instance, '_affects_assignment', True):
+        office_assignment.invalidate_city(instance.pk)
+
+
+@receiver(pre_save, sender=Office)
+def track_office_assignment_fields(sender, instance, update_fields=None, **kwargs):
+    instance._affects_assignments = office_assignment.affects_assignments(instance, update_fields)
+
+
+@receiver(post_save, sender=Office)
+def invalidate_office(sender, instance, **kwargs):
+    if getattr(instance, '_affects_assignments', True):
+        office_index.invalidate()
+        office_assignment.invalidate_all()
+    else:
+        route_table.invalidate_office(instance.pk)
+
+
+@receiver(post_delete, sender=Office)
+def invalidate_deleted_office(sender, **kwargs):
+    office_index.invalidate()
+    office_assignment.invalidate_all()
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=ProgramPage)
+@receiver(post_delete, sender=ProgramPage)
+@receiver(page_published, sender=ProgramPage)
+@receiver(page_unpublished, sender=ProgramPage)
+def invalidate_slug_index(sender, **kwargs):
+    seo_slug_index.invalidate()
+
+
+@receiver(post_save, sender=SEOContentCache)
+def invalidate_content_routes(sender, instance, **kwargs):
+    route_table.invalidate_content(instance.pk)
+
+
+@receiver(post_save, sender=City)
+def invalidate_city_routes(sender, instance, **kwargs):
+    # A new or moved city's routes are rebuilt with its office assignment
+    route_table.invalidate_city(instance, rebuild=not getattr(instance, '_affects_assignment', True))
+
+
+@receiver(post_save, sender=ProgramPage)
+@receiver(page_published, sender=ProgramPage)
+@receiver(page_unpublished, sender=ProgramPage)
+def invalidate_program_routes(sender, instance, **kwargs):
+    route_table.invalidate_program(instance)
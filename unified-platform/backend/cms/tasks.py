@@ -0,0 +1,32 @@
+from celery import shared_task
+import logging
+
+from .services import office_assignment, route_table
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_office_assignments(city_ids=None):
+    """
+    Celery task to recompute the nearest office of ``city_ids`` (new or
+    moved cities), or of every city after offices moved, were
+    (de)activated or changed headquarters, then rebuild the router routes
+    of those cities.
+    """
+    count = office_assignment.refresh_assignments(city_ids)
+    logger.info(f"Refreshed {count} city office assignments")
+    if city_ids is None:
+        route_table.rebuild_routes()
+    else:
+        route_table.rebuild_city_routes(city_ids)
+    return count
+
+
+@shared_task
+def rebuild_route_table(content_ids=None):
+    """
+    Celery task to (re)build the router routes of the given SEO content
+    entries, or of all of them.
+    """
+    return route_table.rebuild_routes(content_ids)
@@ -0,0 +1,61 @@
+import random
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from cms.services.geo import (
+    EARTH_RADIUS_KM,
+    CoordinateArray,
+    distance_matrix,
+    distances_from,
+    haversine,
+)
+from cms.services.location_mapper import DistanceCalculator
+
+
+class GeoKernelTest(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(11)
+        self.rows = [
+            (i, Decimal(f"{rng.uniform(25, 49):.6f}"), Decimal(f"{rng.uniform(-124, -67):.6f}"))
+            for i in range(500)
+        ]
+        self.coords = CoordinateArray.from_rows(self.rows)
+
+    def test_haversine_known_distance(self):
+        self.assertAlmostEqual(haversine(34.0522, -118.2437, 37.7749, -122.4194), 347.44, places=2)
+        self.assertEqual(haversine(34.0, -118.0, 34.0, -118.0), 0.0)
+
+    def test_one_to_many_matches_scalar(self):
+        distances = distances_from(34.05, -118.24, self.coords)
+
+        self.assertEqual(len(distances), len(self.rows))
+        for (_, lat, lon), distance in zip(self.rows, distances):
+            self.assertAlmostEqual(distance, haversine(34.05, -118.24, lat, lon), places=6)
+
+    def test_many_to_many_matches_scalar(self):
+        origins = CoordinateArray.from_rows(self.rows[:3])
+        matrix = distance_matrix(origins, self.coords, EARTH_RADIUS_KM)
+
+        self.assertEqual(len(matrix), 3)
+        for (_, o_lat, o_lon), row in zip(self.rows[:3], matrix):
+            for (_, lat, lon), distance in zip(self.rows, row):
+                self.assertAlmostEqual(distance, haversine(o_lat, o_lon, lat, lon, EARTH_RADIUS_KM), places=6)
+
+    def test_rows_without_coordinates_are_skipped(self):
+        coords = CoordinateArray.from_rows([(1, None, Decimal("-118")), (2, Decimal("34"), Decimal("-118"))])
+        self.assertEqual(coords.ids, [2])
+
+    def test_find_nearest_locations_uses_batched_distances(self):
+        locations = [
+            {'city': 'San Francisco', 'latitude': 37.7749, 'longitude': -122.4194},
+            {'city': 'Los Angeles', 'latitude': 34.0522, 'longitude': -118.2437},
+            {'city': 'New York', 'latitude': 40.7128, 'longitude': -74.0060},
+        ]
+
+        nearest = DistanceCalculator.find_nearest_locations(35.0, -120.0, locations, max_distance=500)
+
+        self.assertEqual([loc['city'] for loc, _ in nearest], ['Los Angeles', 'San Francisco'])
+        self.assertAlmostEqual(
+            nearest[0][1], DistanceCalculator.haversine_distance(35.0, -120.0, 34.0522, -118.2437), places=6
+        )
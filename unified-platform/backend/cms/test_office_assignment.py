@@ -0,0 +1,147 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from celery import current_app
+from django.test import TestCase
+
+from cms.models import City, CityOfficeAssignment, Office
+from cms.services import office_assignment
+from cms.services.proximity import ProximityService
+from cms.services.spatial_index import office_index
+from cms.tasks import refresh_office_assignments
+
+
+class OfficeAssignmentTest(TestCase):
+    def setUp(self):
+        eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', eager)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.la_office = Office.objects.create(
+                name="LA Office", city="Los Angeles", state="CA",
+                latitude=Decimal("34.05"), longitude=Decimal("-118.24"),
+            )
+            self.hq = Office.objects.create(
+                name="HQ", city="New York", state="NY",
+                latitude=Decimal("40.71"), longitude=Decimal("-74.00"), is_headquarters=True,
+            )
+            self.santa_monica = self._city("Santa Monica", "34.0195", "-118.4912")
+            self.denver = self._city("Denver", "39.7392", "-104.9903")
+        # Each test starts from no stored assignments
+        CityOfficeAssignment.objects.all().delete()
+
+    def _city(self, name, lat, lon):
+        return City.objects.create(
+            name=name, state="CA", state_name="California", slug=name.lower().replace(" ", "-"),
+            latitude=Decimal(lat), longitude=Decimal(lon),
+        )
+
+    def test_refresh_assigns_nearest_office_or_headquarters(self):
+        self.assertEqual(office_assignment.refresh_assignments(), 2)
+
+        nearby = CityOfficeAssignment.objects.get(city=self.santa_monica)
+        self.assertEqual(nearby.office, self.la_office)
+        self.assertFalse(nearby.is_fallback)
+        self.assertLess(nearby.distance_miles, 20)
+
+        remote = CityOfficeAssignment.objects.get(city=self.denver)
+        self.assertEqual(remote.office, self.hq)
+        self.assertTrue(remote.is_fallback)
+
+    def test_lookup_reads_the_joined_assignment(self):
+        office_assignment.refresh_assignments()
+        city = City.objects.select_related('office_assignment__office').get(pk=self.santa_monica.pk)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(office_assignment.assigned_office(city), self.la_office)
+
+    def test_missing_assignment_is_computed_without_storing(self):
+        office_index.snapshot()
+
+        # Per city: the assignment lookup, then the computed office
+        with self.assertNumQueries(4):
+            self.assertEqual(ProximityService.find_nearest_office(self.santa_monica), self.la_office)
+            self.assertEqual(ProximityService.find_nearest_office(self.denver), self.hq)
+        self.assertFalse(CityOfficeAssignment.objects.exists())
+
+        self.assertEqual(
+            office_assignment.offices_for([self.santa_monica, self.denver]),
+            {self.santa_monica.pk: self.la_office, self.denver.pk: self.hq},
+        )
+        self.assertFalse(CityOfficeAssignment.objects.exists())
+
+    def test_offices_for_is_query_bounded(self):
+        office_assignment.refresh_assignments()
+        cities = [self.santa_monica, self.denver]
+
+        with self.assertNumQueries(1):
+            offices = office_assignment.offices_for(cities)
+        self.assertEqual(offices, {self.santa_monica.pk: self.la_office, self.denver.pk: self.hq})
+
+    def test_office_change_recomputes_assignments(self):
+        office_assignment.refresh_assignments()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Office.objects.create(
+                name="Denver Office", city="Denver", state="CO",
+                latitude=Decimal("39.74"), longitude=Decimal("-104.99"),
+            )
+
+        self.assertEqual(CityOfficeAssignment.objects.count(), 2)
+        self.assertEqual(CityOfficeAssignment.objects.get(city=self.denver).office.name, "Denver Office")
+
+    def test_office_move_queues_one_refresh_per_transaction(self):
+        office_assignment.refresh_assignments()
+
+        with patch('cms.tasks.refresh_office_assignments.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.hq.latitude = Decimal("39.74")
+                self.hq.longitude = Decimal("-104.99")
+                self.hq.save()
+                self.la_office.is_active = False
+                self.la_office.save()
+
+        delay.assert_called_once_with()
+        # Existing assignments are served until the task replaces them
+        self.assertEqual(CityOfficeAssignment.objects.count(), 2)
+
+    def test_office_edit_outside_assignment_fields_keeps_assignments(self):
+        office_assignment.refresh_assignments()
+
+        with patch('cms.tasks.refresh_office_assignments.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.la_office.name = "Downtown LA"
+                self.la_office.latitude = "34.05"
+                self.la_office.save()
+                self.hq.save(update_fields=['phone'])
+
+        delay.assert_not_called()
+        self.assertEqual(CityOfficeAssignment.objects.count(), 2)
+
+    def test_city_move_refreshes_its_assignment_after_commit(self):
+        office_assignment.refresh_assignments()
+
+        with patch('cms.tasks.refresh_office_assignments.delay', wraps=refresh_office_assignments.delay) as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.santa_monica.latitude = Decimal("40.7128")
+                self.santa_monica.longitude = Decimal("-74.0060")
+                self.santa_monica.save()
+                self.denver.save(update_fields=['population'])
+                oakland = self._city("Oakland", "37.80", "-122.27")
+                self.assertEqual(ProximityService.find_nearest_office(self.santa_monica), self.la_office)
+
+        delay.assert_called_once_with(sorted([self.santa_monica.pk, oakland.pk]))
+        self.assertEqual(ProximityService.find_nearest_office(self.santa_monica), self.hq)
+        self.assertEqual(CityOfficeAssignment.objects.get(city=oakland).office, self.la_office)
+
+    def test_city_edit_outside_its_coordinates_keeps_the_assignment(self):
+        office_assignment.refresh_assignments()
+
+        with patch('cms.tasks.refresh_office_assignments.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.santa_monica.name = "Santa Monica Beach"
+                self.santa_monica.latitude = "34.0195"
+                self.santa_monica.save()
+
+        delay.assert_not_called()
+        self.assertTrue(CityOfficeAssignment.objects.filter(city=self.santa_monica).exists())
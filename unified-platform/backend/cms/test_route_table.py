@@ -0,0 +1,197 @@
+import io
+import os
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+
+from celery import current_app
+from django.core.management import call_command
+from django.test import TestCase
+from wagtail.models import Page
+
+from cms.models import City, Office, ProgramPage, ResolvedRoute, SEOContentCache
+from cms.services import route_table
+
+
+class RouteTableTest(TestCase):
+    path = "/jumbo-loans/in-los-angeles-ca/"
+
+    def setUp(self):
+        eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, 'task_always_eager', eager)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.program = ProgramPage(title="Jumbo Loans", slug="jumbo-loans", interest_rates="6.25-7.50%")
+            Page.get_first_root_node().add_child(instance=self.program)
+            self.city = City.objects.create(
+                name="Los Angeles", state="CA", state_name="California",
+                slug="los-angeles", latitude=Decimal("34.05"), longitude=Decimal("-118.24"),
+            )
+            self.office = Office.objects.create(
+                name="LA Branch", city="Los Angeles", state="CA",
+                latitude=Decimal("34.05"), longitude=Decimal("-118.24"),
+            )
+            self.content = SEOContentCache.objects.create(
+                url_path=self.path, title_tag="Jumbo Loans in LA", h1_header="Jumbo Rates LA",
+                meta_description="Best rates", content_body="<div>Content</div>",
+            )
+        # Each test starts from an empty route table
+        ResolvedRoute.objects.all().delete()
+
+    def _resolve(self, path=None):
+        return self.client.get('/api/v1/router/resolve', {'path': path or self.path})
+
+    def _other_route(self):
+        return ResolvedRoute.objects.create(
+            url_path="/jumbo-loans/in-other-ca/", content=self.content,
+            program=self.program, city=self.city, office=None, payload={},
+        )
+
+    def test_get_reads_the_route_without_writing(self):
+        first = self._resolve()
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse(ResolvedRoute.objects.exists())
+
+        route_table.rebuild_routes()
+        with self.assertNumQueries(1):
+            second = self._resolve()
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.data['data']['location']['office']['name'], "LA Branch")
+        self.assertEqual(second.data['data']['program']['rates'], "6.25-7.50%")
+
+    def test_lookup_serves_only_the_exact_content_path(self):
+        route_table.rebuild_routes()
+
+        response = self._resolve("/Jumbo-Loans/in-los-angeles-ca")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_content_and_city_changes_rebuild_the_route(self):
+        route_table.rebuild_routes()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.content.h1_header = "New Jumbo Rates"
+            self.content.save()
+            self.assertFalse(ResolvedRoute.objects.exists())
+        self.assertEqual(ResolvedRoute.objects.get().payload['data']['h1'], "New Jumbo Rates")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.city.name = "LA"
+            self.city.save()
+        self.assertEqual(self._resolve().data['data']['location']['city'], "LA")
+        self.assertEqual(ResolvedRoute.objects.get().payload['data']['location']['city'], "LA")
+
+    def test_city_edits_rebuild_only_their_content_once(self):
+        route_table.rebuild_routes()
+
+        with patch('cms.tasks.rebuild_route_table.delay') as rebuild, self.captureOnCommitCallbacks(execute=True):
+            for population in range(10):
+                self.city.population = population
+                self.city.save()
+
+        rebuild.assert_called_once_with([self.content.pk])
+
+    def test_city_move_rebuilds_its_routes_with_the_new_assignment(self):
+        route_table.rebuild_routes()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            downtown = Office.objects.create(
+                name="Downtown", city="Los Angeles", state="CA",
+                latitude=Decimal("34.10"), longitude=Decimal("-118.30"),
+            )
+        with patch('cms.tasks.rebuild_route_table.delay') as rebuild, self.captureOnCommitCallbacks(execute=True):
+            self.city.latitude = Decimal("34.10")
+            self.city.longitude = Decimal("-118.30")
+            self.city.save()
+
+        rebuild.assert_not_called()
+        self.assertEqual(ResolvedRoute.objects.get().office, downtown)
+
+    def test_new_content_is_built_after_commit(self):
+        path = "/jumbo-loans/in-los-angeles-ca/rates/"
+        with self.captureOnCommitCallbacks(execute=True):
+            SEOContentCache.objects.create(url_path=path, title_tag="Rates", h1_header="Rates")
+
+        # Only the new entry is built; its path does not resolve to a route
+        self.assertFalse(ResolvedRoute.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.content.save()
+        self.assertEqual(ResolvedRoute.objects.get().url_path, self.path)
+
+    def test_office_rename_rebuilds_its_routes(self):
+        route_table.rebuild_routes()
+        other = self._other_route()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.office.name = "Downtown LA"
+            self.office.save()
+            self.assertEqual(list(ResolvedRoute.objects.all()), [other])
+
+        route = ResolvedRoute.objects.get(url_path=self.path)
+        self.assertEqual(route.payload['data']['location']['office']['name'], "Downtown LA")
+
+    def test_office_move_rebuilds_routes_after_commit(self):
+        route_table.rebuild_routes()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.office.latitude = Decimal("40.71")
+            self.office.longitude = Decimal("-74.00")
+            self.office.save()
+            downtown = Office.objects.create(
+                name="Downtown", city="Los Angeles", state="CA",
+                latitude=Decimal("34.05"), longitude=Decimal("-118.24"),
+            )
+            self.assertEqual(ResolvedRoute.objects.get().office, self.office)
+
+        self.assertEqual(ResolvedRoute.objects.get().office, downtown)
+        self.assertEqual(self._resolve().data['data']['location']['office']['name'], "Downtown")
+
+    def test_unpublished_program_is_not_served(self):
+        route_table.rebuild_routes()
+
+        self.program.unpublish()
+
+        self.assertFalse(ResolvedRoute.objects.exists())
+        self.assertEqual(self._resolve().status_code, 404)
+
+    def test_republished_program_rebuilds_its_content(self):
+        route_table.rebuild_routes()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.program.unpublish()
+        self.assertFalse(ResolvedRoute.objects.exists())
+
+        with patch('cms.tasks.rebuild_route_table.delay', wraps=route_table.rebuild_routes) as rebuild, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.program.save_revision().publish()
+
+        rebuild.assert_called_once_with([self.content.pk])
+        self.assertEqual(self._resolve().status_code, 200)
+
+    def test_import_cities_queues_one_rebuild(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("city,state_id,state_name,lat,lng,population\n")
+            f.write("San Diego,CA,California,32.72,-117.16,1386932\n")
+            f.write("Fresno,CA,California,36.74,-119.79,542107\n")
+        self.addCleanup(os.remove, f.name)
+
+        with patch('cms.tasks.rebuild_route_table.delay') as rebuild, \
+                patch('cms.tasks.refresh_office_assignments.delay') as refresh:
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    call_command('import_cities', f.name, stdout=io.StringIO())
+
+        self.assertEqual(rebuild.call_args_list, [(), ()])
+        refresh.assert_not_called()
+        self.assertEqual(City.objects.filter(slug__in=["san-diego-ca", "fresno-ca"]).count(), 2)
+        self.assertEqual(City.objects.get(slug="fresno-ca").office_assignment.office, self.office)
+
+    def test_rebuild_command(self):
+        out = io.StringIO()
+        call_command('rebuild_route_table', stdout=out)
+
+        self.assertIn("Built 1 routes", out.getvalue())
+        self.assertEqual(ResolvedRoute.objects.get().payload['data']['title'], "Jumbo Loans in LA")
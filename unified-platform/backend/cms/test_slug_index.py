@@ -0,0 +1,82 @@
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.http import Http404
+from django.test import TestCase
+from django.utils import timezone
+from wagtail.models import Page
+
+from cms.models import City, ProgramPage
+from cms.services.seo_resolver import SEOResolver
+from cms.services.slug_index import seo_slug_index
+
+
+class SlugIndexResolveTest(TestCase):
+    def setUp(self):
+        root = Page.get_first_root_node()
+        self.program = ProgramPage(title="DSCR Loan", slug="dscr-loan")
+        root.add_child(instance=self.program)
+
+        self.salt_lake = self._city("Salt Lake City", "salt-lake-city", launched=True)
+        self.city = self._city("City", "city", launched=True)
+        self.provo = self._city("Provo", "provo", priority=100)
+
+    def _city(self, name, slug, launched=False, priority=999):
+        return City.objects.create(
+            name=name, state="UT", state_name="Utah", slug=slug, priority=priority,
+            latitude=Decimal("40.76"), longitude=Decimal("-111.89"),
+            launched_at=timezone.now() if launched else None,
+        )
+
+    def test_longest_city_suffix_wins_without_queries(self):
+        seo_slug_index.snapshot()
+
+        with self.assertNumQueries(0):
+            program, city = SEOResolver.resolve_slug("dscr-loan-salt-lake-city-ut")
+
+        self.assertEqual(program.pk, self.program.pk)
+        self.assertEqual(city, self.salt_lake)
+
+    def test_resolution_errors(self):
+        for slug, message in (
+            ("dscr-loan-salt-lake-city-zz", "No cities found"),
+            ("dscr-loan-ogden-ut", "Could not parse city"),
+            ("jumbo-loans-salt-lake-city-ut", "Program not found"),
+            ("dscr-loan-provo-ut", "City not yet launched"),
+        ):
+            with self.subTest(slug=slug), self.assertRaisesMessage(Http404, message):
+                SEOResolver.resolve_slug(slug)
+
+    def test_launch_refreshes_index(self):
+        with self.assertRaisesMessage(Http404, "City not yet launched"):
+            SEOResolver.resolve_slug("dscr-loan-provo-ut")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('launch_pilot', stdout=io.StringIO())
+
+        self.assertEqual(SEOResolver.resolve_slug("dscr-loan-provo-ut")[1], self.provo)
+
+    def test_new_city_and_unpublished_program(self):
+        self._city("Ogden", "ogden", launched=True)
+        self.assertEqual(SEOResolver.resolve_slug("dscr-loan-ogden-ut")[1].name, "Ogden")
+
+        self.program.unpublish()
+        with self.assertRaisesMessage(Http404, "Program not found"):
+            SEOResolver.resolve_slug("dscr-loan-ogden-ut")
+
+    def test_every_lookup_builds_new_instances(self):
+        index = seo_slug_index.snapshot()
+        self.assertEqual(index.city("salt-lake-city", "ut"), (self.salt_lake.pk, "Salt Lake City", True))
+        self.assertFalse(index.city("provo", "UT").launched)
+
+        program, city = SEOResolver.resolve_slug("dscr-loan-city-ut")
+        city.name = "Changed"
+        program.title = "Changed"
+
+        again_program, again_city = SEOResolver.resolve_slug("dscr-loan-city-ut")
+        self.assertIsNot(again_city, city)
+        self.assertEqual((again_program.title, again_city.name), ("DSCR Loan", "City"))
+        self.assertEqual(again_city.launched_at, self.city.launched_at)
+        # JSON fields are deferred and load from the row on access
+        self.assertEqual(again_program.faq, ProgramPage.objects.get(pk=self.program.pk).faq)
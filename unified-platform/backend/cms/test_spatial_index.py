@@ -0,0 +1,117 @@
+import random
+from decimal import Decimal
+
+from django.test import TestCase
+from wagtail.models import Page
+
+from cms.models import City, LocationIndexPage, LocationPage, Office
+from cms.services.proximity import ProximityService
+from cms.services.spatial_index import KDTree, city_index, unit_vector
+
+
+class KDTreeTest(TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.points = [(rng.uniform(25, 49), rng.uniform(-124, -67)) for _ in range(2000)]
+        self.tree = KDTree(list(range(len(self.points))), [unit_vector(*p) for p in self.points])
+        self.queries = [(rng.uniform(25, 49), rng.uniform(-124, -67)) for _ in range(25)]
+
+    def _brute_force(self, lat, lon):
+        return sorted(
+            (ProximityService.haversine_distance(lat, lon, *point), pk)
+            for pk, point in enumerate(self.points)
+        )
+
+    def test_nearest_matches_haversine_scan(self):
+        for lat, lon in self.queries:
+            expected = self._brute_force(lat, lon)[:5]
+            hits = self.tree.nearest(lat, lon, k=5)
+            self.assertEqual([pk for pk, _ in hits], [pk for _, pk in expected])
+            for (_, miles), (distance, _) in zip(hits, expected):
+                self.assertAlmostEqual(miles, distance, places=6)
+
+    def test_radius_query_matches_haversine_scan(self):
+        for lat, lon in self.queries:
+            expected = [pk for distance, pk in self._brute_force(lat, lon) if distance <= 60]
+            self.assertEqual([pk for pk, _ in self.tree.within(lat, lon, 60)], expected)
+
+    def test_nearest_respects_max_distance(self):
+        lat, lon = self.queries[0]
+        expected = [pk for distance, pk in self._brute_force(lat, lon) if distance <= 30][:10]
+        self.assertEqual([pk for pk, _ in self.tree.nearest(lat, lon, k=10, max_miles=30)], expected)
+
+    def test_empty_tree_and_large_k(self):
+        self.assertEqual(KDTree([], []).nearest(34.0, -118.0, k=3), [])
+        self.assertEqual(len(self.tree.nearest(34.0, -118.0, k=5000)), len(self.points))
+
+
+class SpatialIndexRefreshTest(TestCase):
+    def _city(self, name, lat, lon):
+        return City.objects.create(
+            name=name, state="CA", state_name="California", slug=name.lower(),
+            latitude=Decimal(lat), longitude=Decimal(lon),
+        )
+
+    def test_index_is_refreshed_on_save_and_delete(self):
+        los_angeles = self._city("LosAngeles", "34.0522", "-118.2437")
+        self.assertEqual([pk for pk, _ in city_index.nearest(34.02, -118.49)], [los_angeles.pk])
+
+        santa_monica = self._city("SantaMonica", "34.0195", "-118.4912")
+        self.assertEqual(ProximityService.get_nearest_cities(34.02, -118.49, limit=1), [santa_monica])
+
+        santa_monica.latitude = Decimal("40.7128")
+        santa_monica.longitude = Decimal("-74.0060")
+        santa_monica.save()
+        self.assertEqual(ProximityService.get_nearest_cities(34.02, -118.49, limit=1), [los_angeles])
+
+        los_angeles.delete()
+        self.assertEqual(ProximityService.get_nearest_cities(34.02, -118.49, limit=1), [santa_monica])
+
+    def test_nearest_office_falls_back_to_headquarters_beyond_500_miles(self):
+        la_office = Office.objects.create(
+            name="LA Office", city="Los Angeles", state="CA",
+            latitude=Decimal("34.05"), longitude=Decimal("-118.24"),
+        )
+        hq = Office.objects.create(
+            name="HQ", city="New York", state="NY",
+            latitude=Decimal("40.71"), longitude=Decimal("-74.00"), is_headquarters=True,
+        )
+        Office.objects.create(
+            name="Closed Office", city="Santa Monica", state="CA",
+            latitude=Decimal("34.02"), longitude=Decimal("-118.49"), is_active=False,
+        )
+
+        self.assertEqual(ProximityService.find_nearest_office(self._city("SantaMonica", "34.0195", "-118.4912")), la_office)
+        self.assertEqual(ProximityService.find_nearest_office(self._city("Denver", "39.7392", "-104.9903")), hq)
+
+
+class LocationNearestApiTest(TestCase):
+    def setUp(self):
+        index = LocationIndexPage(title="Locations", slug="locations")
+        Page.get_first_root_node().add_child(instance=index)
+        self.pages = {}
+        for city, lat, lon in (
+            ("Los Angeles", "34.0522", "-118.2437"),
+            ("San Diego", "32.7157", "-117.1611"),
+            ("Seattle", "47.6062", "-122.3321"),
+        ):
+            page = LocationPage(
+                title=f"{city}, CA", city=city, state="CA", address="1 Main St",
+                latitude=Decimal(lat), longitude=Decimal(lon),
+            )
+            index.add_child(instance=page)
+            self.pages[city] = page
+
+    def test_returns_nearest_live_locations_within_distance(self):
+        response = self.client.get('/api/v1/locations/nearest', {'lat': 34.0, 'lng': -118.0, 'max_distance': 200})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([loc['city'] for loc in response.data['locations']], ["Los Angeles", "San Diego"])
+        self.assertLess(response.data['locations'][0]['distance_miles'], 20)
+
+    def test_unpublished_location_is_excluded(self):
+        self.pages["Los Angeles"].unpublish()
+
+        response = self.client.get('/api/v1/locations/nearest', {'lat': 34.0, 'lng': -118.0, 'limit': 1})
+
+        self.assertEqual([loc['city'] for loc in response.data['locations']], ["San Diego"])
@@ -5,6 +5,7 @@ from cms.services.seo_resolver import SEOResolver
 from cms.models.seo import SEOContentCache
 from cms.models.programs import ProgramPage
 from cms.models.cities import City
+from cms.services import route_table
 from cms.services.location_mapper import LocationMapper
 from cms.services.schema_generator import SchemaGenerator
 
@@ -17,7 +18,12 @@ def resolve_path(request):
     path = request.query_params.get('path')
     if not path:
         return Response({'error': 'Path parameter required'}, status=status.HTTP_400_BAD_REQUEST)
-        
+
+    # 0. Precomputed route (one indexed lookup)
+    payload = route_table.lookup(path)
+    if payload is not None:
+        return Response(payload)
+
     # 1. Try SEOResolver (Program + Location)
     program_slug, city_slug, state_code = SEOResolver.resolve_path(path)
     
@@ -32,38 +38,15 @@ def resolve_path(request):
                 
             # Fetch Context Data
             program = ProgramPage.objects.get(slug=program_slug)
-            city = City.objects.get(slug=city_slug, state=state_code)
+            city = City.objects.select_related('office_assignment__office').get(
+                slug=city_slug, state=state_code
+            )
             
-            # Map Office
+            # Map Office (precomputed assignment, joined above)
             office = LocationMapper.get_closest_office(city)
-            office_data = {}
-            if office:
-                office_data = {
-                    'name': office.name,
-                    'address': f"{office.city}, {office.state}", # Simplified
-                    'phone': getattr(office, 'phone', '555-0123') # fallback
-                }
 
-            return Response({
-                'type': 'program_location',
-                'data': {
-                    'title': cache.title_tag,
-                    'h1': cache.h1_header,
-                    'meta_description': cache.meta_description,
-                    'content': cache.content_body,
-                    'schema': cache.schema_json,
-                    'program': {
-                        'title': program.title,
-                        'slug': program.slug,
-                        'rates': program.interest_rates
-                    },
-                    'location': {
-                        'city': city.name,
-                        'state': city.state,
-                        'office': office_data
-                    }
-                }
-            })
+            # Routes are stored by rebuild_routes; a GET only reads
+            return Response(route_table.build_payload(cache, program, city, office))
             
         except (ProgramPage.DoesNotExist, City.DoesNotExist):
              return Response({'error': 'Resource missing'}, status=status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,49 @@
+"""
+Bitmask helpers for column-oriented eligibility indexes.
+
+Bit ``i`` of a mask stands for the ``i``-th row of whatever the caller
+indexes (compiled offerings in ``pricing``, loan programs in ``loans``), so
+range and choice predicates combine with ``&``.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import List
+
+
+class ThresholdColumn:
+    """
+    Sorted numeric column answering one-sided range predicates as bitmasks.
+
+    ``lower`` columns hold minimums and answer ``threshold <= x``; the
+    others hold maximums and answer ``x <= threshold``. Each query is a
+    single bisect into precomputed prefix/suffix masks.
+    """
+
+    __slots__ = ('values', 'masks', 'lower')
+
+    def __init__(self, values: List[float], lower: bool):
+        order = sorted(range(len(values)), key=values.__getitem__)
+        self.values = [values[i] for i in order]
+        self.lower = lower
+
+        masks = [0] * (len(order) + 1)
+        if lower:
+            for k, i in enumerate(order):
+                masks[k + 1] = masks[k] | (1 << i)
+        else:
+            for k in range(len(order) - 1, -1, -1):
+                masks[k] = masks[k + 1] | (1 << order[k])
+        self.masks = masks
+
+    def mask(self, x: float) -> int:
+        if self.lower:
+            return self.masks[bisect_right(self.values, x)]
+        return self.masks[bisect_left(self.values, x)]
+
+
+def iter_mask(mask: int):
+    """Yield the set bit positions of ``mask`` in ascending order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
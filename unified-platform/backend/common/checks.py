@@ -0,0 +1,31 @@
+"""
+System checks for settings shared across apps.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose contents are private to one process
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Outside DEBUG the default cache must be shared between processes:
+    snapshot generation tokens published by Celery tasks are read from it
+    by every web worker.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            f"The default cache ({backend}) is local to each process.",
+            hint="Set CACHE_URL to a Redis URL so cache invalidation reaches every worker.",
+            id='common.E001',
+        )
+    ]
@@ -1,3 +1,57 @@
-from django.test import TestCase
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
 
-# Create your tests here.
+from common.bitmask import ThresholdColumn, iter_mask
+from common.transactions import on_commit_once
+
+
+class BitmaskTest(SimpleTestCase):
+    def test_threshold_columns(self):
+        minimums = ThresholdColumn([620, 700, 660], lower=True)
+        maximums = ThresholdColumn([80.0, 75.0, 90.0], lower=False)
+
+        self.assertEqual(list(iter_mask(minimums.mask(680))), [0, 2])
+        self.assertEqual(list(iter_mask(maximums.mask(80.0))), [0, 2])
+        self.assertEqual(minimums.mask(600), 0)
+
+    def test_iter_mask_is_ascending(self):
+        self.assertEqual(list(iter_mask(0b101001)), [0, 3, 5])
+        self.assertEqual(list(iter_mask(0)), [])
+
+
+class OnCommitOnceTest(TestCase):
+    def test_requests_are_merged_per_transaction(self):
+        calls = []
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            on_commit_once('rebuild', lambda: calls.append('all'))
+            on_commit_once('rebuild', lambda: calls.append('again'))
+            on_commit_once('cities', calls.append, items=[3, 1])
+            on_commit_once('cities', calls.append, items=[1, 2])
+
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(calls, ['all', [1, 2, 3]])
+
+    def test_rolled_back_request_does_not_suppress_the_next(self):
+        calls = []
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    on_commit_once('rebuild', lambda: calls.append('rolled back'))
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            on_commit_once('rebuild', lambda: calls.append('committed'))
+
+        self.assertEqual(calls, ['committed'])
+
+    def test_request_after_the_callback_ran_registers_again(self):
+        calls = []
+
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_once('rebuild', lambda: calls.append('first'))
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_once('rebuild', lambda: calls.append('second'))
+
+        self.assertEqual(calls, ['first', 'second'])
@@ -0,0 +1,65 @@
+"""
+``transaction.on_commit`` helpers.
+
+Signal handlers often react to every row saved in a transaction (an admin
+save, an import) with work that only needs to run once after commit, such
+as queueing a rebuild task. ``on_commit_once`` merges those requests per
+transaction instead of per process.
+"""
+
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from django.db import transaction
+
+
+class _PendingCallback:
+    """An ``on_commit`` callback registered by ``on_commit_once``."""
+
+    __slots__ = ('key', 'func', 'items', 'done')
+
+    def __init__(self, key: Hashable, func: Callable[..., Any], collect: bool):
+        self.key = key
+        self.func = func
+        self.items = set() if collect else None
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        if self.items is None:
+            self.func()
+        else:
+            self.func(sorted(self.items))
+
+
+def on_commit_once(
+    key: Hashable,
+    func: Callable[..., Any],
+    items: Optional[Iterable[Any]] = None,
+    using: Optional[str] = None,
+) -> None:
+    """
+    Run ``func`` once the current transaction commits, at most once per ``key``.
+
+    A repeat call for ``key`` in the same transaction is merged into the
+    callback already pending there; with ``items``, ``func`` is called with
+    the sorted union of every call's items. Pending callbacks are found in
+    the connection's own on-commit queue, so each transaction debounces
+    only its own requests, and a callback dropped by a rolled-back
+    savepoint is registered again by the next call. Outside a transaction
+    ``func`` runs immediately, like ``transaction.on_commit``.
+    """
+    connection = transaction.get_connection(using)
+    pending = next(
+        (
+            callback for _, callback, *_ in connection.run_on_commit
+            if isinstance(callback, _PendingCallback) and callback.key == key and not callback.done
+        ),
+        None,
+    )
+    if pending is None:
+        pending = _PendingCallback(key, func, collect=items is not None)
+        if items is not None:
+            pending.items.update(items)
+        transaction.on_commit(pending, using=using)
+    elif items is not None and pending.items is not None:
+        pending.items.update(items)
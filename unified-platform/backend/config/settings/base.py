@@ -74,6 +74,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.instrumentation.ApiInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -175,6 +176,38 @@ CELERY_RESULT_BACKEND = env('CELERY_RESULT_BACKEND', default='redis://redis:6379
 CELERY_TIMEZONE = "UTC"
 
 
+# Shared cache. The generation tokens that invalidate the in-process pricing,
+# eligibility, reverse-matching, spatial and slug snapshots (and the quote
+# cache's lender versions) must be seen by every web and Celery process, so
+# this cannot be a per-process backend (see common.checks).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('CACHE_URL', default='redis://redis:6379/1'),
+    }
+}
+
+
+# Pricing quote cache (in-process LRU, optionally backed by the Django cache)
+PRICING_QUOTE_CACHE_SIZE = env.int('PRICING_QUOTE_CACHE_SIZE', default=10000)
+PRICING_QUOTE_CACHE_TTL = env.int('PRICING_QUOTE_CACHE_TTL', default=300)
+PRICING_QUOTE_CACHE_SHARED = env.bool('PRICING_QUOTE_CACHE_SHARED', default=False)
+
+
+# API instrumentation (per-view query counts, timings, slow request samples)
+API_INSTRUMENTATION_ENABLED = env.bool('API_INSTRUMENTATION_ENABLED', default=True)
+API_DEBUG_HEADERS = env.bool('API_DEBUG_HEADERS', default=False)
+API_CAPTURE_QUERY_STACKS = env.bool('API_CAPTURE_QUERY_STACKS', default=False)
+API_SLOW_REQUEST_MS = env.int('API_SLOW_REQUEST_MS', default=500)
+API_SLOW_REQUEST_SAMPLE_RATE = env.float('API_SLOW_REQUEST_SAMPLE_RATE', default=1.0)
+API_SLOW_REQUEST_SAMPLES = env.int('API_SLOW_REQUEST_SAMPLES', default=50)
+# Workers publish their metrics to the shared cache so any of them can serve a scrape
+API_METRICS_PUBLISH_SECONDS = env.int('API_METRICS_PUBLISH_SECONDS', default=10)
+API_METRICS_PROCESS_TTL = env.int('API_METRICS_PROCESS_TTL', default=3600)
+# Without a token the metrics endpoints are limited to staff users (or DEBUG)
+API_METRICS_TOKEN = env('API_METRICS_TOKEN', default='')
+
+
 # Floify Integration Settings
 FLOIFY_API_KEY = env('FLOIFY_API_KEY', default='')
 FLOIFY_WEBHOOK_SECRET = env('FLOIFY_WEBHOOK_SECRET', default='')
@@ -183,6 +216,56 @@ FLOIFY_WEBHOOK_SECRET = env('FLOIFY_WEBHOOK_SECRET', default='')
 # Google API
 GOOGLE_API_KEY = env("GOOGLE_API_KEY", default="")
 
+# Rate sheet PDF extraction (process pool size; 0 = one worker per CPU)
+RATESHEET_EXTRACTION_WORKERS = env.int('RATESHEET_EXTRACTION_WORKERS', default=0)
+RATESHEET_PARALLEL_MIN_PAGES = env.int('RATESHEET_PARALLEL_MIN_PAGES', default=4)
+
+# Content-addressed cache of extracted pages and AI output for re-sent sheets
+RATESHEET_EXTRACTION_CACHE_ENABLED = env.bool('RATESHEET_EXTRACTION_CACHE_ENABLED', default=True)
+RATESHEET_EXTRACTION_CACHE_DIR = env('RATESHEET_EXTRACTION_CACHE_DIR', default=str(BASE_DIR / 'ratesheet_cache' / 'extractions'))
+
+# AI extraction: chunk size, concurrent Gemini requests and retry backoff
+RATESHEET_AI_CHUNK_CHARS = env.int('RATESHEET_AI_CHUNK_CHARS', default=30000)
+RATESHEET_AI_CONCURRENCY = env.int('RATESHEET_AI_CONCURRENCY', default=4)
+RATESHEET_AI_MAX_RETRIES = env.int('RATESHEET_AI_MAX_RETRIES', default=3)
+RATESHEET_AI_RETRY_BACKOFF = env.float('RATESHEET_AI_RETRY_BACKOFF', default=2.0)
+
+# Fleet download of web-sourced rate sheets (see refresh_ratesheets)
+RATESHEET_SOURCES_CSV = env('RATESHEET_SOURCES_CSV', default=str(BASE_DIR.parent.parent / 'Ratesheet List - Ratesheets.csv'))
+RATESHEET_DOWNLOAD_DIR = env('RATESHEET_DOWNLOAD_DIR', default=str(BASE_DIR / 'ratesheet_cache' / 'downloads'))
+RATESHEET_FETCH_CONCURRENCY = env.int('RATESHEET_FETCH_CONCURRENCY', default=16)
+RATESHEET_FETCH_PER_HOST = env.int('RATESHEET_FETCH_PER_HOST', default=2)
+RATESHEET_FETCH_TIMEOUT = env.float('RATESHEET_FETCH_TIMEOUT', default=30.0)
+
+# Staged rate sheet processing: one Celery queue per stage, so each can be
+# consumed by its own worker pool (celery worker -Q <queue> -c <n>), and the
+# directory where stage outputs are stored by content hash
+RATESHEET_QUEUES = {
+    'extract': env('RATESHEET_EXTRACT_QUEUE', default='ratesheets.extract'),
+    'structure': env('RATESHEET_STRUCTURE_QUEUE', default='ratesheets.structure'),
+    'validate': env('RATESHEET_VALIDATE_QUEUE', default='ratesheets.validate'),
+    'ingest': env('RATESHEET_INGEST_QUEUE', default='ratesheets.ingest'),
+}
+RATESHEET_STAGE_DIR = env('RATESHEET_STAGE_DIR', default=str(BASE_DIR / 'ratesheet_cache' / 'stages'))
+CELERY_TASK_ROUTES = {
+    f'ratesheets.tasks.{stage}_ratesheet': {'queue': queue}
+    for stage, queue in RATESHEET_QUEUES.items()
+}
+
+# Rate sheet processing log: buffered events are written at stage boundaries,
+# after this many seconds, or once this many are pending
+RATESHEET_LOG_FLUSH_SECONDS = env.float('RATESHEET_LOG_FLUSH_SECONDS', default=2.0)
+RATESHEET_LOG_FLUSH_EVENTS = env.int('RATESHEET_LOG_FLUSH_EVENTS', default=50)
+
+# Per-lender processors, keyed by lender ID or company name, e.g.
+# {"Acra Lending": {"processor": "table_grid", "program_name": "Acra Non Prime"}}
+# or, mapping grid titles to programs:
+# {"Acra Lending": {"processor": "table_grid", "programs": {"DSCR": "Acra DSCR"}}}
+RATESHEET_LENDER_PROCESSORS = env.json('RATESHEET_LENDER_PROCESSORS', default={})
+
+# Parse only pages that changed since the lender's previous processed sheet
+RATESHEET_PAGE_DIFF_ENABLED = env.bool('RATESHEET_PAGE_DIFF_ENABLED', default=True)
+
 # Auth Redirects
 LOGIN_REDIRECT_URL = '/admin/'
 LOGOUT_REDIRECT_URL = '/'
@@ -11,6 +11,11 @@ ALLOWED_HOSTS = ['*']
 # Relax CORS for development
 CORS_ALLOW_ALL_ORIGINS = True
 
+# The single-process runserver and the test suite can do without Redis;
+# set CACHE_URL to share invalidation tokens with a local Celery worker.
+if not env('CACHE_URL', default=''):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 # Use console backend for emails
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
@@ -0,0 +1,22 @@
+from django.core.checks import run_checks
+from django.test import SimpleTestCase, override_settings
+
+from common.checks import PROCESS_LOCAL_CACHES
+from config.settings import base
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://redis:6379/1'}}
+
+
+class SharedCacheTest(SimpleTestCase):
+    def test_deployed_settings_use_a_shared_cache(self):
+        # Generation tokens must reach every gunicorn and Celery process
+        self.assertNotIn(base.CACHES['default']['BACKEND'], PROCESS_LOCAL_CACHES)
+
+    @override_settings(DEBUG=False, CACHES=LOCMEM)
+    def test_process_local_cache_fails_checks(self):
+        self.assertIn('common.E001', [error.id for error in run_checks()])
+
+    @override_settings(DEBUG=False, CACHES=REDIS)
+    def test_shared_cache_passes_checks(self):
+        self.assertNotIn('common.E001', [error.id for error in run_checks()])
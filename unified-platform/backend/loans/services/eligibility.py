@@ -0,0 +1,277 @@
+"""
+Eligibility bitmap index for LoanProgram pre-qualification.
+
+Every LoanProgram is loaded once into a compact in-memory form. Each choice
+value (state, property type, purpose, occupancy) maps to a bitset of the
+programs allowing it and each numeric limit is a sorted threshold column,
+so qualifying a borrower is a handful of lookups AND-ed together instead
+of array ``__contains`` queries (Postgres) or a Python loop over every
+program (SQLite). Both backends take the same path and return the same
+programs.
+
+Ranking reuses the same columns: MatchingService.calculate_match_score is
+a sum of tiered bonuses, and every tier is itself a threshold predicate, so
+the eligible set splits into a few score classes by AND-ing masks and the
+best programs are taken with a heap merge over those classes.
+
+The index is rebuilt lazily after LoanProgram or Lender changes, which
+bump a generation token in the Django cache (see loans.signals).
+"""
+
+import heapq
+import logging
+import threading
+import time
+from decimal import Decimal
+from itertools import islice, product
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from common.bitmask import ThresholdColumn, iter_mask
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CACHE_KEY = 'loans:eligibility:generation'
+
+# Match score tiers, mirroring MatchingService.calculate_match_score:
+# (buffer threshold, bonus), best first.
+BASE_SCORE = 50
+CREDIT_BUFFER_TIERS = ((100, 20), (50, 10))
+LTV_BUFFER_TIERS = ((Decimal(20), 15), (Decimal(10), 10))
+RATE_TIERS = ((7.0, 15), (8.0, 10))
+
+
+class CompiledProgram:
+    """
+    A LoanProgram reduced to the fields used for qualification.
+
+    Attribute names match the model so MatchingService accepts either.
+    """
+
+    __slots__ = (
+        'id', 'name', 'lender_id', 'lender_name',
+        'states', 'property_types', 'purpose', 'occupancy',
+        'min_loan_amount', 'max_loan_amount', 'min_credit', 'max_loan_to_value',
+        'potential_rate_min', 'potential_rate_max', 'io_offered', 'ysp_available',
+    )
+
+    def __init__(self, program):
+        self.id = program.pk
+        self.name = program.name
+        self.lender_id = program.lender_id
+        self.lender_name = program.lender.company_name
+        self.states = frozenset(s.upper() for s in program.lender.include_states or ())
+        self.property_types = frozenset(program.property_types or ())
+        self.purpose = frozenset(program.purpose or ())
+        self.occupancy = frozenset(program.occupancy or ())
+        self.min_loan_amount = program.min_loan_amount
+        self.max_loan_amount = program.max_loan_amount
+        self.min_credit = program.min_credit
+        self.max_loan_to_value = program.max_loan_to_value
+        self.potential_rate_min = program.potential_rate_min
+        self.potential_rate_max = program.potential_rate_max
+        self.io_offered = program.io_offered
+        self.ysp_available = program.ysp_available
+
+
+class EligibilityIndex:
+    """
+    Bitmap index over a fixed list of compiled programs.
+
+    Bit ``i`` of every mask refers to ``programs[i]``, and programs keep the
+    model's default ordering so decoding a mask yields them in DB order.
+    """
+
+    # Request field -> CompiledProgram attribute
+    CHOICE_COLUMNS = (
+        ('property_state', 'states'),
+        ('property_type', 'property_types'),
+        ('loan_purpose', 'purpose'),
+        ('occupancy', 'occupancy'),
+    )
+
+    def __init__(self, programs: List[CompiledProgram], generation: Any = None):
+        self.programs = tuple(programs)
+        self.generation = generation
+        self.choices: Dict[str, Dict[str, int]] = {}
+        for field, attr in self.CHOICE_COLUMNS:
+            column: Dict[str, int] = {}
+            for i, program in enumerate(self.programs):
+                for value in getattr(program, attr):
+                    column[value] = column.get(value, 0) | (1 << i)
+            self.choices[field] = column
+
+        # LTV limits stay Decimal so score tiers match MatchingService exactly.
+        # A NULL max LTV never satisfies ``max_loan_to_value >= ltv`` in SQL.
+        max_ltvs = [
+            p.max_loan_to_value if p.max_loan_to_value is not None else Decimal('-Infinity')
+            for p in self.programs
+        ]
+        self.min_loan = ThresholdColumn([float(p.min_loan_amount) for p in self.programs], lower=True)
+        self.max_loan = ThresholdColumn([float(p.max_loan_amount) for p in self.programs], lower=False)
+        self.min_credit = ThresholdColumn([p.min_credit for p in self.programs], lower=True)
+        self.max_ltv = ThresholdColumn(max_ltvs, lower=False)
+
+        # Rate bonuses do not depend on the borrower, so they are fixed masks.
+        self.rate_tiers = []
+        for threshold, bonus in RATE_TIERS:
+            tier = 0
+            for i, program in enumerate(self.programs):
+                if program.potential_rate_min < threshold:
+                    tier |= 1 << i
+            self.rate_tiers.append((tier, bonus))
+
+    def mask(self, data: Dict[str, Any]) -> int:
+        """Bitmask of programs a validated qualification request is eligible for."""
+        mask = -1
+        for field, _ in self.CHOICE_COLUMNS:
+            value = data[field]
+            if field == 'property_state':
+                value = value.upper()
+            mask &= self.choices[field].get(value, 0)
+            if not mask:
+                return 0
+
+        loan_amount = float(data['loan_amount'])
+        return (
+            mask
+            & self.min_loan.mask(loan_amount)
+            & self.max_loan.mask(loan_amount)
+            & self.min_credit.mask(data['credit_score'])
+            & self.max_ltv.mask(_ltv(data))
+        )
+
+    def score_classes(self, data: Dict[str, Any], mask: int) -> List[Tuple[int, int]]:
+        """
+        Split ``mask`` into (match score, programs) classes.
+
+        Each bonus tier of calculate_match_score is a threshold on one
+        column, so the classes are the AND of one tier mask per criterion.
+        """
+        credit_score = data['credit_score']
+        ltv = _ltv(data)
+        criteria = [
+            _tiers(
+                [(self.min_credit.mask(credit_score - buffer), bonus)
+                 for buffer, bonus in CREDIT_BUFFER_TIERS],
+                mask,
+            ),
+            _tiers(
+                [(self.max_ltv.mask(ltv + buffer), bonus)
+                 for buffer, bonus in LTV_BUFFER_TIERS],
+                mask,
+            ),
+            _tiers(self.rate_tiers, mask),
+        ]
+
+        classes: Dict[int, int] = {}
+        for combination in product(*criteria):
+            members = mask
+            score = BASE_SCORE
+            for tier, bonus in combination:
+                members &= tier
+                score += bonus
+            if members:
+                score = min(score, 100)
+                classes[score] = classes.get(score, 0) | members
+        return list(classes.items())
+
+    def top_matches(self, data: Dict[str, Any], limit: int = 10) -> List[Tuple[int, CompiledProgram]]:
+        """
+        The ``limit`` best-scoring eligible programs as (score, program).
+
+        Ties keep DB order. Each score class is already in order, so a heap
+        merge of the classes yields the overall ranking lazily and only the
+        first ``limit`` entries are ever produced.
+        """
+        classes = self.score_classes(data, self.mask(data))
+        ranked = heapq.merge(
+            *[_ranked(score, members) for score, members in classes]
+        )
+        programs = self.programs
+        return [(-neg_score, programs[i]) for neg_score, i in islice(ranked, limit)]
+
+    def match(self, data: Dict[str, Any]) -> List[CompiledProgram]:
+        """Programs a qualification request is eligible for, in DB order."""
+        programs = self.programs
+        return [programs[i] for i in iter_mask(self.mask(data))]
+
+
+def _ltv(data: Dict[str, Any]) -> Decimal:
+    return Decimal(str(data['calculated_ltv']))
+
+
+def _ranked(score: int, members: int):
+    """(-score, position) keys of one score class, in DB order."""
+    return ((-score, i) for i in iter_mask(members))
+
+
+def _tiers(tiers: List[Tuple[int, int]], mask: int) -> List[Tuple[int, int]]:
+    """Make ordered (mask, bonus) tiers exclusive and add the no-bonus rest."""
+    exclusive = []
+    claimed = 0
+    for tier, bonus in tiers:
+        exclusive.append((tier & ~claimed, bonus))
+        claimed |= tier
+    exclusive.append((mask & ~claimed, 0))
+    return exclusive
+
+
+class ProgramEligibility:
+    """
+    Process-wide holder of the eligibility index.
+
+    Use the module-level ``program_eligibility`` instance.
+    """
+
+    def __init__(self):
+        self._index: Optional[EligibilityIndex] = None
+        self._lock = threading.Lock()
+
+    def index(self) -> EligibilityIndex:
+        """Return the current index, rebuilding it if it is stale."""
+        generation = cache.get(GENERATION_CACHE_KEY)
+        index = self._index
+        if index is not None and index.generation == generation:
+            return index
+
+        with self._lock:
+            index = self._index
+            if index is None or index.generation != generation:
+                index = self._build(generation)
+                self._index = index
+        return index
+
+    def invalidate(self) -> None:
+        """Drop the index now and publish a new generation on commit."""
+        self._index = None
+        transaction.on_commit(self._publish_generation)
+
+    def _publish_generation(self) -> None:
+        self._index = None
+        cache.set(GENERATION_CACHE_KEY, time.time_ns(), timeout=None)
+
+    def _build(self, generation: Any) -> EligibilityIndex:
+        from loans.models import LoanProgram
+
+        started = time.perf_counter()
+        index = EligibilityIndex(
+            [CompiledProgram(p) for p in LoanProgram.objects.select_related('lender')],
+            generation,
+        )
+        logger.info(
+            "Built program eligibility index: %d programs in %.1fms",
+            len(index.programs), (time.perf_counter() - started) * 1000,
+        )
+        return index
+
+    def match(self, data: Dict[str, Any]) -> List[CompiledProgram]:
+        return self.index().match(data)
+
+    def top_matches(self, data: Dict[str, Any], limit: int = 10) -> List[Tuple[int, CompiledProgram]]:
+        return self.index().top_matches(data, limit)
+
+
+program_eligibility = ProgramEligibility()
@@ -0,0 +1,21 @@
+"""
+Signal handlers for the loans app.
+
+LoanProgram and Lender changes invalidate the in-memory eligibility index
+used by the pre-qualification endpoint.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from loans.models import Lender, LoanProgram
+from loans.services.eligibility import program_eligibility
+
+
+@receiver(post_save, sender=LoanProgram)
+@receiver(post_delete, sender=LoanProgram)
+@receiver(post_save, sender=Lender)
+@receiver(post_delete, sender=Lender)
+def invalidate_program_eligibility(sender, **kwargs):
+    """Drop the eligibility index so the next qualification rebuilds it."""
+    program_eligibility.invalidate()
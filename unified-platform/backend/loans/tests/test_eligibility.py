@@ -0,0 +1,184 @@
+import random
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from loans import choices
+from loans.models import Lender, LoanProgram
+from loans.services.eligibility import program_eligibility
+from loans.services.matching import MatchingService
+
+
+def create_program(lender, **overrides):
+    fields = dict(
+        name="Test Program",
+        lender=lender,
+        min_loan_amount=100000,
+        max_loan_amount=1000000,
+        min_credit=600,
+        max_loan_to_value=80.0,
+        potential_rate_min=6.5,
+        potential_rate_max=7.5,
+        property_types=[choices.PROPERTY_TYPE_RESIDENTIAL],
+        purpose=[choices.LOAN_PURPOSE_PURCHASE],
+        occupancy=[choices.OCCUPANCY_OWNER_OCCUPIED],
+        reserve_requirement=6,
+        max_compensation=2,
+        lender_fee=1000,
+        prepayment_penalty=choices.PPP_NONE,
+        prepayment_cost=choices.PPP_NONE,
+        potential_cost_min=0,
+        potential_cost_max=1,
+        min_dscr=1.0,
+    )
+    fields.update(overrides)
+    return LoanProgram.objects.create(**fields)
+
+
+def qualification(**overrides):
+    data = {
+        'loan_amount': 200000,
+        'loan_purpose': choices.LOAN_PURPOSE_PURCHASE,
+        'property_type': choices.PROPERTY_TYPE_RESIDENTIAL,
+        'property_state': "CA",
+        'occupancy': choices.OCCUPANCY_OWNER_OCCUPIED,
+        'credit_score': 700,
+        'calculated_ltv': 66.67,
+    }
+    data.update(overrides)
+    return data
+
+
+def scan(data):
+    """Reference implementation: the old per-program Python filter."""
+    return [
+        p.id for p in LoanProgram.objects.select_related('lender')
+        if p.min_loan_amount <= data['loan_amount'] <= p.max_loan_amount
+        and p.min_credit <= data['credit_score']
+        and p.max_loan_to_value is not None
+        and p.max_loan_to_value >= data['calculated_ltv']
+        and data['property_state'].upper() in p.lender.include_states
+        and data['property_type'] in p.property_types
+        and data['loan_purpose'] in p.purpose
+        and data['occupancy'] in p.occupancy
+    ]
+
+
+class EligibilityIndexTests(TestCase):
+    def setUp(self):
+        self.lender = Lender.objects.create(company_name="Index Lender", include_states=["CA", "TX"])
+
+    def test_matches_reference_scan(self):
+        rng = random.Random(7)
+        other = Lender.objects.create(company_name="Other Lender", include_states=["NY"])
+        property_types = [choices.PROPERTY_TYPE_RESIDENTIAL, choices.PROPERTY_TYPE_COMMERCIAL]
+        purposes = [choices.LOAN_PURPOSE_PURCHASE, choices.LOAN_PURPOSE_REFINANCE]
+        for i in range(40):
+            create_program(
+                rng.choice([self.lender, other]),
+                name=f"Program {i}",
+                min_loan_amount=rng.choice([50000, 100000, 250000]),
+                max_loan_amount=rng.choice([500000, 1000000]),
+                min_credit=rng.choice([580, 640, 700, 740]),
+                max_loan_to_value=rng.choice([None, 65, 75, 80]),
+                property_types=rng.sample(property_types, rng.randint(1, 2)),
+                purpose=rng.sample(purposes, rng.randint(1, 2)),
+            )
+
+        for _ in range(50):
+            data = qualification(
+                loan_amount=rng.choice([50000, 100000, 300000, 1000000, 2000000]),
+                credit_score=rng.choice([600, 640, 700, 760]),
+                calculated_ltv=rng.choice([60.0, 65.0, 75.0, 80.0, 90.0]),
+                property_state=rng.choice(["ca", "TX", "NY", "WA"]),
+                property_type=rng.choice(property_types),
+                loan_purpose=rng.choice(purposes),
+            )
+            self.assertEqual([p.id for p in program_eligibility.match(data)], scan(data))
+
+    def test_top_matches_rank_whole_eligible_set(self):
+        rng = random.Random(11)
+        for i in range(30):
+            create_program(
+                self.lender,
+                name=f"Program {i}",
+                min_credit=rng.choice([580, 600, 650, 700]),
+                max_loan_to_value=rng.choice([70, 76.67, 80, 86.67, 95]),
+                potential_rate_min=rng.choice([6.5, 7.0, 7.5, 8.0, 9.0]),
+            )
+
+        for credit_score in (700, 750, 800):
+            data = qualification(credit_score=credit_score)
+            eligible = program_eligibility.match(data)
+            expected = sorted(
+                ((MatchingService.calculate_match_score(p, data), p.id) for p in eligible),
+                key=lambda pair: pair[0],
+                reverse=True,
+            )
+
+            top = program_eligibility.top_matches(data, limit=10)
+
+            self.assertEqual([(score, p.id) for score, p in top], expected[:10])
+            self.assertEqual(len(program_eligibility.top_matches(data, limit=100)), len(eligible))
+
+    def test_program_save_and_delete_update_index(self):
+        program = create_program(self.lender)
+        self.assertEqual([p.id for p in program_eligibility.match(qualification())], [program.id])
+
+        program.min_credit = 720
+        program.save()
+        self.assertEqual(program_eligibility.match(qualification()), [])
+
+        program.min_credit = 600
+        program.save()
+        self.lender.include_states = ["TX"]
+        self.lender.save()
+        self.assertEqual(program_eligibility.match(qualification()), [])
+
+        program.delete()
+        self.assertEqual(program_eligibility.match(qualification(property_state="TX")), [])
+
+
+class QualifyViewTests(APITestCase):
+    def test_qualify_returns_best_programs_beyond_first_ten(self):
+        lender = Lender.objects.create(company_name="Ranked Lender", include_states=["CA"])
+        for i in range(12):
+            create_program(lender, name=f"Plain {i}", min_credit=690, potential_rate_min=9.0)
+        best = create_program(lender, name="Best", min_credit=580, max_loan_to_value=95, potential_rate_min=6.0)
+
+        response = self.client.post(reverse('qualify'), {
+            "loan_amount": 200000,
+            "property_value": 300000,
+            "loan_purpose": choices.LOAN_PURPOSE_PURCHASE,
+            "property_type": choices.PROPERTY_TYPE_RESIDENTIAL,
+            "property_state": "CA",
+            "occupancy": choices.OCCUPANCY_OWNER_OCCUPIED,
+            "credit_score": 700
+        }, format='json')
+
+        matched = response.data['matched_programs']
+        self.assertEqual(len(matched), 10)
+        self.assertEqual(matched[0]['program_id'], best.id)
+        self.assertEqual(matched[0]['match_score'], 100)
+
+
+    def test_qualify_uses_index(self):
+        lender = Lender.objects.create(company_name="View Lender", include_states=["CA"])
+        program = create_program(lender)
+        create_program(lender, name="Commercial", property_types=[choices.PROPERTY_TYPE_COMMERCIAL])
+
+        response = self.client.post(reverse('qualify'), {
+            "loan_amount": 200000,
+            "property_value": 300000,
+            "loan_purpose": choices.LOAN_PURPOSE_PURCHASE,
+            "property_type": choices.PROPERTY_TYPE_RESIDENTIAL,
+            "property_state": "CA",
+            "occupancy": choices.OCCUPANCY_OWNER_OCCUPIED,
+            "credit_score": 700
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_matches'], 1)
+        self.assertEqual(response.data['matched_programs'][0]['program_id'], program.id)
+        self.assertEqual(response.data['matched_programs'][0]['lender_name'], "View Lender")
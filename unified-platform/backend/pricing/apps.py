@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PricingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "pricing"
+
+    def ready(self):
+        from pricing import signals  # noqa: F401
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from pricing.models import LenderProgramOffering
+from pricing.services.reverse_matching import (
+    RematchStats,
+    changed_offering_ids,
+    rematch_offerings,
+)
+
+
+class Command(BaseCommand):
+    help = 'Find leads (QualifyingInfo) eligible for lender program offerings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lender', type=int, help='Only offerings of this lender ID')
+        parser.add_argument(
+            '--since',
+            help='Only offerings changed at or after this ISO timestamp'
+        )
+        parser.add_argument(
+            '--count-only', action='store_true',
+            help='Report totals without streaming individual matches'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Invalid --since timestamp: {options['since']}")
+
+        if since is None and options['lender'] is None:
+            offering_ids = list(
+                LenderProgramOffering.objects.filter(is_active=True).values_list('id', flat=True)
+            )
+        else:
+            offering_ids = changed_offering_ids(since=since, lender_id=options['lender'])
+
+        stats = RematchStats()
+        for offering_id, lead_id in rematch_offerings(offering_ids, stats=stats):
+            if not options['count_only']:
+                self.stdout.write(json.dumps({'offering': offering_id, 'lead': lead_id}))
+
+        summary = stats.as_dict()
+        self.stderr.write(self.style.SUCCESS(
+            f"Matched {summary['matches']} leads across {summary['offerings']} offerings "
+            f"in {summary['elapsed_sec']}s ({summary['leads_per_sec']} leads/sec)"
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0002_qualifyinginfo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='qualifyinginfo',
+            index=models.Index(fields=['state', 'property_type', 'purpose', 'occupancy', 'estimated_credit_score'], name='qualinfo_match_idx'),
+        ),
+    ]
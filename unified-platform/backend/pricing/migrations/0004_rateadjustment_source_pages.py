@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0003_qualifyinginfo_match_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rateadjustment',
+            name='source_pages',
+            field=models.JSONField(blank=True, default=list, help_text='Fingerprints of the rate sheet pages this adjustment was extracted from'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0004_rateadjustment_source_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lenderprogramoffering',
+            name='price_ladder',
+            field=models.JSONField(blank=True, default=list, help_text='Rate sheet [rate, price] rows, price in points above par (positive = credit)'),
+        ),
+    ]
@@ -91,6 +91,13 @@ class RateAdjustment(TimestampedModel):
         help_text="Adjustment in points (negative = cost, positive = credit)"
     )
 
+    # Provenance, for pruning on partial (changed pages only) ingestion
+    source_pages = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Fingerprints of the rate sheet pages this adjustment was extracted from"
+    )
+
     class Meta:
         verbose_name = "Rate Adjustment"
         verbose_name_plural = "Rate Adjustments"
@@ -225,6 +225,11 @@ class LenderProgramOffering(TimestampedModel):
         validators=[MinValueValidator(0), MaxValueValidator(10)],
         help_text="Maximum origination points"
     )
+    price_ladder = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Rate sheet [rate, price] rows, price in points above par (positive = credit)"
+    )
     lender_fee = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -62,6 +62,13 @@ class QualifyingInfo(TimestampedModel):
         verbose_name = "Qualifying Info"
         verbose_name_plural = "Qualifying Infos"
         ordering = ['-created_at']
+        indexes = [
+            # Exact-match criteria used by reverse matching, then FICO
+            models.Index(
+                fields=['state', 'property_type', 'purpose', 'occupancy', 'estimated_credit_score'],
+                name='qualinfo_match_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.loan_amount} - {self.estimated_credit_score} - {self.state}"
@@ -0,0 +1,155 @@
+"""
+Interval index for RateAdjustment lookups.
+
+Rate sheet grids are stored as closed ranges (e.g. FICO 680-739 × LTV
+60.01-75). Instead of testing every adjustment for containment, each axis
+is reduced to its sorted breakpoints. Between two consecutive breakpoints
+(and exactly on one) the set of containing ranges cannot change, so every
+such "slot" is precomputed once and a lookup is a bisect per axis.
+
+Supported shapes:
+- 2D grids (row × col bounds, e.g. FICO × LTV)
+- 1D tiers (row bounds only, e.g. loan amount or lock period ranges)
+- keyed lookups (value_key, e.g. purpose='purchase' or state='CA')
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+EMPTY: Tuple = ()
+
+
+class IntervalAxis:
+    """
+    Sorted breakpoints of one axis, mapping a value to its slot.
+
+    With breakpoints ``b0 < b1 < ... < bn-1`` there are ``2n + 1`` slots:
+    even slot ``2j`` is the open gap below ``bj`` and odd slot ``2j + 1``
+    is the point ``bj`` itself.
+    """
+
+    __slots__ = ('breakpoints',)
+
+    def __init__(self, values: Iterable[float]):
+        self.breakpoints = sorted(set(values))
+
+    def __len__(self) -> int:
+        return 2 * len(self.breakpoints) + 1
+
+    def slot(self, x: float) -> int:
+        j = bisect_left(self.breakpoints, x)
+        if j < len(self.breakpoints) and self.breakpoints[j] == x:
+            return 2 * j + 1
+        return 2 * j
+
+    def bucket(self, x: float) -> Tuple:
+        """
+        The slot containing x as a value pair, stable across rebuilds.
+
+        A breakpoint is returned as ``(b, b)`` and an open gap as its
+        bounding breakpoints, with None standing for an unbounded side.
+        """
+        s = self.slot(x)
+        j = s // 2
+        b = self.breakpoints
+        if s % 2:
+            return (b[j], b[j])
+        return (b[j - 1] if j else None, b[j] if j < len(b) else None)
+
+    def span(self, low: float, high: float) -> range:
+        """Slots covered by the closed interval [low, high]."""
+        return range(self.slot(low), self.slot(high) + 1)
+
+
+class IntervalIndex1D:
+    """Closed-range tiers on a single axis."""
+
+    __slots__ = ('axis', 'cells')
+
+    def __init__(self, adjustments: List):
+        self.axis = IntervalAxis(
+            v for adj in adjustments for v in (adj.row_min, adj.row_max)
+        )
+        cells: List[list] = [[] for _ in range(len(self.axis))]
+        for adj in adjustments:
+            for s in self.axis.span(adj.row_min, adj.row_max):
+                cells[s].append(adj)
+        self.cells = [tuple(c) for c in cells]
+
+    def lookup(self, x: float) -> Tuple:
+        return self.cells[self.axis.slot(x)]
+
+
+class GridIndex2D:
+    """Closed-range cells on a row × column grid, stored densely."""
+
+    __slots__ = ('rows', 'cols', 'width', 'cells')
+
+    def __init__(self, adjustments: List):
+        self.rows = IntervalAxis(
+            v for adj in adjustments for v in (adj.row_min, adj.row_max)
+        )
+        self.cols = IntervalAxis(
+            v for adj in adjustments for v in (adj.col_min, adj.col_max)
+        )
+        self.width = len(self.cols)
+        cells: List[list] = [[] for _ in range(len(self.rows) * self.width)]
+        for adj in adjustments:
+            col_span = self.cols.span(adj.col_min, adj.col_max)
+            for r in self.rows.span(adj.row_min, adj.row_max):
+                base = r * self.width
+                for c in col_span:
+                    cells[base + c].append(adj)
+        self.cells = [tuple(c) for c in cells]
+
+    def lookup(self, row: float, col: float) -> Tuple:
+        return self.cells[self.rows.slot(row) * self.width + self.cols.slot(col)]
+
+
+def _has(*values) -> bool:
+    return all(v is not None for v in values)
+
+
+class AdjustmentIndex:
+    """
+    All adjustments of one offering, indexed by type and shape.
+
+    Adjustments missing the bounds their shape needs are ignored, matching
+    the SQL range predicates which never match NULL bounds.
+    """
+
+    __slots__ = ('grids', 'tiers', 'keyed')
+
+    def __init__(self, adjustments: Iterable):
+        grids: Dict[str, list] = {}
+        tiers: Dict[str, list] = {}
+        keyed: Dict[Tuple[str, str], list] = {}
+
+        for adj in adjustments:
+            if _has(adj.row_min, adj.row_max, adj.col_min, adj.col_max):
+                grids.setdefault(adj.adjustment_type, []).append(adj)
+            elif _has(adj.row_min, adj.row_max):
+                tiers.setdefault(adj.adjustment_type, []).append(adj)
+            elif adj.value_key:
+                key = (adj.adjustment_type, adj.value_key.lower())
+                keyed.setdefault(key, []).append(adj)
+
+        self.grids = {t: GridIndex2D(a) for t, a in grids.items()}
+        self.tiers = {t: IntervalIndex1D(a) for t, a in tiers.items()}
+        self.keyed = {k: tuple(a) for k, a in keyed.items()}
+
+    def grid(self, adjustment_type: str, row: float, col: float) -> Tuple:
+        """Adjustments of a 2D type whose cell contains (row, col)."""
+        index = self.grids.get(adjustment_type)
+        return index.lookup(row, col) if index else EMPTY
+
+    def tier(self, adjustment_type: str, value: float) -> Tuple:
+        """Adjustments of a 1D range type whose tier contains value."""
+        index = self.tiers.get(adjustment_type)
+        return index.lookup(value) if index else EMPTY
+
+    def key(self, adjustment_type: str, value_key) -> Tuple:
+        """Adjustments of a keyed type for value_key (case-insensitive)."""
+        if value_key is None:
+            return EMPTY
+        return self.keyed.get((adjustment_type, str(value_key).lower()), EMPTY)
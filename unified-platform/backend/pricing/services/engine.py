@@ -0,0 +1,440 @@
+"""
+In-memory compiled pricing engine.
+
+Loads every active LenderProgramOffering together with its lender, program
+type and RateAdjustment grid into process memory, so a quote can be answered
+without issuing any SQL. The compiled snapshot is dropped whenever pricing
+data changes and is rebuilt lazily on the next quote.
+
+Invalidation is published through the Django cache as a generation token, so
+every worker process sharing the cache rebuilds after rate sheet ingestion
+commits, not just the process that ran the ingestion.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from common.bitmask import ThresholdColumn, iter_mask
+from pricing.models import RateAdjustment
+from pricing.services.adjustment_index import AdjustmentIndex, IntervalAxis
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CACHE_KEY = 'pricing:engine:generation'
+
+# Keyed adjustment types and the qualification attribute they look up.
+KEYED_ADJUSTMENTS = (
+    (RateAdjustment.ADJUSTMENT_TYPE_PURPOSE, 'purpose'),
+    (RateAdjustment.ADJUSTMENT_TYPE_OCCUPANCY, 'occupancy'),
+    (RateAdjustment.ADJUSTMENT_TYPE_PROPERTY_TYPE, 'property_type'),
+    (RateAdjustment.ADJUSTMENT_TYPE_STATE, 'state'),
+)
+
+
+class CompiledAdjustment:
+    """A RateAdjustment row reduced to plain Python values."""
+
+    __slots__ = (
+        'adjustment_type', 'value_key',
+        'row_min', 'row_max', 'col_min', 'col_max',
+        'points',
+    )
+
+    def __init__(self, adjustment):
+        self.adjustment_type = adjustment.adjustment_type
+        self.value_key = adjustment.value_key
+        self.row_min = adjustment.row_min
+        self.row_max = adjustment.row_max
+        self.col_min = adjustment.col_min
+        self.col_max = adjustment.col_max
+        self.points = float(adjustment.adjustment_points)
+
+
+class PriceLadder:
+    """
+    An offering's base rate/price table, precomputed for quoting.
+
+    Built from the rate sheet's [rate, price] rows (price in points above
+    par, positive = credit, like adjustment points). ``reach[i]`` is the
+    best price at or below ``rates[i]``, so the lowest rate whose price
+    absorbs a stacked LLPA total is one bisect.
+    """
+
+    __slots__ = ('rates', 'prices', 'reach')
+
+    def __init__(self, rows):
+        rows = sorted((float(rate), round(float(price), 3)) for rate, price in rows)
+        self.rates = tuple(rate for rate, _ in rows)
+        self.prices = tuple(price for _, price in rows)
+        reach, best = [], float('-inf')
+        for price in self.prices:
+            best = max(best, price)
+            reach.append(best)
+        self.reach = tuple(reach)
+
+    def __bool__(self) -> bool:
+        return bool(self.rates)
+
+    def rate_for(self, points: float) -> Tuple[float, float]:
+        """
+        Convert stacked LLPA points into rate.
+
+        Returns:
+            Tuple of (rate, net_price): the lowest rate priced at or above
+            par once ``points`` are added, and the price left there. If no
+            rate gets there, the best priced rate and its (negative) price.
+        """
+        i = bisect_left(self.reach, round(-points, 3))
+        if i == len(self.rates):
+            i = self.prices.index(self.reach[-1])
+        return self.rates[i], self.prices[i] + points
+
+
+class CompiledOffering:
+    """
+    A LenderProgramOffering flattened with its eligibility criteria.
+
+    Choice lists are stored as frozensets and loan limits as floats; the
+    snapshot's OfferingMatrix indexes these columns for matching.
+    """
+
+    __slots__ = (
+        'id', 'lender_id', 'lender_name', 'program_name',
+        'states', 'property_types', 'entity_types', 'purposes', 'occupancy',
+        'min_rate', 'max_rate', 'min_fico', 'max_ltv', 'min_loan', 'max_loan',
+        'adjustments', 'index', 'ladder',
+    )
+
+    def __init__(self, offering, adjustments: List[CompiledAdjustment]):
+        program_type = offering.program_type
+        self.id = offering.pk
+        self.lender_id = offering.lender_id
+        self.lender_name = offering.lender.company_name
+        self.program_name = program_type.name
+        self.states = frozenset(offering.lender.include_states or ())
+        self.property_types = frozenset(program_type.property_types or ())
+        self.entity_types = frozenset(program_type.entity_types or ())
+        self.purposes = frozenset(program_type.purposes or ())
+        self.occupancy = frozenset(program_type.occupancy or ())
+        self.min_rate = float(offering.min_rate)
+        self.max_rate = float(offering.max_rate)
+        self.min_fico = offering.min_fico
+        self.max_ltv = float(offering.max_ltv)
+        self.min_loan = float(offering.min_loan)
+        self.max_loan = float(offering.max_loan)
+        self.adjustments = tuple(adjustments)
+        self.index = AdjustmentIndex(self.adjustments)
+        self.ladder = PriceLadder(offering.price_ladder or ())
+
+
+class OfferingMatrix:
+    """
+    Column-oriented eligibility index over a snapshot's offerings.
+
+    Bit ``i`` of every mask refers to ``offerings[i]``. Choice-list
+    criteria map each value to the mask of offerings allowing it and
+    numeric limits are sorted threshold columns, so evaluating a scenario
+    is nine lookups AND-ed together regardless of catalog size.
+    """
+
+    CHOICE_COLUMNS = (
+        ('state', 'states'),
+        ('property_type', 'property_types'),
+        ('entity_type', 'entity_types'),
+        ('purpose', 'purposes'),
+        ('occupancy', 'occupancy'),
+    )
+
+    def __init__(self, offerings: Tuple[CompiledOffering, ...]):
+        self.choices: Dict[str, Dict[str, int]] = {}
+        for qi_attr, offering_attr in self.CHOICE_COLUMNS:
+            column: Dict[str, int] = {}
+            for i, offering in enumerate(offerings):
+                for value in getattr(offering, offering_attr):
+                    column[value] = column.get(value, 0) | (1 << i)
+            self.choices[qi_attr] = column
+
+        self.min_loan = ThresholdColumn([o.min_loan for o in offerings], lower=True)
+        self.max_loan = ThresholdColumn([o.max_loan for o in offerings], lower=False)
+        self.min_fico = ThresholdColumn([o.min_fico for o in offerings], lower=True)
+        self.max_ltv = ThresholdColumn([o.max_ltv for o in offerings], lower=False)
+
+    def choice_mask(self, qi) -> int:
+        """AND of the choice-list columns for a qualification."""
+        mask = -1
+        for qi_attr, _ in self.CHOICE_COLUMNS:
+            mask &= self.choices[qi_attr].get(getattr(qi, qi_attr), 0)
+            if not mask:
+                break
+        return mask
+
+    def numeric_mask(self, qi) -> int:
+        """AND of the numeric limit columns for a qualification."""
+        loan_amount = float(qi.loan_amount)
+        return (
+            self.min_loan.mask(loan_amount)
+            & self.max_loan.mask(loan_amount)
+            & self.max_ltv.mask(float(qi.ltv))
+            & self.min_fico.mask(qi.estimated_credit_score)
+        )
+
+    def eligible_mask(self, qi) -> int:
+        """Bitmask of every offering the qualification is eligible for."""
+        mask = self.choice_mask(qi)
+        return mask & self.numeric_mask(qi) if mask else 0
+
+
+class ScenarioBuckets:
+    """
+    Snapshot-wide breakpoints of the FICO, LTV and loan amount axes.
+
+    Every eligibility limit and adjustment boundary in the snapshot is a
+    breakpoint, so two scenarios landing in the same bucket on each axis
+    (with equal choice values) receive identical quotes. Buckets are
+    expressed as breakpoint values rather than slot numbers so keys stay
+    meaningful after the snapshot is rebuilt.
+    """
+
+    def __init__(self, offerings: Tuple[CompiledOffering, ...]):
+        fico, ltv, loan = set(), set(), set()
+        for offering in offerings:
+            fico.add(offering.min_fico)
+            ltv.add(offering.max_ltv)
+            loan.update((offering.min_loan, offering.max_loan))
+            grid = offering.index.grids.get(RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV)
+            if grid:
+                fico.update(grid.rows.breakpoints)
+                ltv.update(grid.cols.breakpoints)
+            tier = offering.index.tiers.get(RateAdjustment.ADJUSTMENT_TYPE_LOAN_AMOUNT)
+            if tier:
+                loan.update(tier.axis.breakpoints)
+        self.fico = IntervalAxis(fico)
+        self.ltv = IntervalAxis(ltv)
+        self.loan = IntervalAxis(loan)
+
+    def key(self, qi) -> tuple:
+        """Canonical, noise-free representation of a scenario."""
+        return (
+            qi.state, qi.property_type, qi.entity_type, qi.purpose,
+            qi.occupancy, qi.lock_period,
+            self.fico.bucket(qi.estimated_credit_score),
+            self.ltv.bucket(float(qi.ltv)),
+            self.loan.bucket(float(qi.loan_amount)),
+        )
+
+
+class PricingSnapshot:
+    """Immutable set of compiled offerings ordered by lowest rate."""
+
+    def __init__(self, offerings: List[CompiledOffering], generation: Any):
+        self.offerings = tuple(
+            sorted(offerings, key=lambda o: (o.min_rate, o.id))
+        )
+        self.by_id = {o.id: o for o in self.offerings}
+        self.matrix = OfferingMatrix(self.offerings)
+        self.buckets = ScenarioBuckets(self.offerings)
+        self.generation = generation
+        self.built_at = time.time()
+
+    def match(self, qi) -> List[CompiledOffering]:
+        """Return offerings the qualification is eligible for, by rate."""
+        return self._decode(self.matrix.eligible_mask(qi))
+
+    def match_many(self, scenarios) -> List[List[CompiledOffering]]:
+        """
+        Match several qualifications in one pass over the matrix.
+
+        Scenarios sharing the same choice-list values (the usual case when
+        one borrower compares FICO/LTV/loan amount variations) reuse the
+        same choice mask, so only the numeric columns are re-evaluated.
+        """
+        choice_masks: Dict[tuple, int] = {}
+        results = []
+        for qi in scenarios:
+            key = tuple(getattr(qi, attr) for attr, _ in OfferingMatrix.CHOICE_COLUMNS)
+            mask = choice_masks.get(key)
+            if mask is None:
+                mask = choice_masks[key] = self.matrix.choice_mask(qi)
+            if mask:
+                mask &= self.matrix.numeric_mask(qi)
+            results.append(self._decode(mask))
+        return results
+
+    def _decode(self, mask: int) -> List[CompiledOffering]:
+        offerings = self.offerings
+        return [offerings[i] for i in iter_mask(mask)]
+
+
+class PricingEngine:
+    """
+    Process-wide holder of the compiled pricing snapshot.
+
+    Use the module-level ``pricing_engine`` instance rather than creating
+    new engines; it is shared by every request in the worker process.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[PricingSnapshot] = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> PricingSnapshot:
+        """Return the current snapshot, rebuilding it if it is stale."""
+        generation = cache.get(GENERATION_CACHE_KEY)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != generation:
+                snapshot = self._build(generation)
+                self._snapshot = snapshot
+        return snapshot
+
+    def rebuild(self) -> PricingSnapshot:
+        """Force a rebuild from the database and return the new snapshot."""
+        with self._lock:
+            self._snapshot = self._build(cache.get(GENERATION_CACHE_KEY))
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        """
+        Drop the compiled snapshot.
+
+        The local snapshot is discarded immediately; the shared generation
+        token is bumped once the surrounding transaction commits so other
+        processes do not rebuild from uncommitted data.
+        """
+        self._snapshot = None
+        transaction.on_commit(self._publish_generation)
+
+    def _publish_generation(self) -> None:
+        self._snapshot = None
+        cache.set(GENERATION_CACHE_KEY, time.time_ns(), timeout=None)
+
+    def _build(self, generation: Any) -> PricingSnapshot:
+        from pricing.models import LenderProgramOffering
+
+        started = time.perf_counter()
+        offerings = list(
+            LenderProgramOffering.objects.filter(is_active=True)
+            .select_related('lender', 'program_type')
+        )
+
+        adjustments: Dict[int, List[CompiledAdjustment]] = {}
+        for adj in RateAdjustment.objects.filter(
+            offering__is_active=True
+        ).order_by():
+            adjustments.setdefault(adj.offering_id, []).append(
+                CompiledAdjustment(adj)
+            )
+
+        snapshot = PricingSnapshot(
+            [CompiledOffering(o, adjustments.get(o.pk, [])) for o in offerings],
+            generation,
+        )
+        logger.info(
+            "Compiled pricing engine: %d offerings, %d adjustments in %.1fms",
+            len(snapshot.offerings),
+            sum(len(v) for v in adjustments.values()),
+            (time.perf_counter() - started) * 1000,
+        )
+        return snapshot
+
+    def match(self, qi) -> List[CompiledOffering]:
+        """Return compiled offerings matching a QualifyingInfoDTO."""
+        return self.snapshot().match(qi)
+
+    def match_many(self, scenarios) -> List[List[CompiledOffering]]:
+        """Return compiled offerings matching each of several scenarios."""
+        return self.snapshot().match_many(scenarios)
+
+    @staticmethod
+    def compile_offering(offering) -> CompiledOffering:
+        """Compile a single offering on demand (e.g. one not in the snapshot)."""
+        return CompiledOffering(
+            offering,
+            [CompiledAdjustment(adj) for adj in offering.adjustments.all()],
+        )
+
+    @staticmethod
+    def stack(offering: CompiledOffering, qi) -> List[CompiledAdjustment]:
+        """
+        Collect every adjustment that applies to a qualification.
+
+        Qualification attributes that are missing or None are skipped, so
+        callers that only know FICO/LTV get just the grid adjustments.
+        """
+        index = offering.index
+        fico = getattr(qi, 'estimated_credit_score', None)
+        ltv = getattr(qi, 'ltv', None)
+        loan_amount = getattr(qi, 'loan_amount', None)
+        lock_period = getattr(qi, 'lock_period', None)
+
+        applied: List[CompiledAdjustment] = []
+        if fico is not None and ltv is not None:
+            applied.extend(index.grid(
+                RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV, fico, float(ltv)
+            ))
+        for adjustment_type, attr in KEYED_ADJUSTMENTS:
+            applied.extend(index.key(adjustment_type, getattr(qi, attr, None)))
+        if loan_amount is not None:
+            applied.extend(index.tier(
+                RateAdjustment.ADJUSTMENT_TYPE_LOAN_AMOUNT, float(loan_amount)
+            ))
+        if lock_period is not None:
+            applied.extend(index.tier(
+                RateAdjustment.ADJUSTMENT_TYPE_LOCK_PERIOD, float(lock_period)
+            ))
+            applied.extend(index.key(
+                RateAdjustment.ADJUSTMENT_TYPE_LOCK_PERIOD, lock_period
+            ))
+        return applied
+
+    @classmethod
+    def price(cls, offering: CompiledOffering, qi) -> Dict[str, Any]:
+        """
+        Stack all applicable LLPAs and convert them into rate.
+
+        total_points follows the RateAdjustment convention (positive =
+        credit, negative = cost). With a price ladder, base_rate is the par
+        rate and adjusted_rate the lowest rate whose price absorbs the
+        stacked points; without one both are min_rate. cost_points is what
+        the borrower pays at adjusted_rate (negative = credit).
+
+        Returns:
+            Dictionary with base_rate, adjusted_rate, total_points,
+            cost_points, adjustments_applied and a per-type points breakdown
+        """
+        applied = cls.stack(offering, qi)
+        breakdown: Dict[str, float] = {}
+        for adj in applied:
+            breakdown[adj.adjustment_type] = (
+                breakdown.get(adj.adjustment_type, 0.0) + adj.points
+            )
+        total_points = round(sum(breakdown.values()), 3)
+
+        if offering.ladder:
+            base_rate, _ = offering.ladder.rate_for(0.0)
+            adjusted_rate, net_price = offering.ladder.rate_for(total_points)
+        else:
+            base_rate = adjusted_rate = offering.min_rate
+            net_price = total_points
+
+        return {
+            'base_rate': base_rate,
+            'adjusted_rate': adjusted_rate,
+            'total_points': total_points,
+            'cost_points': -round(net_price, 3) or 0.0,
+            'adjustments_applied': len(applied),
+            'breakdown': {k: round(v, 3) for k, v in breakdown.items()},
+        }
+
+
+pricing_engine = PricingEngine()
@@ -7,7 +7,7 @@ against available lender program offerings.
 Ported from legacy cmtgdirect/loans/queries.py
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 from django.db.models import QuerySet
 
@@ -32,6 +32,7 @@ class QualifyingInfoDTO:
         loan_amount: float,
         ltv: float,
         estimated_credit_score: int,
+        lock_period: Optional[int] = None,
     ):
         """Initialize qualifying info with borrower details."""
         self.property_type = property_type
@@ -42,6 +43,22 @@ class QualifyingInfoDTO:
         self.loan_amount = loan_amount
         self.ltv = ltv
         self.estimated_credit_score = estimated_credit_score
+        self.lock_period = lock_period
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QualifyingInfoDTO':
+        """Build from a qualification data dictionary."""
+        return cls(
+            property_type=data['property_type'],
+            entity_type=data['entity_type'],
+            purpose=data['purpose'],
+            occupancy=data['occupancy'],
+            state=data['state'],
+            loan_amount=data['loan_amount'],
+            ltv=data['ltv'],
+            estimated_credit_score=data['estimated_credit_score'],
+            lock_period=data.get('lock_period'),
+        )
 
 
 def _get_filters_for_loan_program_match_by_qual(
@@ -164,16 +181,7 @@ class LoanMatchingService:
         Returns:
             QuerySet of matching LenderProgramOffering objects
         """
-        qi = QualifyingInfoDTO(
-            property_type=qualification_data['property_type'],
-            entity_type=qualification_data['entity_type'],
-            purpose=qualification_data['purpose'],
-            occupancy=qualification_data['occupancy'],
-            state=qualification_data['state'],
-            loan_amount=qualification_data['loan_amount'],
-            ltv=qualification_data['ltv'],
-            estimated_credit_score=qualification_data['estimated_credit_score']
-        )
+        qi = QualifyingInfoDTO.from_dict(qualification_data)
 
         return get_matched_loan_programs_for_qual(qi)
 
@@ -199,45 +207,65 @@ class LoanMatchingService:
     def get_adjusted_rate(
         offering: LenderProgramOffering,
         fico: int,
-        ltv: float
+        ltv: float,
+        qualification_data: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Calculate the adjusted rate/points for a specific FICO/LTV.
 
-        Queries RateAdjustment records that match the borrower's
-        FICO score and LTV, then applies them to the base rate.
+        Stacks every RateAdjustment type that applies to the borrower and
+        converts the total into rate on the offering's price ladder, if the
+        rate sheet has one.
+        Without qualification_data only the FICO × LTV grid can apply.
 
         Args:
             offering: LenderProgramOffering instance
             fico: Borrower's FICO score
             ltv: Loan-to-value ratio (as percentage, e.g., 80.0)
+            qualification_data: Optional borrower details (purpose,
+                occupancy, property_type, state, loan_amount, lock_period)
 
         Returns:
-            Dictionary with adjusted_rate and total_points
+            Dictionary with base_rate, adjusted_rate, total_points,
+            cost_points, adjustments_applied and breakdown
         """
-        from pricing.models import RateAdjustment
-
-        base_rate = float(offering.min_rate)
-        total_points = 0.0
-
-        # Get FICO/LTV grid adjustments
-        fico_ltv_adjustments = RateAdjustment.objects.filter(
-            offering=offering,
-            adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV,
-            row_min__lte=fico,
-            row_max__gte=fico,
-            col_min__lte=ltv,
-            col_max__gte=ltv
+        from pricing.services.engine import pricing_engine
+
+        compiled = pricing_engine.snapshot().by_id.get(offering.pk)
+        if compiled is None:
+            compiled = pricing_engine.compile_offering(offering)
+
+        data = qualification_data or {}
+        qi = QualifyingInfoDTO(
+            property_type=data.get('property_type'),
+            entity_type=data.get('entity_type'),
+            purpose=data.get('purpose'),
+            occupancy=data.get('occupancy'),
+            state=data.get('state'),
+            loan_amount=data.get('loan_amount'),
+            ltv=ltv,
+            estimated_credit_score=fico,
+            lock_period=data.get('lock_period'),
         )
+        return pricing_engine.price(compiled, qi)
 
-        for adj in fico_ltv_adjustments:
-            total_points += float(adj.adjustment_points)
+    @staticmethod
+    def _build_quote(offering, qi: QualifyingInfoDTO) -> Dict[str, Any]:
+        """Price a compiled offering for a qualification."""
+        from pricing.services.engine import pricing_engine
 
+        priced = pricing_engine.price(offering, qi)
         return {
-            'base_rate': base_rate,
-            'adjusted_rate': base_rate,  # Rate adjustments are typically in points
-            'total_points': round(total_points, 3),
-            'adjustments_applied': fico_ltv_adjustments.count()
+            'lender': offering.lender_name,
+            'program': offering.program_name,
+            'base_rate': priced['base_rate'],
+            'adjusted_rate': priced['adjusted_rate'],
+            'points': priced['total_points'],
+            'cost_points': priced['cost_points'],
+            'adjustments_applied': priced['adjustments_applied'],
+            'adjustments': priced['breakdown'],
+            'min_loan': offering.min_loan,
+            'max_loan': offering.max_loan,
         }
 
     @staticmethod
@@ -246,9 +274,12 @@ class LoanMatchingService:
         limit: int = 10
     ) -> list:
         """
-        Get quotes with FICO/LTV adjustments applied.
+        Get quotes with all applicable rate adjustments stacked.
 
-        This is the main method for getting real pricing.
+        This is the main method for getting real pricing. Matching and
+        adjustment lookups run against the compiled in-memory pricing
+        engine, so a warm engine answers without any database queries, and
+        results are cached per canonical scenario (see quote_cache).
 
         Args:
             qualification_data: Borrower qualification details
@@ -257,22 +288,40 @@ class LoanMatchingService:
         Returns:
             List of quote dictionaries with adjusted pricing
         """
-        matches = LoanMatchingService.match_programs(qualification_data)[:limit]
-        fico = qualification_data['estimated_credit_score']
-        ltv = qualification_data['ltv']
-
-        quotes = []
-        for offering in matches:
-            adjusted = LoanMatchingService.get_adjusted_rate(offering, fico, ltv)
-            quotes.append({
-                'lender': offering.lender.company_name,
-                'program': offering.program_type.name,
-                'base_rate': adjusted['base_rate'],
-                'adjusted_rate': adjusted['adjusted_rate'],
-                'points': adjusted['total_points'],
-                'adjustments_applied': adjusted['adjustments_applied'],
-                'min_loan': float(offering.min_loan),
-                'max_loan': float(offering.max_loan),
-            })
-
-        return quotes
+        from pricing.services.quote_cache import quote_cache
+
+        qi = QualifyingInfoDTO.from_dict(qualification_data)
+
+        def compute(snapshot):
+            matches = snapshot.match(qi)
+            quotes = [LoanMatchingService._build_quote(o, qi) for o in matches[:limit]]
+            return quotes, [o.lender_id for o in matches]
+
+        return quote_cache.get_or_compute(qi, limit, compute)
+
+    @staticmethod
+    def get_quotes_for_scenarios(
+        scenarios: List[QualifyingInfoDTO],
+        limit: int = 10
+    ) -> List[list]:
+        """
+        Get ranked quotes for many borrower scenarios at once.
+
+        All scenarios are matched against the same compiled snapshot in a
+        single pass over the offering matrix, instead of one filter query
+        per scenario.
+
+        Args:
+            scenarios: QualifyingInfoDTO objects to price
+            limit: Maximum number of quotes per scenario
+
+        Returns:
+            One list of quote dictionaries per scenario, in input order
+        """
+        from pricing.services.engine import pricing_engine
+
+        matches = pricing_engine.match_many(scenarios)
+        return [
+            [LoanMatchingService._build_quote(o, qi) for o in offerings[:limit]]
+            for qi, offerings in zip(scenarios, matches)
+        ]
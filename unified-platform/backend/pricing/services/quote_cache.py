@@ -0,0 +1,223 @@
+"""
+Quote result cache for LoanMatchingService.get_quotes_with_adjustments.
+
+Scenarios are keyed canonically: choice values are kept as-is while FICO,
+LTV and loan amount are replaced by the pricing snapshot's bucket for each
+(see ScenarioBuckets), so requests that differ only by noise inside a grid
+cell share one entry without ever returning a different price.
+
+Two tiers are used:
+- a bounded in-process LRU with TTL, always on
+- the Django cache, when PRICING_QUOTE_CACHE_SHARED is enabled
+
+Every entry remembers the lenders that were eligible for it. Rate sheet
+ingestion bumps a per-lender version, which invalidates only entries that
+lender could have appeared in; changes that can alter eligibility itself
+(new or deactivated offerings, lender states, program criteria) bump a
+global version instead.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GLOBAL_VERSION_KEY = 'pricing:quote-cache:version'
+LENDER_VERSION_KEY = 'pricing:quote-cache:lender:{}'
+ENTRY_KEY = 'pricing:quote-cache:entry:{}'
+
+
+class _Entry:
+    __slots__ = ('expires_at', 'global_version', 'lender_versions', 'quotes')
+
+    def __init__(self, expires_at, global_version, lender_versions, quotes):
+        self.expires_at = expires_at
+        self.global_version = global_version
+        self.lender_versions = lender_versions
+        self.quotes = quotes
+
+
+class QuoteCache:
+    """
+    Two-tier cache of quote lists keyed by canonical scenario.
+
+    Use the module-level ``quote_cache`` instance.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[int] = None,
+        shared: Optional[bool] = None
+    ):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._shared = shared
+        self._entries: 'OrderedDict[tuple, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self) -> int:
+        if self._max_entries is None:
+            return getattr(settings, 'PRICING_QUOTE_CACHE_SIZE', 10000)
+        return self._max_entries
+
+    @property
+    def ttl(self) -> int:
+        if self._ttl is None:
+            return getattr(settings, 'PRICING_QUOTE_CACHE_TTL', 300)
+        return self._ttl
+
+    @property
+    def shared(self) -> bool:
+        if self._shared is None:
+            return getattr(settings, 'PRICING_QUOTE_CACHE_SHARED', False)
+        return self._shared
+
+    def get_or_compute(
+        self,
+        qi,
+        limit: int,
+        compute: Callable[[Any], Tuple[List[dict], Iterable[int]]]
+    ) -> List[dict]:
+        """
+        Return cached quotes for a scenario, computing them on a miss.
+
+        Args:
+            qi: QualifyingInfoDTO for the scenario
+            limit: Maximum number of quotes (part of the key)
+            compute: Called with the pricing snapshot on a miss; returns
+                (quotes, lender_ids) where lender_ids are every lender
+                eligible for the scenario, not only the returned ones
+
+        Returns:
+            List of quote dictionaries (copies safe to mutate)
+        """
+        from pricing.services.engine import GENERATION_CACHE_KEY, pricing_engine
+
+        if self.max_entries <= 0:
+            quotes, _ = compute(pricing_engine.snapshot())
+            return quotes
+
+        snapshot = pricing_engine.snapshot()
+        key = snapshot.buckets.key(qi) + (limit,)
+        now = time.monotonic()
+
+        entry = self._get_local(key, now)
+        if entry is None:
+            entry = self._get_shared(key, now)
+            if entry is not None:
+                self._set_local(key, entry)
+        if entry is not None and self._is_current(entry):
+            self.hits += 1
+            return [dict(q) for q in entry.quotes]
+
+        self.misses += 1
+        global_version = self._global_version()
+        quotes, lender_ids = compute(snapshot)
+        lender_versions = self._lender_versions(lender_ids)
+
+        # Skip storing if pricing changed while computing; the versions read
+        # above may already be newer than the snapshot the quotes came from.
+        if cache.get(GENERATION_CACHE_KEY) == snapshot.generation:
+            entry = _Entry(now + self.ttl, global_version, lender_versions, quotes)
+            self._set_local(key, entry)
+            self._set_shared(key, entry)
+
+        return [dict(q) for q in quotes]
+
+    def invalidate_lender(self, lender_id: int) -> None:
+        """Invalidate entries the lender was eligible for, now and on commit."""
+        key = LENDER_VERSION_KEY.format(lender_id)
+        self._bump(key)
+        transaction.on_commit(lambda: self._bump(key))
+
+    def invalidate_all(self) -> None:
+        """Invalidate every entry, now and again when the transaction commits."""
+        self._bump(GLOBAL_VERSION_KEY)
+        transaction.on_commit(lambda: self._bump(GLOBAL_VERSION_KEY))
+
+    def clear(self) -> None:
+        """Drop the local tier and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _bump(key: str) -> None:
+        cache.set(key, time.time_ns(), timeout=None)
+
+    @staticmethod
+    def _global_version():
+        return cache.get(GLOBAL_VERSION_KEY, 0)
+
+    @staticmethod
+    def _lender_versions(lender_ids: Iterable[int]) -> Dict[int, Any]:
+        keys = {LENDER_VERSION_KEY.format(i): i for i in set(lender_ids)}
+        found = cache.get_many(list(keys))
+        return {lender_id: found.get(k, 0) for k, lender_id in keys.items()}
+
+    def _is_current(self, entry: _Entry) -> bool:
+        if entry.global_version != self._global_version():
+            return False
+        return entry.lender_versions == self._lender_versions(entry.lender_versions)
+
+    def _get_local(self, key: tuple, now: float) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _set_local(self, key: tuple, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, key: tuple, now: float) -> Optional[_Entry]:
+        if not self.shared:
+            return None
+        stored = cache.get(self._shared_key(key))
+        if stored is None:
+            return None
+        global_version, lender_versions, quotes = stored
+        return _Entry(now + self.ttl, global_version, lender_versions, quotes)
+
+    def _set_shared(self, key: tuple, entry: _Entry) -> None:
+        if not self.shared:
+            return
+        cache.set(
+            self._shared_key(key),
+            (entry.global_version, entry.lender_versions, entry.quotes),
+            timeout=self.ttl,
+        )
+
+    @staticmethod
+    def _shared_key(key: tuple) -> str:
+        return ENTRY_KEY.format(hashlib.sha1(repr(key).encode()).hexdigest())
+
+
+quote_cache = QuoteCache()
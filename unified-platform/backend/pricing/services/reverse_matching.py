@@ -0,0 +1,212 @@
+"""
+Reverse matching of stored leads against lender program offerings.
+
+``get_quals_for_loan_program`` answers "which leads fit this offering" with
+one large query per offering. After a rate sheet lands we want that answer
+for every changed offering at once, so this module keeps leads in memory:
+
+- bucketed by (state, property_type, purpose, occupancy), the exact-match
+  criteria, so an offering only visits the buckets it allows
+- inside a bucket, leads are sorted by loan amount with LTV, FICO and
+  entity type held in parallel arrays, so the loan range is a bisect and
+  the remaining checks are array reads
+
+Matches are yielded as they are found and a RematchStats object reports
+throughput in leads/sec once the stream is exhausted. When no index is
+passed, only the buckets the requested offerings can visit are loaded.
+"""
+
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import product
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from django.db.models import Q
+
+from pricing.models import LenderProgramOffering, QualifyingInfo
+
+logger = logging.getLogger(__name__)
+
+LEAD_FIELDS = (
+    'id', 'state', 'property_type', 'purpose', 'occupancy',
+    'entity_type', 'loan_amount', 'ltv', 'estimated_credit_score',
+)
+
+
+class _LeadBucket:
+    """Leads sharing the exact-match criteria, sorted by loan amount."""
+
+    __slots__ = ('loan_amounts', 'ltvs', 'ficos', 'entities', 'ids')
+
+    def __init__(self, rows):
+        rows.sort(key=lambda r: r[1])
+        self.ids = array('q', (r[0] for r in rows))
+        self.loan_amounts = array('d', (r[1] for r in rows))
+        self.ltvs = array('d', (r[2] for r in rows))
+        self.ficos = array('H', (r[3] for r in rows))
+        self.entities = array('B', (r[4] for r in rows))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class LeadIndex:
+    """In-memory index of QualifyingInfo leads for reverse matching."""
+
+    def __init__(self, rows: Iterable[tuple]):
+        self.entity_codes: Dict[str, int] = {}
+        pending: Dict[tuple, list] = {}
+        for (lead_id, state, property_type, purpose, occupancy,
+             entity_type, loan_amount, ltv, fico) in rows:
+            code = self.entity_codes.setdefault(entity_type, len(self.entity_codes))
+            pending.setdefault((state, property_type, purpose, occupancy), []).append(
+                (lead_id, float(loan_amount), float(ltv), fico, code)
+            )
+        self.buckets = {key: _LeadBucket(r) for key, r in pending.items()}
+        self.size = sum(len(b) for b in self.buckets.values())
+
+    @classmethod
+    def load(cls, queryset=None, chunk_size: int = 10000) -> 'LeadIndex':
+        """Build the index by streaming leads from the database."""
+        queryset = QualifyingInfo.objects.all() if queryset is None else queryset
+        started = time.perf_counter()
+        index = cls(
+            queryset.order_by().values_list(*LEAD_FIELDS).iterator(chunk_size=chunk_size)
+        )
+        logger.info(
+            "Loaded %d leads into %d buckets in %.2fs",
+            index.size, len(index.buckets), time.perf_counter() - started,
+        )
+        return index
+
+    @classmethod
+    def load_for(cls, offerings, chunk_size: int = 10000) -> 'LeadIndex':
+        """Build an index holding only leads in buckets the compiled offerings visit."""
+        offerings = list(offerings)
+        return cls.load(
+            QualifyingInfo.objects.filter(
+                state__in={s for o in offerings for s in o.states},
+                property_type__in={p for o in offerings for p in o.property_types},
+                purpose__in={p for o in offerings for p in o.purposes},
+                occupancy__in={c for o in offerings for c in o.occupancy},
+            ),
+            chunk_size,
+        )
+
+    def match(self, offering, stats: Optional['RematchStats'] = None) -> Iterator[int]:
+        """
+        Yield ids of leads eligible for a compiled offering.
+
+        Mirrors the criteria of ``get_quals_for_loan_program``.
+        """
+        entities = {
+            self.entity_codes[e] for e in offering.entity_types
+            if e in self.entity_codes
+        }
+        if not entities:
+            return
+
+        for key in product(
+            offering.states, offering.property_types,
+            offering.purposes, offering.occupancy,
+        ):
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                continue
+            lo = bisect_left(bucket.loan_amounts, offering.min_loan)
+            hi = bisect_right(bucket.loan_amounts, offering.max_loan)
+            if stats is not None:
+                stats.leads_scanned += hi - lo
+
+            ltvs, ficos, codes, ids = bucket.ltvs, bucket.ficos, bucket.entities, bucket.ids
+            max_ltv, min_fico = offering.max_ltv, offering.min_fico
+            for i in range(lo, hi):
+                if ltvs[i] <= max_ltv and ficos[i] >= min_fico and codes[i] in entities:
+                    yield ids[i]
+
+
+class RematchStats:
+    """
+    Counters for one reverse matching run.
+
+    Timing starts when the stats object is created, so create it before
+    loading the lead index to include the load in ``elapsed``.
+    """
+
+    def __init__(self, leads_indexed: int = 0):
+        self.leads_indexed = leads_indexed
+        self.offerings = 0
+        self.leads_scanned = 0
+        self.matches = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def leads_per_sec(self) -> float:
+        """Leads evaluated (inside an offering's buckets and loan range) per second."""
+        elapsed = self.elapsed
+        return self.leads_scanned / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'leads_indexed': self.leads_indexed,
+            'offerings': self.offerings,
+            'leads_scanned': self.leads_scanned,
+            'matches': self.matches,
+            'elapsed_sec': round(self.elapsed, 4),
+            'leads_per_sec': round(self.leads_per_sec, 1),
+        }
+
+
+def changed_offering_ids(since=None, lender_id: Optional[int] = None) -> list:
+    """
+    IDs of active offerings changed since a timestamp and/or for a lender.
+
+    An offering counts as changed when it or any of its adjustments was
+    updated at or after ``since``.
+    """
+    queryset = LenderProgramOffering.objects.filter(is_active=True)
+    if lender_id is not None:
+        queryset = queryset.filter(lender_id=lender_id)
+    if since is not None:
+        queryset = queryset.filter(
+            Q(updated_at__gte=since) | Q(adjustments__updated_at__gte=since)
+        )
+    return list(queryset.values_list('id', flat=True).distinct())
+
+
+def rematch_offerings(
+    offering_ids: Iterable[int],
+    index: Optional[LeadIndex] = None,
+    stats: Optional[RematchStats] = None,
+) -> Iterator[Tuple[int, int]]:
+    """
+    Stream (offering_id, lead_id) pairs for the given offerings.
+
+    Offerings are taken from the compiled pricing engine snapshot. Without
+    an ``index``, leads are loaded for just those offerings' buckets. Pass
+    a RematchStats to read throughput once the iterator is exhausted.
+    """
+    from pricing.services.engine import pricing_engine
+
+    stats = RematchStats() if stats is None else stats
+    snapshot = pricing_engine.snapshot()
+    offerings = [snapshot.by_id[i] for i in offering_ids if i in snapshot.by_id]
+    index = LeadIndex.load_for(offerings) if index is None else index
+    stats.leads_indexed = index.size
+
+    for offering in offerings:
+        stats.offerings += 1
+        for lead_id in index.match(offering, stats):
+            stats.matches += 1
+            yield offering.id, lead_id
+
+    stats.finished = time.perf_counter()
+    logger.info("Reverse match complete: %s", stats.as_dict())
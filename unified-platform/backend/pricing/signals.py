@@ -0,0 +1,64 @@
+"""
+Signal handlers for the pricing app.
+
+Any change to the models compiled into the in-memory pricing engine
+invalidates the engine snapshot so the next quote sees fresh data, and
+the quote cache is invalidated as narrowly as the change allows.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from pricing.models import (
+    Lender,
+    LenderProgramOffering,
+    ProgramType,
+    RateAdjustment,
+)
+from pricing.services.engine import pricing_engine
+from pricing.services.quote_cache import quote_cache
+
+# Offering fields that affect price but not eligibility. Saves limited to
+# these only need to invalidate cached quotes the lender was eligible for.
+PRICE_ONLY_OFFERING_FIELDS = frozenset({
+    'min_rate', 'max_rate', 'min_points', 'max_points', 'price_ladder', 'lender_fee',
+    'rate_sheet_url', 'last_rate_update', 'notes', 'updated_at',
+})
+
+
+@receiver(post_save, sender=Lender)
+@receiver(post_delete, sender=Lender)
+@receiver(post_save, sender=ProgramType)
+@receiver(post_delete, sender=ProgramType)
+@receiver(post_delete, sender=LenderProgramOffering)
+def invalidate_pricing_engine(sender, **kwargs):
+    """Drop the compiled pricing snapshot and all cached quotes."""
+    pricing_engine.invalidate()
+    quote_cache.invalidate_all()
+
+
+@receiver(post_save, sender=LenderProgramOffering)
+def invalidate_offering_pricing(sender, instance, created, update_fields=None, **kwargs):
+    """Invalidate quotes for the lender, or all quotes if eligibility may change."""
+    pricing_engine.invalidate()
+    if not created and update_fields and PRICE_ONLY_OFFERING_FIELDS.issuperset(update_fields):
+        quote_cache.invalidate_lender(instance.lender_id)
+    else:
+        quote_cache.invalidate_all()
+
+
+@receiver(post_save, sender=RateAdjustment)
+@receiver(post_delete, sender=RateAdjustment)
+def invalidate_adjustment_pricing(sender, instance, **kwargs):
+    """
+    Adjustments only change price, so only the lender's quotes are stale.
+
+    The lender is read from the cached offering when available; looking it
+    up would cost a query per row during bulk deletes, so those fall back
+    to invalidating everything.
+    """
+    pricing_engine.invalidate()
+    if RateAdjustment.offering.is_cached(instance):
+        quote_cache.invalidate_lender(instance.offering.lender_id)
+    else:
+        quote_cache.invalidate_all()
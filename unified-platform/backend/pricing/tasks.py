@@ -0,0 +1,40 @@
+from celery import shared_task
+from django.utils.dateparse import parse_datetime
+import logging
+
+from .services.reverse_matching import (
+    RematchStats,
+    changed_offering_ids,
+    rematch_offerings,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def rematch_leads_for_lender(lender_id, since=None):
+    """
+    Celery task to re-run reverse matching for a lender's changed offerings.
+
+    Args:
+        lender_id: Lender whose offerings changed
+        since: Optional ISO timestamp; only offerings (or their adjustments)
+            updated at or after it are re-matched
+    """
+    offering_ids = changed_offering_ids(
+        since=parse_datetime(since) if since else None,
+        lender_id=lender_id,
+    )
+    if not offering_ids:
+        logger.info(f"No changed offerings to re-match for lender {lender_id}")
+        return {'offerings': 0, 'matches': 0}
+
+    stats = RematchStats()
+    matches_by_offering = {}
+    for offering_id, _lead_id in rematch_offerings(offering_ids, stats=stats):
+        matches_by_offering[offering_id] = matches_by_offering.get(offering_id, 0) + 1
+
+    summary = stats.as_dict()
+    summary['matches_by_offering'] = matches_by_offering
+    logger.info(f"Re-matched leads for lender {lender_id}: {summary}")
+    return summary
@@ -0,0 +1,83 @@
+import random
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from pricing.services.adjustment_index import AdjustmentIndex
+
+
+def adj(adjustment_type, points, value_key='', row=(None, None), col=(None, None)):
+    return SimpleNamespace(
+        adjustment_type=adjustment_type,
+        value_key=value_key,
+        row_min=row[0],
+        row_max=row[1],
+        col_min=col[0],
+        col_max=col[1],
+        points=points,
+    )
+
+
+class AdjustmentIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.grid = [
+            adj('fico_ltv', -0.5, row=(620, 679), col=(0, 60)),
+            adj('fico_ltv', 0.25, row=(620, 679), col=(60.01, 75)),
+            adj('fico_ltv', -0.75, row=(680, 739), col=(0, 60)),
+            adj('fico_ltv', 0.125, row=(680, 739), col=(60.01, 75)),
+            adj('fico_ltv', -1.0, row=(740, 850), col=(0, 75)),
+        ]
+        self.index = AdjustmentIndex(self.grid + [
+            adj('loan_amount', 0.5, row=(0, 149999.99)),
+            adj('loan_amount', -0.25, row=(1000000, 3000000)),
+            adj('purpose', 0.375, value_key='Refinance'),
+            adj('state', 0.1, value_key='NY'),
+            adj('fico_ltv', 9.0, row=(620, None), col=(0, 60)),
+        ])
+
+    def test_grid_cell_lookup(self):
+        self.assertEqual(
+            [a.points for a in self.index.grid('fico_ltv', 650, 70.0)], [0.25]
+        )
+        self.assertEqual(
+            [a.points for a in self.index.grid('fico_ltv', 680, 60)], [-0.75]
+        )
+        self.assertEqual(
+            [a.points for a in self.index.grid('fico_ltv', 850, 75)], [-1.0]
+        )
+
+    def test_grid_gaps_and_outside_bounds(self):
+        self.assertEqual(self.index.grid('fico_ltv', 679.5, 50), ())
+        self.assertEqual(self.index.grid('fico_ltv', 700, 60.005), ())
+        self.assertEqual(self.index.grid('fico_ltv', 700, 76), ())
+        self.assertEqual(self.index.grid('fico_ltv', 600, 50), ())
+
+    def test_tiers_and_keyed_lookups(self):
+        self.assertEqual(
+            [a.points for a in self.index.tier('loan_amount', 100000)], [0.5]
+        )
+        self.assertEqual(self.index.tier('loan_amount', 500000), ())
+        self.assertEqual(
+            [a.points for a in self.index.key('purpose', 'refinance')], [0.375]
+        )
+        self.assertEqual(self.index.key('purpose', 'purchase'), ())
+        self.assertEqual(self.index.key('lock_period', None), ())
+
+    def test_grid_matches_brute_force_scan(self):
+        rng = random.Random(7)
+        cells = [
+            adj('fico_ltv', rng.uniform(-2, 2),
+                row=sorted((rng.randint(600, 850), rng.randint(600, 850))),
+                col=sorted((rng.uniform(0, 90), rng.uniform(0, 90))))
+            for _ in range(200)
+        ]
+        index = AdjustmentIndex(cells)
+
+        for _ in range(500):
+            fico = rng.choice([rng.randint(590, 860), cells[rng.randrange(200)].row_min])
+            ltv = rng.choice([rng.uniform(0, 95), cells[rng.randrange(200)].col_max])
+            expected = {
+                id(c) for c in cells
+                if c.row_min <= fico <= c.row_max and c.col_min <= ltv <= c.col_max
+            }
+            self.assertEqual({id(c) for c in index.grid('fico_ltv', fico, ltv)}, expected)
@@ -0,0 +1,248 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+
+from pricing.models import (
+    Lender,
+    LenderProgramOffering,
+    ProgramType,
+    RateAdjustment,
+)
+from pricing.services.engine import PriceLadder, pricing_engine
+from pricing.services.matching import LoanMatchingService, QualifyingInfoDTO
+
+
+class PricingEngineTests(TestCase):
+    def setUp(self):
+        self.lender = Lender.objects.create(
+            company_name="Engine Lender",
+            include_states=["CA", "TX"]
+        )
+        self.program_type = ProgramType.objects.create(
+            name="Engine DSCR",
+            category="non_qm",
+            property_types=["residential"],
+            entity_types=["individual"],
+            purposes=["purchase"],
+            occupancy=["investment"]
+        )
+        self.offering = LenderProgramOffering.objects.create(
+            lender=self.lender,
+            program_type=self.program_type,
+            min_rate=7.0,
+            max_rate=9.0,
+            min_fico=620,
+            max_ltv=80.0,
+            min_loan=Decimal("100000.00"),
+            max_loan=Decimal("2000000.00"),
+        )
+        RateAdjustment.objects.create(
+            offering=self.offering,
+            adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV,
+            row_min=680,
+            row_max=739,
+            col_min=60.01,
+            col_max=75,
+            adjustment_points=0.125
+        )
+        self.qualification_data = {
+            'property_type': 'residential',
+            'entity_type': 'individual',
+            'purpose': 'purchase',
+            'occupancy': 'investment',
+            'state': 'CA',
+            'loan_amount': 500000.0,
+            'ltv': 70.0,
+            'estimated_credit_score': 700,
+        }
+
+    def test_quotes_served_without_queries_once_warm(self):
+        pricing_engine.rebuild()
+
+        with self.assertNumQueries(0):
+            quotes = LoanMatchingService.get_quotes_with_adjustments(
+                self.qualification_data
+            )
+
+        self.assertEqual(len(quotes), 1)
+        self.assertEqual(quotes[0]['lender'], "Engine Lender")
+        self.assertEqual(quotes[0]['points'], 0.125)
+        self.assertEqual(quotes[0]['adjustments_applied'], 1)
+
+    def test_offering_change_invalidates_snapshot(self):
+        pricing_engine.rebuild()
+
+        self.offering.is_active = False
+        self.offering.save()
+
+        quotes = LoanMatchingService.get_quotes_with_adjustments(
+            self.qualification_data
+        )
+        self.assertEqual(quotes, [])
+
+    def test_ineligible_state_not_matched(self):
+        data = dict(self.qualification_data, state='WA')
+        self.assertEqual(
+            LoanMatchingService.get_quotes_with_adjustments(data), []
+        )
+
+    def test_match_many_matches_each_scenario(self):
+        cheaper = LenderProgramOffering.objects.create(
+            lender=Lender.objects.create(
+                company_name="Cheaper Lender",
+                include_states=["CA"]
+            ),
+            program_type=self.program_type,
+            min_rate=6.5,
+            max_rate=8.0,
+            min_fico=700,
+            max_ltv=65.0,
+            min_loan=Decimal("100000.00"),
+            max_loan=Decimal("1000000.00"),
+        )
+        base = dict(self.qualification_data)
+        del base['ltv'], base['estimated_credit_score']
+        scenarios = [
+            QualifyingInfoDTO(**base, ltv=60.0, estimated_credit_score=720),
+            QualifyingInfoDTO(**base, ltv=70.0, estimated_credit_score=720),
+            QualifyingInfoDTO(**base, ltv=60.0, estimated_credit_score=600),
+        ]
+
+        results = pricing_engine.match_many(scenarios)
+
+        self.assertEqual([o.id for o in results[0]], [cheaper.id, self.offering.id])
+        self.assertEqual([o.id for o in results[1]], [self.offering.id])
+        self.assertEqual(results[2], [])
+        for qi, offerings in zip(scenarios, results):
+            self.assertEqual(offerings, pricing_engine.match(qi))
+
+    def test_get_quotes_for_scenarios_keeps_input_order(self):
+        base = dict(self.qualification_data)
+        del base['state']
+        scenarios = [
+            QualifyingInfoDTO(**base, state='WA'),
+            QualifyingInfoDTO(**base, state='CA'),
+        ]
+
+        results = LoanMatchingService.get_quotes_for_scenarios(scenarios)
+
+        self.assertEqual(results[0], [])
+        self.assertEqual(results[1][0]['lender'], "Engine Lender")
+
+    def test_quote_stacks_every_adjustment_type(self):
+        for adjustment_type, value_key, points in [
+            (RateAdjustment.ADJUSTMENT_TYPE_PURPOSE, 'purchase', 0.25),
+            (RateAdjustment.ADJUSTMENT_TYPE_OCCUPANCY, 'investment', 0.5),
+            (RateAdjustment.ADJUSTMENT_TYPE_STATE, 'CA', 0.125),
+            (RateAdjustment.ADJUSTMENT_TYPE_STATE, 'TX', 5.0),
+        ]:
+            RateAdjustment.objects.create(
+                offering=self.offering,
+                adjustment_type=adjustment_type,
+                value_key=value_key,
+                adjustment_points=points
+            )
+        RateAdjustment.objects.create(
+            offering=self.offering,
+            adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_LOAN_AMOUNT,
+            row_min=400000,
+            row_max=750000,
+            adjustment_points=-0.25
+        )
+
+        quote = LoanMatchingService.get_quotes_with_adjustments(
+            self.qualification_data
+        )[0]
+
+        self.assertEqual(quote['adjustments_applied'], 5)
+        self.assertEqual(quote['points'], 0.75)
+        self.assertEqual(quote['adjustments'], {
+            'fico_ltv': 0.125,
+            'purpose': 0.25,
+            'occupancy': 0.5,
+            'state': 0.125,
+            'loan_amount': -0.25,
+        })
+        # Points are not converted into rate
+        self.assertEqual(quote['adjusted_rate'], 7.0)
+        self.assertEqual(quote['cost_points'], -0.75)
+
+    def test_grid_signs_favour_strong_borrowers(self):
+        # Acra DSCR grid: credit for 780+ at <=50 LTV, cost at high LTV
+        RateAdjustment.objects.filter(offering=self.offering).delete()
+        for row_min, row_max, col_min, col_max, points in [
+            (780, 850, 0, 50, 1.625),
+            (620, 659, 75.01, 80, -3.5),
+        ]:
+            RateAdjustment.objects.create(
+                offering=self.offering,
+                adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV,
+                row_min=row_min, row_max=row_max,
+                col_min=col_min, col_max=col_max,
+                adjustment_points=points
+            )
+
+        strong = LoanMatchingService.get_adjusted_rate(self.offering, 790, 45.0)
+        weak = LoanMatchingService.get_adjusted_rate(self.offering, 640, 78.0)
+
+        self.assertEqual((strong['total_points'], strong['cost_points']), (1.625, -1.625))
+        self.assertEqual((weak['total_points'], weak['cost_points']), (-3.5, 3.5))
+        self.assertLess(strong['cost_points'], weak['cost_points'])
+        self.assertEqual(strong['adjusted_rate'], weak['adjusted_rate'])
+
+    def test_price_ladder_converts_points_into_rate(self):
+        self.offering.price_ladder = [[7.0, -0.5], [7.125, 0.0], [7.25, 0.375], [7.5, 1.0]]
+        self.offering.save()
+
+        # 0.125 grid credit at 700 / 70% LTV buys down to par at 7.125
+        credit = LoanMatchingService.get_adjusted_rate(self.offering, 700, 70.0)
+        RateAdjustment.objects.create(
+            offering=self.offering,
+            adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_PURPOSE,
+            value_key='purchase',
+            adjustment_points=-0.5
+        )
+        cost = LoanMatchingService.get_adjusted_rate(
+            self.offering, 700, 70.0, {'purpose': 'purchase'}
+        )
+
+        self.assertEqual(credit['base_rate'], 7.125)
+        self.assertEqual((credit['adjusted_rate'], credit['cost_points']), (7.125, -0.125))
+        # -0.375 stacked needs a rate priced at 0.375 or better
+        self.assertEqual((cost['adjusted_rate'], cost['cost_points']), (7.25, 0.0))
+
+    def test_get_adjusted_rate_without_qualification_uses_grid_only(self):
+        RateAdjustment.objects.create(
+            offering=self.offering,
+            adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_PURPOSE,
+            value_key='purchase',
+            adjustment_points=0.25
+        )
+
+        grid_only = LoanMatchingService.get_adjusted_rate(self.offering, 700, 70.0)
+        stacked = LoanMatchingService.get_adjusted_rate(
+            self.offering, 700, 70.0, {'purpose': 'purchase'}
+        )
+
+        self.assertEqual(grid_only['total_points'], 0.125)
+        self.assertEqual(grid_only['adjusted_rate'], 7.0)
+        self.assertEqual(stacked['total_points'], 0.375)
+
+
+class PriceLadderTests(SimpleTestCase):
+    def test_lowest_rate_absorbing_the_points(self):
+        ladder = PriceLadder([[7.25, 0.375], [7.0, -0.5], [7.125, 0.0]])
+
+        self.assertEqual(ladder.rates, (7.0, 7.125, 7.25))
+        self.assertEqual(ladder.rate_for(0.5), (7.0, 0.0))
+        self.assertEqual(ladder.rate_for(0.0), (7.125, 0.0))
+        self.assertEqual(ladder.rate_for(-0.25), (7.25, 0.125))
+
+    def test_points_beyond_the_ladder_stay_at_the_best_price(self):
+        ladder = PriceLadder([[7.0, 0.0], [7.125, 0.75], [7.25, 0.5]])
+
+        rate, net_price = ladder.rate_for(-0.6)
+        self.assertEqual(rate, 7.125)
+        self.assertAlmostEqual(net_price, 0.15)
+        self.assertEqual(ladder.rate_for(-2.0), (7.125, -1.25))
+        self.assertFalse(PriceLadder([]))
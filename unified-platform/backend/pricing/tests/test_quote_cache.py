@@ -0,0 +1,121 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from pricing.models import (
+    Lender,
+    LenderProgramOffering,
+    ProgramType,
+    RateAdjustment,
+)
+from pricing.services.matching import LoanMatchingService
+from pricing.services.quote_cache import quote_cache
+from ratesheets.services.ingestion import update_pricing_from_extraction
+
+
+class QuoteCacheTests(TestCase):
+    def setUp(self):
+        self.program_type = ProgramType.objects.create(
+            name="Cache DSCR",
+            category="non_qm",
+            property_types=["residential"],
+            entity_types=["individual"],
+            purposes=["purchase"],
+            occupancy=["investment"]
+        )
+        self.lender = Lender.objects.create(
+            company_name="Cache Lender",
+            include_states=["CA"]
+        )
+        self.other_lender = Lender.objects.create(
+            company_name="Other Lender",
+            include_states=["TX"]
+        )
+        self.offering = self._offering(self.lender, 7.0)
+        self.other_offering = self._offering(self.other_lender, 6.0)
+        RateAdjustment.objects.create(
+            offering=self.offering,
+            adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV,
+            row_min=680,
+            row_max=739,
+            col_min=60.01,
+            col_max=75,
+            adjustment_points=0.25
+        )
+        self.qualification_data = {
+            'property_type': 'residential',
+            'entity_type': 'individual',
+            'purpose': 'purchase',
+            'occupancy': 'investment',
+            'state': 'CA',
+            'loan_amount': 500000.0,
+            'ltv': 70.0,
+            'estimated_credit_score': 700,
+        }
+        quote_cache.clear()
+
+    def _offering(self, lender, rate):
+        return LenderProgramOffering.objects.create(
+            lender=lender,
+            program_type=self.program_type,
+            min_rate=rate,
+            max_rate=rate + 2,
+            min_fico=620,
+            max_ltv=80.0,
+            min_loan=Decimal("100000.00"),
+            max_loan=Decimal("2000000.00"),
+        )
+
+    def _quote(self, **overrides):
+        return LoanMatchingService.get_quotes_with_adjustments(
+            dict(self.qualification_data, **overrides)
+        )
+
+    def test_scenarios_in_same_grid_cell_share_entry(self):
+        first = self._quote()
+        second = self._quote(estimated_credit_score=712, ltv=68.4)
+
+        self.assertEqual(first, second)
+        self.assertEqual(quote_cache.stats()['hits'], 1)
+
+    def test_crossing_grid_boundary_is_a_separate_entry(self):
+        self._quote()
+        below = self._quote(estimated_credit_score=679)
+
+        self.assertEqual(below[0]['points'], 0.0)
+        self.assertEqual(quote_cache.stats()['misses'], 2)
+
+    def test_other_lender_ingestion_keeps_entry(self):
+        self._quote()
+
+        update_pricing_from_extraction(self.other_lender, {'programs': []})
+        self._quote()
+
+        self.assertEqual(quote_cache.stats()['hits'], 1)
+
+    def test_adjustment_change_invalidates_lender_entries(self):
+        self.assertEqual(self._quote()[0]['points'], 0.25)
+
+        RateAdjustment.objects.filter(offering=self.offering).get().delete()
+        RateAdjustment.objects.create(
+            offering=self.offering,
+            adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV,
+            row_min=680,
+            row_max=739,
+            col_min=60.01,
+            col_max=75,
+            adjustment_points=0.5
+        )
+
+        self.assertEqual(self._quote()[0]['points'], 0.5)
+        self.assertEqual(quote_cache.stats()['hits'], 0)
+
+    def test_lru_evicts_oldest_entry(self):
+        quote_cache._max_entries = 2
+        try:
+            self._quote(state='CA')
+            self._quote(state='TX')
+            self._quote(state='NV')
+            self.assertEqual(quote_cache.stats()['entries'], 2)
+        finally:
+            quote_cache._max_entries = None
@@ -0,0 +1,121 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from pricing import choices
+from pricing.models import (
+    Lender,
+    LenderProgramOffering,
+    ProgramType,
+    QualifyingInfo,
+    RateAdjustment,
+)
+from pricing.services.matching import get_quals_for_loan_program
+from pricing.services.reverse_matching import (
+    RematchStats,
+    changed_offering_ids,
+    rematch_offerings,
+)
+from pricing.tasks import rematch_leads_for_lender
+
+
+class LeadIndexTests(TestCase):
+    def setUp(self):
+        self.lender = Lender.objects.create(
+            company_name="Reverse Lender",
+            include_states=["CA", "TX"]
+        )
+        self.program_type = ProgramType.objects.create(
+            name="Reverse DSCR",
+            category="non_qm",
+            property_types=[choices.PROPERTY_TYPE_RESIDENTIAL],
+            entity_types=[choices.BORROWING_ENTITY_TYPE_LLC],
+            purposes=[choices.LOAN_PURPOSE_PURCHASE],
+            occupancy=[choices.OCCUPANCY_INVESTMENT]
+        )
+        self.offering = LenderProgramOffering.objects.create(
+            lender=self.lender,
+            program_type=self.program_type,
+            min_rate=5.5,
+            max_rate=7.5,
+            min_fico=680,
+            max_ltv=80.0,
+            min_loan=Decimal("100000.00"),
+            max_loan=Decimal("1000000.00"),
+        )
+        base = {
+            'property_type': choices.PROPERTY_TYPE_RESIDENTIAL,
+            'entity_type': choices.BORROWING_ENTITY_TYPE_LLC,
+            'purpose': choices.LOAN_PURPOSE_PURCHASE,
+            'occupancy': choices.OCCUPANCY_INVESTMENT,
+            'state': "CA",
+            'loan_amount': Decimal("200000.00"),
+            'ltv': 75.0,
+            'estimated_credit_score': 700,
+        }
+        variants = [
+            {},
+            {'state': "TX", 'loan_amount': Decimal("100000.00"), 'ltv': 80.0},
+            {'loan_amount': Decimal("1000000.00"), 'estimated_credit_score': 680},
+            {'loan_amount': Decimal("99999.99")},
+            {'loan_amount': Decimal("1000000.01")},
+            {'estimated_credit_score': 679},
+            {'ltv': 80.01},
+            {'state': "NY"},
+            {'property_type': choices.PROPERTY_TYPE_COMMERCIAL},
+            {'entity_type': choices.BORROWING_ENTITY_TYPE_INDIVIDUAL},
+            {'purpose': choices.LOAN_PURPOSE_REFINANCE},
+        ]
+        for variant in variants:
+            QualifyingInfo.objects.create(**dict(base, **variant))
+
+    def test_matches_same_leads_as_queryset(self):
+        expected = set(get_quals_for_loan_program(self.offering).values_list('id', flat=True))
+
+        stats = RematchStats()
+        pairs = list(rematch_offerings([self.offering.id], stats=stats))
+
+        self.assertEqual(len(expected), 3)
+        self.assertEqual({lead_id for _, lead_id in pairs}, expected)
+        self.assertEqual({offering_id for offering_id, _ in pairs}, {self.offering.id})
+        self.assertEqual(stats.matches, 3)
+        self.assertEqual(stats.offerings, 1)
+        # The NY, commercial and refinance leads are outside the offering's buckets
+        self.assertEqual(stats.leads_indexed, 8)
+        self.assertEqual(stats.leads_scanned, 6)
+        self.assertEqual(stats.leads_per_sec, stats.leads_scanned / stats.elapsed)
+
+    def test_inactive_offering_not_matched(self):
+        self.offering.is_active = False
+        self.offering.save()
+
+        self.assertEqual(list(rematch_offerings([self.offering.id])), [])
+
+    def test_changed_offering_ids_includes_adjustment_changes(self):
+        since = timezone.now() + timedelta(seconds=1)
+        self.assertEqual(changed_offering_ids(since=since), [])
+
+        adjustment = RateAdjustment.objects.create(
+            offering=self.offering,
+            adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_PURPOSE,
+            value_key='purchase',
+            adjustment_points=0.25
+        )
+        RateAdjustment.objects.filter(pk=adjustment.pk).update(
+            updated_at=since + timedelta(seconds=1)
+        )
+
+        self.assertEqual(
+            changed_offering_ids(since=since, lender_id=self.lender.id),
+            [self.offering.id]
+        )
+
+    def test_rematch_task_reports_matches(self):
+        summary = rematch_leads_for_lender(self.lender.id)
+
+        self.assertEqual(summary['matches'], 3)
+        self.assertEqual(summary['matches_by_offering'], {self.offering.id: 3})
+        # Only the buckets the lender's offerings visit are loaded
+        self.assertEqual(summary['leads_indexed'], 8)
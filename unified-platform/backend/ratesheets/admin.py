@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import RateSheet
+from .models import RateSheet, RateSheetEvent
 from .tasks import process_ratesheet
 
 @admin.action(description='Reprocess selected rate sheets')
@@ -7,10 +7,20 @@ def reprocess_ratesheets(modeladmin, request, queryset):
     for rs in queryset:
         process_ratesheet.delay(rs.id)
 
+class RateSheetEventInline(admin.TabularInline):
+    model = RateSheetEvent
+    fields = ('created_at', 'stage', 'level', 'message')
+    readonly_fields = fields
+    extra = 0
+    max_num = 0
+    can_delete = False
+    show_change_link = False
+
 @admin.register(RateSheet)
 class RateSheetAdmin(admin.ModelAdmin):
     list_display = ('lender', 'name', 'status', 'processed_at', 'created_at')
     list_filter = ('status', 'lender', 'created_at')
     search_fields = ('name', 'lender__company_name')
-    readonly_fields = ('processed_at', 'log')
+    readonly_fields = ('processed_at', 'log', 'page_fingerprints', 'pipeline')
+    inlines = [RateSheetEventInline]
     actions = [reprocess_ratesheets]
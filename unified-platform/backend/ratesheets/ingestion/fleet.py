@@ -0,0 +1,266 @@
+"""
+Concurrent download of every web-sourced lender rate sheet.
+
+The morning refresh fetches all sheets at once with one async httpx client:
+
+- bounded overall concurrency plus a per-host limit, so one lender's CDN is
+  never hit with the whole fleet
+- conditional requests: the ETag and Last-Modified of the last download
+  are kept in a ``<name>.meta.json`` sidecar and sent back as
+  If-None-Match / If-Modified-Since, so unchanged sheets cost a 304
+- bodies are streamed to a temporary file while hashed, and only replace
+  the stored sheet when the content actually changed
+
+``refresh_rate_sheets`` then creates a RateSheet for each changed file and
+queues ``process_ratesheet`` for it.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .csv_reader import LenderRateSheetConfig
+
+logger = logging.getLogger(__name__)
+
+STATUS_CHANGED = 'changed'
+STATUS_UNCHANGED = 'unchanged'
+STATUS_FAILED = 'failed'
+
+USER_AGENT = 'Mozilla/5.0 (compatible; RateSheetBot/1.0)'
+
+
+@dataclass
+class FetchResult:
+    """Outcome of fetching one lender's rate sheet."""
+    lender_name: str
+    url: str
+    status: str
+    path: Optional[str] = None
+    http_status: Optional[int] = None
+    bytes: int = 0
+    seconds: float = 0.0
+    error: str = ''
+    rate_sheet_id: Optional[int] = None
+
+
+def safe_name(lender_name: str) -> str:
+    return ''.join(c if c.isalnum() else '_' for c in lender_name.lower()).strip('_')
+
+
+class FleetDownloader:
+    """
+    Fetch many rate sheets concurrently into ``cache_dir``.
+
+    Each lender's latest sheet is kept at ``<safe name>.pdf`` next to its
+    ``.meta.json`` validators.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        concurrency: int = 16,
+        per_host: int = 2,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.transport = transport
+
+    def paths(self, lender_name: str):
+        base = self.cache_dir / safe_name(lender_name)
+        return base.with_suffix('.pdf'), base.with_suffix('.meta.json')
+
+    def fetch_all(self, configs: Iterable[LenderRateSheetConfig]) -> List[FetchResult]:
+        """Fetch every config with a URL; results are in input order."""
+        return asyncio.run(self._fetch_all([c for c in configs if c.url]))
+
+    async def _fetch_all(self, configs: List[LenderRateSheetConfig]) -> List[FetchResult]:
+        overall = asyncio.Semaphore(self.concurrency)
+        hosts: Dict[str, asyncio.Semaphore] = {}
+
+        async with httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(max_connections=self.concurrency),
+            transport=self.transport,
+        ) as client:
+            async def bounded(config):
+                host = urlsplit(config.url).netloc.lower()
+                per_host = hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+                async with per_host, overall:
+                    return await self._fetch(client, config)
+
+            return await asyncio.gather(*(bounded(config) for config in configs))
+
+    async def _fetch(self, client: httpx.AsyncClient, config: LenderRateSheetConfig) -> FetchResult:
+        started = time.perf_counter()
+        result = FetchResult(lender_name=config.lender_name, url=config.url, status=STATUS_FAILED)
+        target, meta_path = self.paths(config.lender_name)
+        meta = _read_meta(meta_path) if target.exists() else {}
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        auth = None
+        if config.password:
+            auth = (config.lender_name.lower().replace(' ', ''), config.password)
+
+        tmp_path = None
+        try:
+            async with client.stream('GET', config.url, headers=headers, auth=auth) as response:
+                result.http_status = response.status_code
+                if response.status_code == 304:
+                    result.status = STATUS_UNCHANGED
+                    result.path = str(target)
+                    return result
+                response.raise_for_status()
+
+                digest = hashlib.sha256()
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.part')
+                with os.fdopen(fd, 'wb') as f:
+                    async for chunk in response.aiter_bytes():
+                        f.write(chunk)
+                        digest.update(chunk)
+                        result.bytes += len(chunk)
+
+                content_hash = digest.hexdigest()
+                new_meta = {
+                    'url': config.url,
+                    'etag': response.headers.get('etag'),
+                    'last_modified': response.headers.get('last-modified'),
+                    'sha256': content_hash,
+                }
+
+            result.path = str(target)
+            if meta.get('sha256') == content_hash:
+                # Server ignored the validators but the bytes are the same.
+                os.unlink(tmp_path)
+                result.status = STATUS_UNCHANGED
+            else:
+                os.replace(tmp_path, target)
+                result.status = STATUS_CHANGED
+            tmp_path = None
+            _write_meta(meta_path, new_meta)
+            return result
+
+        except (httpx.HTTPError, OSError) as e:
+            result.error = str(e) or e.__class__.__name__
+            logger.error(f"Failed to download {config.lender_name} from {config.url}: {result.error}")
+            return result
+
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            result.seconds = round(time.perf_counter() - started, 3)
+
+
+def _read_meta(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(path: Path, meta: dict) -> None:
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, path)
+
+
+def match_lender(lender_name: str, lenders) -> Optional[object]:
+    """
+    Find the Lender for a CSV source name: an exact (case-insensitive)
+    company name, else the longest company name the source starts with
+    ("Acra DSCR" -> "Acra").
+    """
+    name = lender_name.strip().casefold()
+    best = None
+    for lender in lenders:
+        company = lender.company_name.strip().casefold()
+        if company == name:
+            return lender
+        if name.startswith(company + ' ') and (best is None or len(company) > len(best.company_name)):
+            best = lender
+    return best
+
+
+def refresh_rate_sheets(
+    configs: Iterable[LenderRateSheetConfig],
+    downloader: FleetDownloader,
+    enqueue: bool = True,
+) -> List[FetchResult]:
+    """
+    Fetch all sheets and register the changed ones for processing.
+
+    A RateSheet is created for every changed file whose source matches a
+    Lender, and ``process_ratesheet`` is queued for it after commit.
+    Unchanged and failed fetches create nothing.
+    """
+    from django.core.files import File
+    from django.db import transaction
+    from django.utils import timezone
+
+    from pricing.models import Lender
+    from ratesheets.models import RateSheet
+    from ratesheets.tasks import process_ratesheet
+
+    results = downloader.fetch_all(configs)
+    changed = [r for r in results if r.status == STATUS_CHANGED]
+    if not changed:
+        return results
+
+    lenders = list(Lender.objects.only('id', 'company_name'))
+    today = timezone.localdate().isoformat()
+    for result in changed:
+        lender = match_lender(result.lender_name, lenders)
+        if lender is None:
+            logger.warning(f"No lender matches rate sheet source '{result.lender_name}', not processing")
+            continue
+
+        with open(result.path, 'rb') as f:
+            sheet = RateSheet.objects.create(
+                lender=lender,
+                name=f"{result.lender_name} {today}",
+                file=File(f, name=f"{safe_name(result.lender_name)}_{today}.pdf"),
+            )
+        result.rate_sheet_id = sheet.id
+        if enqueue:
+            transaction.on_commit(lambda sheet_id=sheet.id: process_ratesheet.delay(sheet_id))
+
+    return results
+
+
+def summarize(results: List[FetchResult], seconds: float) -> dict:
+    counts = {STATUS_CHANGED: 0, STATUS_UNCHANGED: 0, STATUS_FAILED: 0}
+    for result in results:
+        counts[result.status] += 1
+    return {
+        'sources': len(results),
+        **counts,
+        'queued': sum(1 for r in results if r.rate_sheet_id),
+        'bytes': sum(r.bytes for r in results),
+        'seconds': round(seconds, 3),
+    }
+
+
+def as_dicts(results: List[FetchResult]) -> List[dict]:
+    return [asdict(result) for result in results]
@@ -0,0 +1,59 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ratesheets.ingestion.csv_reader import RateSheetCSVReader
+from ratesheets.ingestion.fleet import (
+    FleetDownloader,
+    as_dicts,
+    refresh_rate_sheets,
+    summarize,
+)
+
+
+class Command(BaseCommand):
+    help = 'Download every web-sourced lender rate sheet concurrently and queue changed ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--csv', default=str(settings.RATESHEET_SOURCES_CSV),
+            help='Lender rate sheet list (Lender, Emailed, PW, Type, Ratesheet Link)'
+        )
+        parser.add_argument('--concurrency', type=int, default=settings.RATESHEET_FETCH_CONCURRENCY)
+        parser.add_argument('--per-host', type=int, default=settings.RATESHEET_FETCH_PER_HOST)
+        parser.add_argument(
+            '--no-process', action='store_true',
+            help='Create rate sheets for changed files but do not queue processing'
+        )
+        parser.add_argument('--json', action='store_true', help='Print per-lender results as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            configs = RateSheetCSVReader(Path(options['csv'])).read_web_sources()
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        downloader = FleetDownloader(
+            Path(settings.RATESHEET_DOWNLOAD_DIR),
+            concurrency=options['concurrency'],
+            per_host=options['per_host'],
+            timeout=settings.RATESHEET_FETCH_TIMEOUT,
+        )
+        started = time.perf_counter()
+        results = refresh_rate_sheets(configs, downloader, enqueue=not options['no_process'])
+        summary = summarize(results, time.perf_counter() - started)
+
+        if options['json']:
+            self.stdout.write(json.dumps(as_dicts(results), indent=2))
+        for result in results:
+            if result.error:
+                self.stderr.write(self.style.WARNING(f"{result.lender_name}: {result.error}"))
+
+        self.stderr.write(self.style.SUCCESS(
+            f"Fetched {summary['sources']} sources in {summary['seconds']}s: "
+            f"{summary['changed']} changed, {summary['unchanged']} unchanged, "
+            f"{summary['failed']} failed; {summary['queued']} rate sheets created"
+        ))
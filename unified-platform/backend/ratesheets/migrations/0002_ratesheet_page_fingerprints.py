@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ratesheets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ratesheet',
+            name='page_fingerprints',
+            field=models.JSONField(blank=True, default=dict, help_text='Processor and per-page content hashes, used to re-extract only changed pages'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ratesheets', '0002_ratesheet_page_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateSheetEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the event was logged (not when it was flushed)')),
+                ('stage', models.CharField(blank=True, help_text="Processing stage, e.g. 'extract', 'diff', 'ai', 'parse'", max_length=50)),
+                ('level', models.CharField(choices=[('info', 'Info'), ('warning', 'Warning'), ('error', 'Error')], default='info', max_length=10)),
+                ('message', models.TextField()),
+                ('rate_sheet', models.ForeignKey(help_text='Rate sheet being processed', on_delete=django.db.models.deletion.CASCADE, related_name='events', to='ratesheets.ratesheet')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['rate_sheet', 'created_at'], name='ratesheet_event_idx')],
+            },
+        ),
+    ]
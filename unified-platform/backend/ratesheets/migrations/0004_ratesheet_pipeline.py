@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ratesheets', '0003_ratesheetevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ratesheet',
+            name='pipeline',
+            field=models.JSONField(blank=True, default=dict, help_text="Processor and content hash of each completed processing stage's output"),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from common.models import TimestampedModel
 class RateSheet(TimestampedModel):
     """
@@ -47,6 +48,67 @@ class RateSheet(TimestampedModel):
         blank=True,
         help_text="Processing logs and errors"
     )
+    page_fingerprints = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Processor and per-page content hashes, used to re-extract only changed pages"
+    )
+    pipeline = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Processor and content hash of each completed processing stage's output"
+    )
     
     def __str__(self):
         return f"{self.lender} - {self.name} ({self.get_status_display()})"
+
+
+class RateSheetEvent(models.Model):
+    """
+    One processing log entry for a rate sheet.
+
+    Append-only: processors buffer events and bulk insert them at stage
+    boundaries and periodic flushes, instead of rewriting RateSheet.log
+    for every message.
+    """
+
+    LEVEL_INFO = 'info'
+    LEVEL_WARNING = 'warning'
+    LEVEL_ERROR = 'error'
+
+    LEVEL_CHOICES = (
+        (LEVEL_INFO, 'Info'),
+        (LEVEL_WARNING, 'Warning'),
+        (LEVEL_ERROR, 'Error'),
+    )
+
+    rate_sheet = models.ForeignKey(
+        RateSheet,
+        on_delete=models.CASCADE,
+        related_name='events',
+        help_text="Rate sheet being processed"
+    )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the event was logged (not when it was flushed)"
+    )
+    stage = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="Processing stage, e.g. 'extract', 'diff', 'ai', 'parse'"
+    )
+    level = models.CharField(
+        max_length=10,
+        choices=LEVEL_CHOICES,
+        default=LEVEL_INFO,
+    )
+    message = models.TextField()
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['rate_sheet', 'created_at'], name='ratesheet_event_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.created_at:%H:%M:%S} [{self.stage or '-'}] {self.message[:80]}"
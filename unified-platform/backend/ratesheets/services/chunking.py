@@ -0,0 +1,196 @@
+"""
+Chunking and merging for AI rate sheet extraction.
+
+Large sheets do not fit one prompt, so extracted pages are split into
+sections (a whole page, or each text block and table of an oversized page)
+and packed in page order into chunks of at most ``max_chars``. Chunks are
+extracted independently and their JSON results merged back into one
+``programs``/``adjustments`` document, de-duplicating programs by name and
+adjustments by identity.
+
+A program's grids can run past the end of a chunk, so every chunk after the
+first carries the heading of the last page started before it; without it
+the model would report a continued program's adjustments as sheet-wide.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ratesheets.services.extraction import PageContent
+
+logger = logging.getLogger(__name__)
+
+
+def format_table(table: List[list]) -> str:
+    """Format a table as ``|``-separated rows, None cells blank."""
+    return '\n'.join(
+        ' | '.join(str(cell) if cell is not None else '' for cell in row)
+        for row in table
+    )
+
+
+def page_sections(page: PageContent, max_chars: int) -> List[str]:
+    """
+    Format one page for the model: one section for the whole page, or one
+    per text block and table when the page alone exceeds ``max_chars``.
+    """
+    parts = []
+    if page.text:
+        parts.append(f"=== Page {page.number} Text ===\n{page.text}")
+    for table_num, table in enumerate(page.tables, start=1):
+        if table:
+            parts.append(f"=== Page {page.number} Table {table_num} ===\n{format_table(table)}")
+
+    whole = '\n\n'.join(parts)
+    if len(whole) <= max_chars:
+        return [whole] if whole else []
+    return parts
+
+
+def page_heading(page: PageContent, max_lines: int = 3, max_chars: int = 300) -> str:
+    """The first non-empty text lines of a page, where sheets name the program."""
+    lines = [line.strip() for line in page.text.splitlines() if line.strip()]
+    return ' / '.join(lines[:max_lines])[:max_chars]
+
+
+@dataclass
+class Chunk:
+    """
+    A group of consecutive sections sent to the model in one request.
+
+    ``context`` names the page heading the chunk continues from (empty for
+    the first chunk).
+    """
+    pages: List[int] = field(default_factory=list)
+    sections: List[str] = field(default_factory=list)
+    context: str = ''
+
+    @property
+    def content(self) -> str:
+        return '\n\n'.join(self.sections)
+
+    def __len__(self) -> int:
+        return sum(len(section) for section in self.sections) + 2 * max(len(self.sections) - 1, 0)
+
+
+def chunk_pages(pages: List[PageContent], max_chars: int) -> List[Chunk]:
+    """
+    Pack page sections into chunks of at most ``max_chars`` characters.
+
+    Sections are never cut; a single section larger than ``max_chars``
+    becomes a chunk of its own rather than being truncated. Each chunk's
+    ``context`` is the heading of the last page started before it.
+    """
+    chunks: List[Chunk] = []
+    current = Chunk()
+    context = ''
+    for page in pages:
+        for section in page_sections(page, max_chars):
+            if current.sections and len(current) + 2 + len(section) > max_chars:
+                chunks.append(current)
+                current = Chunk(context=context)
+            current.sections.append(section)
+            if page.number not in current.pages:
+                current.pages.append(page.number)
+                heading = page_heading(page)
+                if heading:
+                    context = f"page {page.number}, headed \"{heading}\""
+    if current.sections:
+        chunks.append(current)
+    return chunks
+
+
+def _name_key(name: Optional[str]) -> str:
+    return ' '.join(str(name or '').split()).casefold()
+
+
+def _adjustment_identity(adjustment: Dict[str, Any]) -> tuple:
+    def number(key):
+        value = adjustment.get(key)
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return value
+
+    return (
+        adjustment.get('adjustment_type'),
+        _name_key(adjustment.get('program_name')),
+        str(adjustment.get('value_key') or '').strip().casefold(),
+        adjustment.get('row_label'),
+        number('row_min'), number('row_max'),
+        adjustment.get('col_label'),
+        number('col_min'), number('col_max'),
+    )
+
+
+def merge_extractions(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-chunk extraction results, in chunk order.
+
+    - metadata: first non-empty value per field; lock periods are unioned
+    - programs: one per program name (case/whitespace-insensitive); fields
+      missing from the first occurrence are filled from later ones
+    - adjustments: one per (type, program, value key, row/col bounds); on
+      conflicting points the first occurrence wins and the conflict is counted,
+      ``source_pages`` are unioned, and ``program_name`` is rewritten to the
+      merged program's spelling
+
+    Returns:
+        Merged document with ``metadata['merge']`` statistics
+    """
+    metadata: Dict[str, Any] = {}
+    lock_periods: List[Any] = []
+    programs: Dict[str, Dict[str, Any]] = {}
+    adjustments: Dict[tuple, Dict[str, Any]] = {}
+    stats = {'chunks': len(results), 'duplicate_programs': 0, 'duplicate_adjustments': 0, 'conflicts': 0}
+
+    for result in results:
+        for key, value in (result.get('metadata') or {}).items():
+            if key == 'lock_periods':
+                lock_periods.extend(p for p in value or [] if p not in lock_periods)
+            elif value not in (None, '', []) and key not in metadata:
+                metadata[key] = value
+
+        for program in result.get('programs') or []:
+            key = _name_key(program.get('program_name'))
+            existing = programs.get(key)
+            if existing is None:
+                programs[key] = dict(program)
+                continue
+            stats['duplicate_programs'] += 1
+            for field_name, value in program.items():
+                if existing.get(field_name) in (None, '', []):
+                    existing[field_name] = value
+
+        for adjustment in result.get('adjustments') or []:
+            key = _adjustment_identity(adjustment)
+            existing = adjustments.get(key)
+            if existing is None:
+                adjustments[key] = adjustment
+                continue
+            stats['duplicate_adjustments'] += 1
+            for source in adjustment.get('source_pages') or []:
+                if source not in existing.setdefault('source_pages', []):
+                    existing['source_pages'] = existing['source_pages'] + [source]
+            if existing.get('adjustment_points') != adjustment.get('adjustment_points'):
+                stats['conflicts'] += 1
+                logger.warning(f"Conflicting adjustment points across chunks, keeping first: {key}")
+
+    # Point adjustments at the surviving spelling of their program's name,
+    # since ingestion routes them by exact name.
+    merged_adjustments = []
+    for adjustment in adjustments.values():
+        program = programs.get(_name_key(adjustment.get('program_name')))
+        if program is not None and adjustment.get('program_name') != program.get('program_name'):
+            adjustment = {**adjustment, 'program_name': program.get('program_name')}
+        merged_adjustments.append(adjustment)
+
+    if lock_periods:
+        metadata['lock_periods'] = lock_periods
+    metadata['merge'] = stats
+    return {
+        'metadata': metadata,
+        'programs': list(programs.values()),
+        'adjustments': merged_adjustments,
+    }
@@ -0,0 +1,140 @@
+"""
+Page-parallel PDF extraction for rate sheet processors.
+
+pdfplumber's ``extract_text``/``extract_tables`` are CPU-bound pdfminer work,
+so multi-page sheets are split into contiguous page ranges and extracted on
+a process pool. Each worker opens the PDF itself (parsed documents cannot be
+pickled) and results are merged back in page order.
+
+The pool is skipped for short documents and when it cannot be started, e.g.
+inside a daemonic Celery prefork worker, in which case pages are extracted
+serially in the calling process and a warning is logged. Run the extract
+queue on a ``--pool solo`` worker to keep extraction parallel.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import pdfplumber
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PageContent:
+    """Text and tables extracted from one PDF page (1-based ``number``)."""
+    number: int
+    text: str = ''
+    tables: List[list] = field(default_factory=list)
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[PageContent]:
+    """Extract pages ``start`` to ``stop - 1`` (0-based); runs in pool workers."""
+    pages = []
+    with pdfplumber.open(file_path) as pdf:
+        for index in range(start, stop):
+            page = pdf.pages[index]
+            pages.append(PageContent(
+                number=index + 1,
+                text=page.extract_text() or '',
+                tables=page.extract_tables(),
+            ))
+            page.flush_cache()
+    return pages
+
+
+def _page_ranges(page_count: int, chunks: int) -> List[Tuple[int, int]]:
+    """Split ``page_count`` pages into ``chunks`` contiguous, balanced ranges."""
+    size, extra = divmod(page_count, chunks)
+    ranges = []
+    start = 0
+    for i in range(chunks):
+        stop = start + size + (1 if i < extra else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def extraction_workers() -> int:
+    """Configured pool size; RATESHEET_EXTRACTION_WORKERS=0 means one per CPU."""
+    workers = getattr(settings, 'RATESHEET_EXTRACTION_WORKERS', 0)
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def page_count(file_path: str) -> int:
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_pages(
+    file_path: str,
+    workers: Optional[int] = None,
+    pages: Optional[List[int]] = None,
+) -> List[PageContent]:
+    """
+    Extract text and tables from a PDF, in page order.
+
+    Args:
+        file_path: Path to the PDF
+        workers: Process pool size (defaults to extraction_workers())
+        pages: Optional 1-based page numbers to extract; all pages if None
+
+    Returns:
+        List of PageContent ordered by page number
+    """
+    workers = extraction_workers() if workers is None else workers
+    min_pages = getattr(settings, 'RATESHEET_PARALLEL_MIN_PAGES', 4)
+
+    if pages is None:
+        ranges = [(0, page_count(file_path))]
+    else:
+        ranges = _contiguous(sorted(set(pages)))
+    total = sum(stop - start for start, stop in ranges)
+
+    if workers > 1 and total >= min_pages and multiprocessing.current_process().daemon:
+        logger.warning(
+            "Parallel PDF extraction unavailable in a daemonic process "
+            "(e.g. a Celery prefork child), extracting %d pages serially", total,
+        )
+    elif workers > 1 and total >= min_pages:
+        # Split further so every worker gets a balanced share of pages.
+        split = []
+        for start, stop in ranges:
+            share = max(1, round(workers * (stop - start) / total))
+            split.extend((start + a, start + b) for a, b in _page_ranges(stop - start, share))
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(split))) as pool:
+                futures = [
+                    pool.submit(_extract_page_range, file_path, start, stop)
+                    for start, stop in split
+                ]
+                return [page for future in futures for page in future.result()]
+        except (OSError, BrokenProcessPool) as e:
+            # The pool could not start or lost a worker; errors raised by
+            # the extraction itself propagate.
+            logger.warning(f"Parallel PDF extraction failed, extracting serially: {e}")
+
+    return [
+        page
+        for start, stop in ranges
+        for page in _extract_page_range(file_path, start, stop)
+    ]
+
+
+def _contiguous(numbers: List[int]) -> List[Tuple[int, int]]:
+    """Turn sorted 1-based page numbers into 0-based [start, stop) ranges."""
+    ranges: List[Tuple[int, int]] = []
+    for number in numbers:
+        index = number - 1
+        if ranges and ranges[-1][1] == index:
+            ranges[-1] = (ranges[-1][0], index + 1)
+        else:
+            ranges.append((index, index + 1))
+    return ranges
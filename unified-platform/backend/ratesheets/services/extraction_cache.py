@@ -0,0 +1,92 @@
+"""
+Content-addressed on-disk cache for rate sheet extraction results.
+
+Lenders frequently re-send byte-identical PDFs. Entries are keyed by the
+SHA-256 of the file content together with the processor, its model version
+and its prompt version, so an unchanged sheet skips pdfplumber extraction
+and the LLM call entirely, while a new model or prompt never reuses stale
+output.
+
+Entries are JSON files under RATESHEET_EXTRACTION_CACHE_DIR, sharded by
+key prefix and written atomically (temp file + rename), so concurrent
+workers can share one directory.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_version(text: str) -> str:
+    """Short stable version tag for a prompt or other text."""
+    return hashlib.sha256(text.encode()).hexdigest()[:12]
+
+
+class ExtractionCache:
+    """
+    On-disk JSON cache keyed by (file hash, processor, model, prompt).
+
+    Use ``extraction_cache()`` to get an instance for the configured
+    directory.
+    """
+
+    def __init__(self, root: Path, enabled: bool = True):
+        self.root = Path(root)
+        self.enabled = enabled
+
+    @staticmethod
+    def key(file_hash: str, processor: str, model_version: str = '', prompt_version: str = '') -> str:
+        raw = '\0'.join((file_hash, processor, model_version, prompt_version))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable extraction cache entry {key}: {e}")
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry {key}: {e}")
+
+
+def extraction_cache() -> ExtractionCache:
+    return ExtractionCache(
+        getattr(settings, 'RATESHEET_EXTRACTION_CACHE_DIR', settings.BASE_DIR / 'ratesheet_cache' / 'extractions'),
+        enabled=getattr(settings, 'RATESHEET_EXTRACTION_CACHE_ENABLED', True),
+    )
@@ -0,0 +1,327 @@
+"""
+Deterministic FICO x LTV grid parser for pdfplumber tables.
+
+Most lenders price the credit/leverage matrix as a table whose rows are FICO
+bands ("760 - 779", ">= 780", "< 620") and whose columns are LTV bands
+("<= 50.00%", "50.01 - 55.00%", ...). This parser recognizes that layout
+structurally and turns every numeric cell into a ``fico_ltv`` adjustment,
+without an LLM.
+
+LTV headers are often merged cells that pdfplumber returns as one string
+spanning several lines, so column bands are recovered from all numbers in
+the header rows: an odd leading value is a "<= x" band, and the rest pair
+up as (x.01, y.00) bounds. A table is only accepted when the bands line up
+with its value columns; anything else is left to the AI processor.
+
+Sheets with several programs title each grid. With ``programs`` configured
+(title text -> program name), a grid belongs to the program whose title
+appears in its header rows, else to the title closest above the table in
+the page text; ``program_name`` covers grids without a recognized title.
+
+Base rate tables ("Note Rate | Price" rows) are parsed the same way into
+each program's ``price_ladder``, which the pricing engine uses to convert
+stacked LLPA points into rate.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pricing.models import RateAdjustment
+from ratesheets.services.extraction import PageContent
+
+Band = Tuple[float, float]
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+_FICO_RANGE = re.compile(r'^(\d{3})\s*[-–]\s*(\d{3})$')
+_FICO_AT_LEAST = re.compile(r'^(?:≥|>=|>)\s*(\d{3})$|^(\d{3})\s*\+$')
+_FICO_BELOW = re.compile(r'^(?:<|≤|<=)\s*(\d{3})$')
+_PERCENT = re.compile(r'\d{1,3}\.\d{2}')
+_NOTE_RATE = re.compile(r'^(\d{1,2}\.\d{2,3})\s*%?$')
+_NOT_ELIGIBLE = {'', 'n/a', 'na', '-', '--', 'ineligible'}
+
+
+@dataclass
+class GridParserConfig:
+    """
+    Per-lender settings for TableGridProcessor.
+
+    Registered with ``registry.configure_lender(lender, 'table_grid', ...)``
+    or through the RATESHEET_LENDER_PROCESSORS setting. ``programs`` maps
+    grid title text to a program name; ``program_name`` is the program of
+    grids without a configured title (such grids are skipped without it).
+    """
+
+    def __post_init__(self):
+        if not self.program_name and not self.programs:
+            raise ValueError("GridParserConfig needs program_name or programs")
+    program_name: Optional[str] = None
+    programs: Dict[str, str] = field(default_factory=dict)
+    program_type: str = 'non_qm'
+    base_rate: Optional[float] = None
+    min_fico: int = 300
+    max_fico: int = 850
+    min_rows: int = 3
+    fallback_to_ai: bool = True
+
+
+def parse_fico_band(label: Any, config: GridParserConfig) -> Optional[Band]:
+    """Parse a row header such as "760 - 779", ">= 780" or "< 620"."""
+    text = ' '.join(str(label or '').split())
+    match = _FICO_RANGE.match(text)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+        return (low, high) if config.min_fico <= low <= high <= config.max_fico else None
+    match = _FICO_AT_LEAST.match(text)
+    if match:
+        low = int(match.group(1) or match.group(2))
+        if text.startswith('>') and not text.startswith('>='):
+            low += 1
+        return (low, config.max_fico) if config.min_fico <= low <= config.max_fico else None
+    match = _FICO_BELOW.match(text)
+    if match:
+        high = int(match.group(1))
+        if text.startswith('<') and not text.startswith('<='):
+            high -= 1
+        return (config.min_fico, high) if config.min_fico <= high <= config.max_fico else None
+    return None
+
+
+def parse_ltv_bands(header_text: str) -> List[Band]:
+    """
+    Recover LTV column bands from header text, in column order.
+
+    "<= 50.00% 50.01- 55.00% 55.01- 60.00%" -> [(0, 50), (50.01, 55), (55.01, 60)]
+    """
+    values = sorted({float(v) for v in _PERCENT.findall(header_text) if 0 < float(v) <= 100})
+    if not values:
+        return []
+
+    bands: List[Band] = []
+    index = 0
+    if len(values) % 2:
+        bands.append((0.0, values[0]))
+        index = 1
+    while index + 1 < len(values):
+        low, high = values[index], values[index + 1]
+        if not low < high:
+            return []
+        bands.append((low, high))
+        index += 2
+
+    # Bands must tile the axis: each starts just above the previous one.
+    for (_, previous_high), (low, _) in zip(bands, bands[1:]):
+        if not 0 < low - previous_high <= 0.011:
+            return []
+    return bands
+
+
+def _cell_points(cell: Any) -> Optional[float]:
+    text = str(cell or '').strip()
+    if text.lower() in _NOT_ELIGIBLE:
+        return None
+    try:
+        return float(text.replace('(', '-').replace(')', ''))
+    except ValueError:
+        return None
+
+
+def _note_rate(cell: Any) -> Optional[float]:
+    match = _NOTE_RATE.match(str(cell or '').strip())
+    return float(match.group(1)) if match and 1 <= float(match.group(1)) <= 20 else None
+
+
+def _split_header(table: List[list], config: GridParserConfig) -> Tuple[List[list], Optional[int]]:
+    """Non-empty rows of ``table`` and the index of its first FICO band row."""
+    rows = [row for row in table if row]
+    first_band_row = next(
+        (i for i, row in enumerate(rows) if parse_fico_band(row[0], config)), None
+    )
+    return rows, first_band_row
+
+
+def _header_text(rows: List[list], first_band_row: int) -> str:
+    return ' '.join(str(cell) for row in rows[:first_band_row] for cell in row if cell)
+
+
+def _last_title(text: str, config: GridParserConfig) -> Optional[str]:
+    """Program of the configured title occurring last in ``text``."""
+    folded = text.casefold()
+    position, program = max(
+        ((folded.rfind(title.casefold()), name) for title, name in config.programs.items()),
+        default=(-1, None),
+    )
+    return program if position >= 0 else None
+
+
+def table_position(table: List[list], text: str, start: int = 0) -> int:
+    """
+    Offset of ``table`` in its page's text, found by its first non-empty
+    cell at or after ``start``; -1 if it cannot be located.
+    """
+    anchor = next(
+        (str(cell).strip().splitlines()[0] for row in table if row for cell in row if str(cell or '').strip()),
+        '',
+    )
+    return text.find(anchor, start) if anchor else -1
+
+
+def grid_program(
+    table: List[list], page: PageContent, config: GridParserConfig, position: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Program a grid belongs to: a configured title in its header rows, else
+    the nearest one above it in the page text (``position`` as returned by
+    ``table_position``), else ``config.program_name``.
+    """
+    if config.programs:
+        rows, first_band_row = _split_header(table, config)
+        program = _last_title(_header_text(rows, first_band_row or 0), config)
+        if program:
+            return program
+
+        position = table_position(table, page.text) if position is None else position
+        if position >= 0:
+            program = _last_title(page.text[:position], config)
+            if program:
+                return program
+    return config.program_name
+
+
+def parse_grid(
+    table: List[list], config: GridParserConfig, program_name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Convert one table into fico_ltv adjustments, or [] if it is not a grid.
+
+    Rows before the first FICO band row are treated as the header. Value
+    columns are matched to LTV bands left to right; trailing columns (e.g.
+    a "Points" column) are ignored. Cells are assigned to ``program_name``
+    (default ``config.program_name``).
+    """
+    rows, first_band_row = _split_header(table, config)
+    if first_band_row is None:
+        return []
+
+    header_text = _header_text(rows, first_band_row)
+    ltv_bands = parse_ltv_bands(header_text)
+    if not ltv_bands:
+        return []
+
+    grid_rows = []
+    for row in rows[first_band_row:]:
+        fico = parse_fico_band(row[0], config)
+        if fico is None:
+            continue
+        cells = list(row[1:len(ltv_bands) + 1])
+        if len(cells) < len(ltv_bands):
+            return []
+        grid_rows.append((fico, cells))
+    if len(grid_rows) < config.min_rows:
+        return []
+
+    adjustments = []
+    for (fico_min, fico_max), cells in grid_rows:
+        for (ltv_min, ltv_max), cell in zip(ltv_bands, cells):
+            points = _cell_points(cell)
+            if points is None:
+                continue
+            adjustments.append({
+                'adjustment_type': RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV,
+                'description': f"FICO {fico_min}-{fico_max}, LTV {ltv_min:g}-{ltv_max:g}",
+                'program_name': program_name or config.program_name,
+                'row_label': 'fico',
+                'row_min': fico_min,
+                'row_max': fico_max,
+                'col_label': 'ltv',
+                'col_min': ltv_min,
+                'col_max': ltv_max,
+                'adjustment_points': points,
+            })
+    return adjustments
+
+
+def parse_rate_table(table: List[list], config: GridParserConfig) -> List[List[float]]:
+    """
+    Convert a base rate table into [rate, price] rows, or [] if it is not one.
+
+    The header rows must name both a rate and a price (e.g. "45-Day Price"
+    over "Note Rate Price"); each following row with a note rate in its
+    first cell contributes the price next to it. Prices are kept as printed
+    (e.g. 99.595); ingestion converts them into points.
+    """
+    rows = [row for row in table if row]
+    first_rate_row = next((i for i, row in enumerate(rows) if _note_rate(row[0]) is not None), None)
+    if first_rate_row is None:
+        return []
+    header_text = _header_text(rows, first_rate_row).casefold()
+    if 'rate' not in header_text or 'price' not in header_text:
+        return []
+
+    ladder = []
+    for row in rows[first_rate_row:]:
+        rate = _note_rate(row[0])
+        price = _cell_points(row[1]) if len(row) > 1 else None
+        if rate is not None and price is not None:
+            ladder.append([rate, price])
+    return ladder if len(ladder) >= config.min_rows else []
+
+
+def parse_pages(pages: List[PageContent], config: GridParserConfig) -> Dict[str, Any]:
+    """
+    Parse every FICO x LTV grid and base rate table on ``pages`` into the
+    ingestion format.
+
+    Returns:
+        Dict with 'metadata', 'programs' and 'adjustments'; metadata['grids']
+        and metadata['rate_tables'] list the (page, table) positions that
+        were recognized and the program each was assigned to
+    """
+    adjustments: List[Dict[str, Any]] = []
+    grids = []
+    rate_tables = []
+    ladders: Dict[str, List[List[float]]] = {}
+    program_names: List[str] = []
+    for page in pages:
+        # pdfplumber returns tables top to bottom, so each is searched for
+        # after the previous one.
+        cursor = 0
+        for table_num, table in enumerate(page.tables, start=1):
+            position = table_position(table, page.text, cursor)
+            if position >= 0:
+                cursor = position + 1
+            program_name = grid_program(table, page, config, position)
+            parsed = parse_grid(table, config, program_name) if program_name else []
+            if parsed:
+                grids.append({
+                    'page': page.number, 'table': table_num,
+                    'program': program_name, 'cells': len(parsed),
+                })
+                adjustments.extend(dict(cell, page=page.number) for cell in parsed)
+            ladder = parse_rate_table(table, config) if program_name and not parsed else []
+            if ladder:
+                rate_tables.append({
+                    'page': page.number, 'table': table_num,
+                    'program': program_name, 'rows': len(ladder),
+                })
+                ladders.setdefault(program_name, ladder)
+            if (parsed or ladder) and program_name not in program_names:
+                program_names.append(program_name)
+
+    programs = []
+    for program_name in program_names:
+        program: Dict[str, Any] = {
+            'program_name': program_name,
+            'program_type': config.program_type,
+        }
+        if config.base_rate is not None:
+            program['base_rate'] = config.base_rate
+        if program_name in ladders:
+            program['price_ladder'] = ladders[program_name]
+        programs.append(program)
+
+    return {
+        'metadata': {'extraction_method': 'table_grid', 'grids': grids, 'rate_tables': rate_tables},
+        'programs': programs,
+        'adjustments': adjustments,
+    }
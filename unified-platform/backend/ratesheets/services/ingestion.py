@@ -7,10 +7,12 @@ pricing database, creating and updating RateAdjustment records.
 
 import json
 import logging
+import time
 from decimal import Decimal
 from typing import Any, Dict, List
 
-from django.db import transaction
+from django.db import connection, transaction
+from django.utils import timezone
 
 from pricing.models import (
     Lender,
@@ -18,9 +20,14 @@ from pricing.models import (
     ProgramType,
     RateAdjustment,
 )
+from pricing.services.engine import pricing_engine
+from pricing.services.quote_cache import quote_cache
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT/UPDATE statement for bulk adjustment writes.
+BULK_BATCH_SIZE = 1000
+
 
 class IngestionError(Exception):
     """Exception raised when data ingestion fails."""
@@ -44,12 +51,25 @@ def update_pricing_from_extraction(lender, extracted_data):
                     'programs': [...],
                     'adjustments': [...]
                 }
+              where each adjustment may carry a 'program_name' routing it
+              to one program; adjustments without one apply to all.
+              When metadata['partial'] is set (only changed pages were
+              extracted) the data is merged into the lender's existing
+              offerings. Only adjustments whose 'source_pages' are all
+              missing from metadata['page_fingerprints'] (the sheet's
+              current pages) are pruned, unless extracted again.
 
     Returns:
         str or dict: Summary of ingestion results
     """
     logger.info(f"Starting ingestion for lender: {lender.company_name}")
 
+    # Rebuild the compiled pricing engine and drop this lender's cached
+    # quotes once this transaction commits. Bulk writes below do not send
+    # model signals, so invalidate explicitly.
+    pricing_engine.invalidate()
+    quote_cache.invalidate_lender(lender.pk)
+
     # Handle legacy JSON string format
     if isinstance(extracted_data, str):
         return _handle_legacy_format(lender, extracted_data)
@@ -60,18 +80,52 @@ def update_pricing_from_extraction(lender, extracted_data):
         logger.error(error_msg)
         return {'error': error_msg}
 
+    # A partial extraction only covers the pages that changed since the
+    # previous sheet, so it is merged into existing pricing: only rows that
+    # came from pages no longer on the sheet are pruned.
+    partial = bool(extracted_data.get('metadata', {}).get('partial'))
+    sheet_pages = extracted_data.get('metadata', {}).get('page_fingerprints')
+    sheet_pages = set(sheet_pages) if partial and sheet_pages is not None else None
+
     stats = {
         'programs_processed': 0,
         'programs_created': 0,
         'programs_updated': 0,
+        'programs_merged': 0,
         'adjustments_created': 0,
         'adjustments_updated': 0,
+        'adjustments_unchanged': 0,
+        'adjustments_deleted': 0,
+        'adjustment_rows_per_sec': 0.0,
+        'partial': partial,
         'errors': []
     }
+    adjustment_rows = 0
+    adjustment_seconds = 0.0
+
+    def ingest(offering, program_adjustments):
+        nonlocal adjustment_rows, adjustment_seconds
+        stats['adjustment_pairs'] += len(program_adjustments)
+        adj_stats = _ingest_adjustments(
+            offering, program_adjustments, prune=not partial, sheet_pages=sheet_pages
+        )
+        stats['adjustments_created'] += adj_stats['created']
+        stats['adjustments_updated'] += adj_stats['updated']
+        stats['adjustments_unchanged'] += adj_stats['unchanged']
+        stats['adjustments_deleted'] += adj_stats['deleted']
+        adjustment_rows += adj_stats['rows']
+        adjustment_seconds += adj_stats['seconds']
 
     try:
         # Process programs
         programs = extracted_data.get('programs', [])
+        adjustments = extracted_data.get('adjustments', [])
+        routed, shared, unmatched = _route_adjustments(programs, adjustments)
+        stats['adjustments_shared'] = len(shared)
+        # Work the old loop did: every adjustment re-ingested per program.
+        stats['adjustment_pairs_unrouted'] = len(programs) * len(adjustments)
+        stats['adjustment_pairs'] = 0
+
         for program_data in programs:
             try:
                 result = _ingest_program(lender, program_data)
@@ -82,17 +136,42 @@ def update_pricing_from_extraction(lender, extracted_data):
                     stats['programs_updated'] += 1
 
                 # Process adjustments for this program
-                offering = result['offering']
-                program_adjustments = extracted_data.get('adjustments', [])
-                adj_stats = _ingest_adjustments(offering, program_adjustments)
-                stats['adjustments_created'] += adj_stats['created']
-                stats['adjustments_updated'] += adj_stats['updated']
+                ingest(result['offering'], routed.get(program_data['program_name'], []) + shared)
 
             except Exception as e:
                 error_msg = f"Error processing program '{program_data.get('program_name')}': {str(e)}"
                 logger.error(error_msg)
                 stats['errors'].append(error_msg)
 
+        if partial:
+            # Programs defined on unchanged pages are already on file;
+            # adjustments from changed pages still reach them by name, and
+            # sheet-wide adjustments apply to them too.
+            listed = {program_data.get('program_name') for program_data in programs}
+            on_file = (
+                LenderProgramOffering.objects
+                .filter(lender=lender)
+                .exclude(program_type__name__in=listed)
+                .select_related('program_type')
+            )
+            for offering in on_file:
+                program_adjustments = routed.get(offering.program_type.name, []) + shared
+                if program_adjustments:
+                    ingest(offering, program_adjustments)
+                    stats['programs_merged'] += 1
+                elif sheet_pages is not None:
+                    # Cells from replaced pages are stale even when the
+                    # program got nothing back from the changed pages.
+                    ingest(offering, [])
+                unmatched.discard(offering.program_type.name)
+
+        stats['adjustments_unmatched'] = len(unmatched)
+        for program_name in sorted(unmatched):
+            stats['errors'].append(f"Adjustments reference unknown program '{program_name}'")
+
+        if adjustment_seconds > 0:
+            stats['adjustment_rows_per_sec'] = round(adjustment_rows / adjustment_seconds, 1)
+
         logger.info(f"Ingestion completed: {stats}")
         return stats
 
@@ -102,6 +181,33 @@ def update_pricing_from_extraction(lender, extracted_data):
         return {'error': error_msg, 'details': str(e)}
 
 
+def _route_adjustments(programs, adjustments):
+    """
+    Group extracted adjustments by the program they belong to.
+
+    Adjustments naming a program via ``program_name`` go to that program
+    only. Adjustments without one are sheet-wide (e.g. state or lock
+    period LLPAs) and apply to every program on the sheet.
+
+    Returns:
+        Tuple of (routed, shared, unmatched): adjustments by program name,
+        sheet-wide adjustments, and the set of program names referenced by
+        adjustments but absent from ``programs``
+    """
+    program_names = {p.get('program_name') for p in programs}
+    routed: Dict[str, List[dict]] = {}
+    shared: List[dict] = []
+
+    for adj_data in adjustments:
+        program_name = adj_data.get('program_name')
+        if not program_name:
+            shared.append(adj_data)
+        else:
+            routed.setdefault(program_name, []).append(adj_data)
+
+    return routed, shared, set(routed) - program_names
+
+
 def _handle_legacy_format(lender, extracted_json_string):
     """
     Handle legacy JSON string format.
@@ -166,9 +272,9 @@ def _handle_legacy_format(lender, extracted_json_string):
         )
 
         # Clear old FICO/LTV adjustments
-        offering.adjustments.filter(
+        _delete_adjustments(offering.adjustments.filter(
             adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV
-        ).delete()
+        ))
 
         # Create new adjustments
         new_adjustments = []
@@ -224,6 +330,8 @@ def _ingest_program(lender, program_data):
         }
     )
 
+    price_ladder = _parse_price_ladder(program_data.get('price_ladder'))
+
     # Get or create LenderProgramOffering
     offering, created = LenderProgramOffering.objects.get_or_create(
         lender=lender,
@@ -233,6 +341,7 @@ def _ingest_program(lender, program_data):
             'max_rate': program_data.get('base_rate', 6.0) + 1.0,
             'min_points': 0,
             'max_points': 2,
+            'price_ladder': price_ladder,
             'min_fico': program_data.get('min_fico', 620),
             'max_ltv': program_data.get('max_ltv', 80.0),
             'min_loan': Decimal(str(program_data.get('min_loan_amount', 75000))),
@@ -241,12 +350,24 @@ def _ingest_program(lender, program_data):
     )
 
     if not created:
-        # Update existing offering
-        offering.min_rate = program_data.get('base_rate', offering.min_rate)
-        offering.max_rate = program_data.get('base_rate', offering.max_rate) + 1.0
-        offering.min_fico = program_data.get('min_fico', offering.min_fico)
-        offering.max_ltv = program_data.get('max_ltv', offering.max_ltv)
-        offering.save()
+        # Update existing offering, writing only the fields that changed so
+        # price-only updates don't invalidate unrelated cached quotes.
+        updates = {
+            'min_rate': program_data.get('base_rate', offering.min_rate),
+            'max_rate': program_data.get('base_rate', offering.max_rate) + 1.0,
+            'min_fico': program_data.get('min_fico', offering.min_fico),
+            'max_ltv': program_data.get('max_ltv', offering.max_ltv),
+        }
+        if price_ladder:
+            updates['price_ladder'] = price_ladder
+        changed = [
+            field for field, value in updates.items()
+            if getattr(offering, field) != value
+        ]
+        for field in changed:
+            setattr(offering, field, updates[field])
+        if changed:
+            offering.save(update_fields=changed + ['updated_at'])
 
     logger.info(
         f"{'Created' if created else 'Updated'} offering: "
@@ -256,60 +377,183 @@ def _ingest_program(lender, program_data):
     return {'offering': offering, 'created': created}
 
 
-def _ingest_adjustments(offering, adjustments_data):
+def _parse_price_ladder(rows):
     """
-    Ingest adjustments for a program offering.
+    Normalize an extracted base rate table into sorted [rate, price] pairs.
 
-    Args:
-        offering: LenderProgramOffering instance
-        adjustments_data: List of adjustment dictionaries
-
-    Returns:
-        Dictionary with 'created' and 'updated' counts
+    Prices become points above par: sheets print them around 100 (99.595
+    is a 0.405 point cost), so values above 50 are taken as such. Rows that
+    do not parse are skipped; a repeated rate keeps its first price.
     """
-    stats = {'created': 0, 'updated': 0}
-
-    for adj_data in adjustments_data:
+    ladder = {}
+    for row in rows or []:
         try:
-            adjustment_type = adj_data['adjustment_type']
-            adjustment_points = float(adj_data['adjustment_points'])
+            rate, price = (row['rate'], row['price']) if isinstance(row, dict) else row[:2]
+            rate, price = float(rate), float(price)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if price > 50:
+            price -= 100
+        ladder.setdefault(round(rate, 3), round(price, 3))
+    return [[rate, price] for rate, price in sorted(ladder.items())]
 
-            # Build lookup criteria
-            lookup = {
-                'offering': offering,
-                'adjustment_type': adjustment_type,
-            }
 
-            # Add type-specific fields
-            if 'value_key' in adj_data:
-                lookup['value_key'] = adj_data['value_key']
+def _adjustment_key(adjustment_type, value_key, row_min, row_max, col_min, col_max):
+    """Identity of an adjustment within one offering."""
+    return (adjustment_type, value_key or None, row_min, row_max, col_min, col_max)
 
-            if 'row_min' in adj_data and adj_data['row_min'] is not None:
-                lookup['row_min'] = float(adj_data['row_min'])
-                lookup['row_max'] = float(adj_data.get('row_max', adj_data['row_min']))
 
-            if 'col_min' in adj_data and adj_data['col_min'] is not None:
-                lookup['col_min'] = float(adj_data['col_min'])
-                lookup['col_max'] = float(adj_data.get('col_max', adj_data['col_min']))
+def _parse_adjustment(adj_data):
+    """
+    Normalize one extracted adjustment.
+
+    Returns:
+        Tuple of (key, adjustment_points, source_pages)
+    """
+    row_min = row_max = col_min = col_max = None
+    if adj_data.get('row_min') is not None:
+        row_min = float(adj_data['row_min'])
+        row_max = float(adj_data.get('row_max', adj_data['row_min']))
+    if adj_data.get('col_min') is not None:
+        col_min = float(adj_data['col_min'])
+        col_max = float(adj_data.get('col_max', adj_data['col_min']))
+
+    key = _adjustment_key(
+        adj_data['adjustment_type'], adj_data.get('value_key'),
+        row_min, row_max, col_min, col_max,
+    )
+    return key, float(adj_data['adjustment_points']), list(adj_data.get('source_pages') or [])
 
-            # Create or update adjustment
-            adjustment, created = RateAdjustment.objects.update_or_create(
-                **lookup,
-                defaults={'adjustment_points': adjustment_points}
-            )
 
-            if created:
-                stats['created'] += 1
-            else:
-                stats['updated'] += 1
+def _ingest_adjustments(offering, adjustments_data, prune=True, sheet_pages=None):
+    """
+    Ingest adjustments for a program offering as one set-based diff.
+
+    Incoming adjustments are compared in memory with the offering's existing
+    rows, keyed by (type, value_key, row bounds, col bounds). Only new rows
+    are inserted, only rows whose points changed are updated, and (when
+    ``prune`` is set) rows missing from the sheet are deleted, so a sheet
+    costs a handful of queries regardless of its size.
 
+    Args:
+        offering: LenderProgramOffering instance
+        adjustments_data: List of adjustment dictionaries
+        prune: Delete existing adjustments absent from a non-empty sheet
+        sheet_pages: For a partial sheet, fingerprints of all its pages;
+            rows absent from the data whose source pages are all gone
+            from the sheet are deleted
+
+    Returns:
+        Dictionary with 'created', 'updated', 'unchanged', 'deleted',
+        'rows' and 'seconds'
+    """
+    started = time.perf_counter()
+    stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+
+    incoming = {}
+    for adj_data in adjustments_data:
+        try:
+            key, points, sources = _parse_adjustment(adj_data)
         except Exception as e:
             logger.error(f"Error ingesting adjustment: {str(e)}")
             continue
+        incoming[key] = (points, sources)
+
+    existing = {}
+    duplicates = []
+    for adjustment in offering.adjustments.all().order_by('pk'):
+        key = _adjustment_key(
+            adjustment.adjustment_type, adjustment.value_key,
+            adjustment.row_min, adjustment.row_max,
+            adjustment.col_min, adjustment.col_max,
+        )
+        if key in existing:
+            duplicates.append(adjustment.pk)
+        else:
+            existing[key] = adjustment
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    # Unchanged rows now extracted from a different page only need their
+    # provenance updated; that is not a pricing change.
+    to_retag = []
+    for key, (points, sources) in incoming.items():
+        adjustment = existing.get(key)
+        if adjustment is None:
+            adjustment_type, value_key, row_min, row_max, col_min, col_max = key
+            to_create.append(RateAdjustment(
+                offering=offering,
+                adjustment_type=adjustment_type,
+                value_key=value_key or '',
+                row_min=row_min,
+                row_max=row_max,
+                col_min=col_min,
+                col_max=col_max,
+                adjustment_points=points,
+                source_pages=sources,
+            ))
+        elif adjustment.adjustment_points != points:
+            adjustment.adjustment_points = points
+            adjustment.source_pages = sources or adjustment.source_pages
+            adjustment.updated_at = now
+            to_update.append(adjustment)
+        else:
+            stats['unchanged'] += 1
+            if sources and adjustment.source_pages != sources:
+                adjustment.source_pages = sources
+                to_retag.append(adjustment)
+
+    to_delete = list(duplicates)
+    if prune and incoming:
+        to_delete.extend(adj.pk for key, adj in existing.items() if key not in incoming)
+    elif sheet_pages is not None:
+        to_delete.extend(
+            adj.pk for key, adj in existing.items()
+            if key not in incoming and adj.source_pages and sheet_pages.isdisjoint(adj.source_pages)
+        )
 
+    if to_create:
+        RateAdjustment.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+    if to_update:
+        RateAdjustment.objects.bulk_update(
+            to_update, ['adjustment_points', 'source_pages', 'updated_at'], batch_size=BULK_BATCH_SIZE
+        )
+    if to_retag:
+        RateAdjustment.objects.bulk_update(to_retag, ['source_pages'], batch_size=BULK_BATCH_SIZE)
+    if to_delete:
+        _delete_adjustments(RateAdjustment.objects.filter(pk__in=to_delete))
+
+    stats['created'] = len(to_create)
+    stats['updated'] = len(to_update)
+    stats['deleted'] = len(to_delete)
+    stats['rows'] = len(incoming)
+    stats['seconds'] = time.perf_counter() - started
     return stats
 
 
+def _delete_adjustments(queryset) -> int:
+    """
+    Delete adjustments with plain ``DELETE ... WHERE id IN (...)`` batches.
+
+    ``QuerySet.delete()`` would fetch every row and send post_delete for
+    each, invalidating the quote cache once per row. Nothing references
+    RateAdjustment, and ``update_pricing_from_extraction`` already
+    invalidates the lender once, so the signals are skipped.
+    """
+    pks = list(queryset.values_list('pk', flat=True))
+    table = connection.ops.quote_name(RateAdjustment._meta.db_table)
+    deleted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(pks), BULK_BATCH_SIZE):
+            batch = pks[start:start + BULK_BATCH_SIZE]
+            cursor.execute(
+                f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(batch))})", batch
+            )
+            deleted += cursor.rowcount
+    return deleted
+
+
 def _map_program_type_to_category(program_type: str) -> str:
     """
     Map program type string to category.
@@ -0,0 +1,108 @@
+"""
+Page-level change detection between consecutive rate sheets of a lender.
+
+Daily sheets usually reprice a few pages and repeat the rest verbatim. Each
+page's text and tables are fingerprinted and compared with the pages of the
+lender's last processed sheet (from the same processor); only pages whose
+fingerprint was not seen there need to be parsed again. Matching is by
+content rather than position, so an inserted or reordered page does not
+mark every following page as changed.
+
+Ingestion of a partial extraction merges into the existing offerings and
+adjustments instead of replacing them (see ``update_pricing_from_extraction``).
+Adjustments record the fingerprints of the pages they were extracted from,
+so those whose pages are no longer on the sheet are pruned.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.conf import settings
+
+from ratesheets.services.extraction import PageContent
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def page_fingerprint(page: PageContent) -> str:
+    """Hash of a page's whitespace-normalized text and its tables."""
+    digest = hashlib.sha256()
+    digest.update(_WHITESPACE.sub(' ', page.text).strip().encode())
+    digest.update(b'\0')
+    digest.update(json.dumps(page.tables, separators=(',', ':'), default=str).encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class PageDiff:
+    """Result of comparing a sheet's pages with the previous processed sheet."""
+    fingerprints: List[str]
+    changed: List[int] = field(default_factory=list)
+    previous_id: Optional[int] = None
+
+    @property
+    def partial(self) -> bool:
+        """True when only a subset of pages has to be parsed."""
+        return self.previous_id is not None and len(self.changed) < len(self.fingerprints)
+
+    @property
+    def digest(self) -> str:
+        """Identity of the changed content, for caching partial extractions."""
+        changed = ','.join(self.fingerprints[number - 1] for number in self.changed)
+        return hashlib.sha256(changed.encode()).hexdigest()[:12]
+
+    def summary(self) -> str:
+        if self.previous_id is None:
+            return f"Page diff: no previous sheet, parsing all {len(self.fingerprints)} pages"
+        return (
+            f"Page diff against RateSheet {self.previous_id}: "
+            f"{len(self.changed)} of {len(self.fingerprints)} pages changed {self.changed}"
+        )
+
+
+def previous_sheet(rate_sheet, processor: str):
+    """The lender's most recently processed sheet fingerprinted by ``processor``."""
+    from ratesheets.models import RateSheet
+
+    return (
+        RateSheet.objects
+        .filter(
+            lender_id=rate_sheet.lender_id,
+            status=RateSheet.STATUS_PROCESSED,
+            page_fingerprints__processor=processor,
+        )
+        .exclude(pk=rate_sheet.pk)
+        .order_by('-processed_at', '-pk')
+        .only('id', 'page_fingerprints')
+        .first()
+    )
+
+
+def diff_pages(rate_sheet, pages: List[PageContent], processor: str, compare: bool = True) -> PageDiff:
+    """
+    Fingerprint ``pages`` and find those not present on the previous sheet.
+
+    With ``compare`` or RATESHEET_PAGE_DIFF_ENABLED off, or without a
+    comparable previous sheet, every page is reported as changed.
+    """
+    fingerprints = [page_fingerprint(page) for page in pages]
+    diff = PageDiff(fingerprints=fingerprints, changed=[page.number for page in pages])
+
+    if not compare or not getattr(settings, 'RATESHEET_PAGE_DIFF_ENABLED', True):
+        return diff
+
+    previous = previous_sheet(rate_sheet, processor)
+    if previous is None:
+        return diff
+
+    seen = set(previous.page_fingerprints.get('pages', []))
+    diff.previous_id = previous.pk
+    diff.changed = [
+        page.number
+        for page, fingerprint in zip(pages, fingerprints)
+        if fingerprint not in seen
+    ]
+    return diff
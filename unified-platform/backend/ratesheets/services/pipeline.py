@@ -0,0 +1,121 @@
+"""
+Staged rate sheet processing: extract -> structure -> validate -> ingest.
+
+Each stage is its own Celery task routed to its own queue
+(RATESHEET_QUEUES), so CPU-bound pdfplumber extraction, slow Gemini calls
+and database ingestion run on separately sized workers.
+
+A stage's output is stored in the stage store under the SHA-256 of its
+JSON content, and the key is recorded in ``RateSheet.pipeline['stages']``.
+A stage whose output is already recorded is skipped, so a redelivered task
+is a no-op and re-running a failed sheet resumes at the stage that failed
+instead of redoing extraction.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from ratesheets.services.extraction_cache import ExtractionCache
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('extract', 'structure', 'validate', 'ingest')
+
+
+def stage_store() -> ExtractionCache:
+    """Store for stage outputs; unlike the extraction cache it is never disabled."""
+    return ExtractionCache(
+        getattr(settings, 'RATESHEET_STAGE_DIR', settings.BASE_DIR / 'ratesheet_cache' / 'stages'),
+    )
+
+
+def content_key(value: Any) -> str:
+    """SHA-256 of a JSON-serializable value, independent of key order."""
+    raw = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def reset(rate_sheet, processor: str) -> None:
+    """Start a fresh run with ``processor``, forgetting completed stages."""
+    rate_sheet.pipeline = {
+        'processor': processor,
+        'started_at': timezone.now().isoformat(),
+        'stages': {},
+    }
+
+
+def next_stage(rate_sheet) -> Optional[str]:
+    """First stage without recorded output, or None once the run is complete."""
+    stages = (rate_sheet.pipeline or {}).get('stages', {})
+    return next((stage for stage in STAGES if stage not in stages), None)
+
+
+def stage_result(rate_sheet, stage: str) -> Optional[Any]:
+    """Recorded output of ``stage``, or None if it has not run (or was evicted)."""
+    key = (rate_sheet.pipeline or {}).get('stages', {}).get(stage)
+    if key is None:
+        return None
+    return stage_store().get(key)
+
+
+def record_stage(rate_sheet, stage: str, value: Any) -> str:
+    """Store ``value`` by content hash and mark ``stage`` complete; the caller saves."""
+    key = content_key(value)
+    stage_store().set(key, value)
+    rate_sheet.pipeline.setdefault('stages', {})[stage] = key
+    return key
+
+
+def _number(value: Any) -> bool:
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def validate_extraction(data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Normalize structured output before ingestion.
+
+    Ensures the metadata/programs/adjustments keys exist and drops programs
+    without a name and adjustments without a type or numeric points, which
+    ingestion cannot store. Legacy JSON-string payloads are passed through.
+
+    Returns:
+        Tuple of (validated data, list of problems found)
+    """
+    if isinstance(data, str):
+        return data, []
+    data = dict(data or {})
+    if not isinstance(data.get('metadata'), dict):
+        data['metadata'] = {}
+    problems = []
+
+    programs = []
+    for program in data.get('programs') or []:
+        if isinstance(program, dict) and str(program.get('program_name') or '').strip():
+            programs.append(program)
+        else:
+            problems.append(f"Dropped program without a name: {program!r:.120}")
+
+    adjustments = []
+    for adjustment in data.get('adjustments') or []:
+        if not isinstance(adjustment, dict) or not adjustment.get('adjustment_type'):
+            problems.append(f"Dropped adjustment without a type: {adjustment!r:.120}")
+        elif not _number(adjustment.get('adjustment_points')):
+            problems.append(
+                f"Dropped {adjustment['adjustment_type']} adjustment with non-numeric points: "
+                f"{adjustment.get('adjustment_points')!r}"
+            )
+        else:
+            adjustments.append(adjustment)
+
+    data['programs'] = programs
+    data['adjustments'] = adjustments
+    return data, problems
@@ -6,6 +6,7 @@ This package provides various processors for extracting data from rate sheet fil
 Available processors:
 - BaseRateSheetProcessor: Abstract base class for all processors
 - PdfPlumberProcessor: Basic PDF text and table extraction
+- TableGridProcessor: Deterministic FICO x LTV grid parsing, with AI fallback
 - GeminiAIProcessor: AI-powered intelligent extraction (requires google-generativeai)
 
 Usage:
@@ -27,6 +28,7 @@ from .factory import (
     registry,
 )
 from .pdf_plumber import PdfPlumberProcessor
+from .table_grid import TableGridProcessor
 
 # Conditionally import GeminiAIProcessor
 try:
@@ -35,6 +37,7 @@ try:
         'BaseRateSheetProcessor',
         'RateSheetProcessingError',
         'PdfPlumberProcessor',
+        'TableGridProcessor',
         'GeminiAIProcessor',
         'ProcessorRegistry',
         'get_processor_for_rate_sheet',
@@ -45,6 +48,7 @@ except ImportError:
         'BaseRateSheetProcessor',
         'RateSheetProcessingError',
         'PdfPlumberProcessor',
+        'TableGridProcessor',
         'ProcessorRegistry',
         'get_processor_for_rate_sheet',
         'registry',
@@ -1,6 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from dataclasses import asdict
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional
 import logging
+import time
+
+from django.conf import settings
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +21,10 @@ class BaseRateSheetProcessor(ABC):
     Abstract base class for rate sheet processors.
     Defines the interface for extracting data from various file formats.
     """
+
+    # True for processors that write their results to pricing themselves,
+    # so the processing task must not ingest the returned data again.
+    ingests_results = False
     
     def __init__(self, rate_sheet_instance):
         """
@@ -22,6 +32,14 @@ class BaseRateSheetProcessor(ABC):
         """
         self.rate_sheet = rate_sheet_instance
         self.file_path = rate_sheet_instance.file.path
+        self.stage = ''
+        # Pages handed over by the pipeline's extract stage, if any
+        self.pages = None
+        # False to parse every page instead of diffing against the lender's
+        # previous sheet (fingerprints are still recorded)
+        self.compare_pages = True
+        self._pending_events = []
+        self._last_flush = time.monotonic()
         
     @abstractmethod
     def process(self) -> Dict[str, Any]:
@@ -34,8 +52,115 @@ class BaseRateSheetProcessor(ABC):
         """
         pass
         
-    def log(self, message: str):
-        """Append a message to the rate sheet log."""
+    def log(self, message: str, level: str = 'info'):
+        """
+        Append a message to the rate sheet log.
+
+        Messages are buffered and written by flush_log(), which runs at
+        stage boundaries, every RATESHEET_LOG_FLUSH_SECONDS and every
+        RATESHEET_LOG_FLUSH_EVENTS messages, so a long sheet costs a few
+        writes instead of one growing-text rewrite per line.
+        """
+        from ratesheets.models import RateSheetEvent
+
         self.rate_sheet.log += f"{message}\n"
+        self._pending_events.append(RateSheetEvent(
+            rate_sheet=self.rate_sheet,
+            created_at=timezone.now(),
+            stage=self.stage,
+            level=level,
+            message=message,
+        ))
+        logger.log(
+            logging.ERROR if level == 'error' else logging.WARNING if level == 'warning' else logging.INFO,
+            f"RateSheet {self.rate_sheet.id}: {message}",
+        )
+
+        if (
+            len(self._pending_events) >= getattr(settings, 'RATESHEET_LOG_FLUSH_EVENTS', 50)
+            or time.monotonic() - self._last_flush >= getattr(settings, 'RATESHEET_LOG_FLUSH_SECONDS', 2.0)
+        ):
+            self.flush_log()
+
+    def flush_log(self):
+        """Write buffered events and the accumulated log text."""
+        from ratesheets.models import RateSheetEvent
+
+        self._last_flush = time.monotonic()
+        if not self._pending_events:
+            return
+        events, self._pending_events = self._pending_events, []
+        RateSheetEvent.objects.bulk_create(events)
         self.rate_sheet.save(update_fields=['log'])
-        logger.info(f"RateSheet {self.rate_sheet.id}: {message}")
+
+    def begin_stage(self, stage: str):
+        """Flush what the previous stage logged and tag new events with ``stage``."""
+        self.flush_log()
+        self.stage = stage
+
+    @cached_property
+    def file_hash(self) -> str:
+        """SHA-256 of the rate sheet file, the content address for cached extractions."""
+        from ratesheets.services.extraction_cache import file_digest
+        return file_digest(self.file_path)
+
+    def cached(
+        self,
+        processor: str,
+        compute: Callable[[], Any],
+        model_version: str = '',
+        prompt_version: str = '',
+    ) -> Any:
+        """
+        Return the cached result for this file and processor/model/prompt
+        version, or run ``compute`` and store its (JSON-serializable) result.
+        Hits and misses are recorded in the rate sheet log.
+        """
+        from ratesheets.services.extraction_cache import extraction_cache
+
+        cache = extraction_cache()
+        if not cache.enabled:
+            return compute()
+
+        key = cache.key(self.file_hash, processor, model_version, prompt_version)
+        value = cache.get(key)
+        if value is not None:
+            self.log(f"Extraction cache hit: {processor} ({key[:12]})")
+            return value
+
+        self.log(f"Extraction cache miss: {processor} ({key[:12]})")
+        value = compute()
+        cache.set(key, value)
+        return value
+
+    def extract_pages(self) -> list:
+        """
+        Extract PDF pages (text and tables), reusing cached results for
+        identical files, or return the pages already set on ``self.pages``.
+        """
+        if self.pages is not None:
+            return self.pages
+
+        import pdfplumber
+        from ratesheets.services.extraction import PageContent, extract_pages
+
+        pages = self.cached(
+            'pdfplumber',
+            lambda: [asdict(page) for page in extract_pages(self.file_path)],
+            model_version=pdfplumber.__version__,
+        )
+        self.pages = [PageContent(**page) for page in pages]
+        return self.pages
+
+    def diff_pages(self, pages: list, processor: str):
+        """
+        Compare ``pages`` with the lender's previous sheet and record this
+        sheet's fingerprints so the next sheet can be diffed against it.
+        """
+        from ratesheets.services.page_diff import diff_pages
+
+        diff = diff_pages(self.rate_sheet, pages, processor, compare=self.compare_pages)
+        self.rate_sheet.page_fingerprints = {'processor': processor, 'pages': diff.fingerprints}
+        self.rate_sheet.save(update_fields=['page_fingerprints'])
+        self.log(diff.summary())
+        return diff
@@ -12,6 +12,7 @@ from django.conf import settings
 
 from .base import BaseRateSheetProcessor
 from .pdf_plumber import PdfPlumberProcessor
+from .table_grid import TableGridProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -34,12 +35,15 @@ class ProcessorRegistry:
 
     def __init__(self):
         self._processors = {}
+        self._lender_configs = {}
         self._register_default_processors()
+        self._configure_lenders_from_settings()
 
     def _register_default_processors(self):
         """Register built-in processors."""
         # Always available
         self.register('pdf_plumber', PdfPlumberProcessor)
+        self.register('table_grid', TableGridProcessor)
 
         # Only if dependencies installed
         if GEMINI_AVAILABLE:
@@ -61,6 +65,59 @@ class ProcessorRegistry:
         self._processors[name] = processor_class
         logger.info(f"Registered processor: {name}")
 
+    def _configure_lenders_from_settings(self):
+        """
+        Load per-lender processors from RATESHEET_LENDER_PROCESSORS, a mapping
+        of lender ID or company name to {'processor': name, **options}.
+        """
+        for lender, config in getattr(settings, 'RATESHEET_LENDER_PROCESSORS', {}).items():
+            config = dict(config)
+            processor_name = config.pop('processor', None)
+            try:
+                self.configure_lender(lender, processor_name, **config)
+            except ValueError as e:
+                logger.warning(f"Ignoring processor configuration for lender {lender}: {e}")
+
+    def configure_lender(self, lender, processor_name: str, **options):
+        """
+        Route a lender's rate sheets to a registered processor.
+
+        Args:
+            lender: Lender instance, lender ID, or company name
+            processor_name: Registered processor identifier
+            **options: Processor options (e.g. GridParserConfig fields
+                for 'table_grid')
+        """
+        if processor_name not in self._processors:
+            raise ValueError(f"Processor '{processor_name}' not found in registry")
+
+        self._lender_configs[self._lender_key(lender)] = {
+            'processor': processor_name,
+            'options': options,
+        }
+        logger.info(f"Configured processor {processor_name} for lender {lender}")
+
+    def get_lender_config(self, lender) -> Optional[dict]:
+        """
+        Get the processor configuration for a lender, matched by ID first
+        and then by company name.
+
+        Returns:
+            Dict with 'processor' and 'options', or None if not configured
+        """
+        config = self._lender_configs.get(self._lender_key(getattr(lender, 'pk', lender)))
+        if config is None and hasattr(lender, 'company_name'):
+            config = self._lender_configs.get(self._lender_key(lender.company_name))
+        return config
+
+    @staticmethod
+    def _lender_key(lender):
+        if hasattr(lender, 'pk'):
+            return lender.pk
+        if isinstance(lender, str) and not lender.isdigit():
+            return lender.strip().casefold()
+        return int(lender)
+
     def get_processor(self, name: str) -> Optional[Type[BaseRateSheetProcessor]]:
         """
         Get a processor by name.
@@ -127,11 +184,17 @@ class ProcessorRegistry:
 
         Args:
             rate_sheet: RateSheet model instance
-            lender_processor_map: Optional mapping of lender IDs to processor names
+            lender_processor_map: Optional mapping of lender IDs to processor names;
+                lenders configured via configure_lender() are used otherwise
 
         Returns:
             Processor class
         """
+        if not lender_processor_map:
+            config = self.get_lender_config(rate_sheet.lender)
+            if config:
+                lender_processor_map = {rate_sheet.lender.id: config['processor']}
+
         if lender_processor_map:
             lender_id = rate_sheet.lender.id
             processor_name = lender_processor_map.get(lender_id)
@@ -201,14 +264,9 @@ def get_processor_for_rate_sheet(
         )
         return processor_class(rate_sheet)
 
-    # If lender mapping provided, use it
-    if lender_processor_map:
-        processor_class = registry.get_processor_for_lender(
-            rate_sheet,
-            lender_processor_map
-        )
-        return processor_class(rate_sheet)
-
-    # Use default selection logic
-    processor_class = registry.get_default_processor(rate_sheet)
+    # Use the lender mapping or configured lender processor, else defaults
+    processor_class = registry.get_processor_for_lender(
+        rate_sheet,
+        lender_processor_map
+    )
     return processor_class(rate_sheet)
@@ -7,7 +7,10 @@ structured data from rate sheet PDFs, handling varying formats automatically.
 
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 import os
 
 try:
@@ -19,13 +22,17 @@ except ImportError:
     GEMINI_AVAILABLE = False
 
 try:
-    import pdfplumber
+    import pdfplumber  # noqa: F401
     PDFPLUMBER_AVAILABLE = True
 except ImportError:
     PDFPLUMBER_AVAILABLE = False
 
 from django.conf import settings
 
+from ratesheets.services.chunking import Chunk, chunk_pages, merge_extractions
+from ratesheets.services.extraction_cache import text_version
+from ratesheets.services.page_diff import page_fingerprint
+
 from .base import BaseRateSheetProcessor, RateSheetProcessingError
 
 logger = logging.getLogger(__name__)
@@ -61,10 +68,12 @@ Extract the following information:
    - max_loan_amount: Maximum loan amount
    - property_types: List of allowed property types
    - occupancy_types: List of allowed occupancy types
+   - price_ladder: The program's base rate/price table as [rate, price] rows exactly as printed (first price column), e.g. [[6.25, 98.907], [6.375, 99.595]]; omit if the sheet has none
 
 3. **Adjustments**: List of pricing adjustments with:
    - adjustment_type: Type of adjustment (fico_ltv, purpose, occupancy, property_type, loan_amount, lock_period, state)
    - description: Human-readable description
+   - program_name: The program_name (exactly as listed in programs) this adjustment belongs to; omit only for adjustments that apply to every program on the sheet
 
    For 2D grid adjustments (FICO × LTV):
    - row_label: "fico" or "ltv"
@@ -96,13 +105,15 @@ Return ONLY this JSON structure:
       "min_loan_amount": 75000,
       "max_loan_amount": 2000000,
       "property_types": ["residential"],
-      "occupancy_types": ["investment"]
+      "occupancy_types": ["investment"],
+      "price_ladder": [[7.125, 99.5], [7.25, 100.125]]
     }
   ],
   "adjustments": [
     {
       "adjustment_type": "fico_ltv",
       "description": "FICO 680-699, LTV 70-75",
+      "program_name": "Program Name",
       "row_label": "fico",
       "row_min": 680,
       "row_max": 699,
@@ -120,6 +131,13 @@ Return ONLY this JSON structure:
   ]
 }"""
 
+    CONTINUATION_NOTE = (
+        "NOTE: This excerpt continues a longer rate sheet from {context}. Grids here "
+        "may belong to the program started there: give their adjustments that "
+        "program's program_name, and omit program_name only for adjustments that "
+        "apply to every program on the sheet."
+    )
+
     def __init__(self, rate_sheet_instance):
         """Initialize Gemini AI processor."""
         super().__init__(rate_sheet_instance)
@@ -168,87 +186,187 @@ Return ONLY this JSON structure:
             )
 
         try:
-            # Step 1: Extract text and tables from PDF
-            pdf_content = self._extract_pdf_content()
-
-            # Step 2: Use Gemini to parse the content
-            self.log(f"Sending to Gemini AI for structured extraction")
-            structured_data = self._ai_extract_data(pdf_content)
+            # Step 1: Extract text and tables from PDF (cached for identical files)
+            self.begin_stage('extract')
+            pages = self.extract_pages()
+            self.log(f"Extracted {len(pages)} pages")
+
+            # Only pages that changed since the lender's previous sheet are
+            # sent to Gemini; the rest of the pricing is already on file.
+            self.begin_stage('diff')
+            diff = self.diff_pages(pages, 'gemini_ai')
+            changed_numbers = set(diff.changed)
+            changed = [page for page in pages if page.number in changed_numbers]
+
+            if changed:
+                # Step 2: Use Gemini to parse the content. Skipped entirely when
+                # the same pages were already extracted with this model and prompt.
+                self.begin_stage('ai')
+                prompt_version = self.prompt_version
+                if diff.partial:
+                    prompt_version = f"{prompt_version}:{diff.digest}"
+                structured_data = self.cached(
+                    'gemini_ai',
+                    lambda: self._extract_structured_data(changed, partial=diff.partial),
+                    model_version=self.model_name,
+                    prompt_version=prompt_version,
+                )
+            else:
+                self.log("No pages changed since the previous sheet, skipping AI extraction")
+                structured_data = {}
 
             # Step 3: Validate and enrich the data
+            self.begin_stage('validate')
             validated_data = self._validate_extraction(structured_data)
+            validated_data['metadata'].update({
+                'partial': diff.partial or not changed,
+                'pages_total': len(pages),
+                'pages_changed': diff.changed,
+                'page_fingerprints': diff.fingerprints,
+                'previous_rate_sheet_id': diff.previous_id,
+            })
 
             self.log(f"AI extraction completed successfully")
             return validated_data
 
         except Exception as e:
             error_msg = f"Error in AI processing: {str(e)}"
-            self.log(f"CRITICAL ERROR: {error_msg}")
+            self.log(f"CRITICAL ERROR: {error_msg}", level='error')
             raise RateSheetProcessingError(error_msg) from e
 
-    def _extract_pdf_content(self) -> str:
-        """
-        Extract text and tables from PDF.
+        finally:
+            self.flush_log()
 
-        Returns:
-            Formatted string with PDF content for AI processing
-        """
-        content_parts = []
+    @property
+    def prompt_version(self) -> str:
+        """Version tag of the prompts; editing them invalidates cached output."""
+        return text_version(self.EXTRACTION_PROMPT + self.CONTINUATION_NOTE)
 
-        with pdfplumber.open(self.file_path) as pdf:
-            self.log(f"Extracting from {len(pdf.pages)} pages")
-
-            # Extract text from each page
-            for page_num, page in enumerate(pdf.pages, start=1):
-                page_text = page.extract_text()
-                if page_text:
-                    content_parts.append(f"=== Page {page_num} Text ===\n{page_text}")
-
-                # Extract tables
-                tables = page.extract_tables()
-                for table_num, table in enumerate(tables, start=1):
-                    if table:
-                        table_str = self._format_table(table)
-                        content_parts.append(
-                            f"\n=== Page {page_num} Table {table_num} ===\n{table_str}"
-                        )
-
-        full_content = "\n\n".join(content_parts)
-
-        # Log content size
-        self.log(f"Extracted {len(full_content)} characters")
+    def _extract_structured_data(self, pages: list, partial: bool = False) -> Dict[str, Any]:
+        """
+        Extract ``pages`` in chunks sent to Gemini concurrently, then merge.
 
-        # Truncate if too large (Gemini has token limits)
-        max_chars = 100000  # Increased limit for Gemini 1.5 Pro
-        if len(full_content) > max_chars:
-            self.log(f"Content truncated from {len(full_content)} to {max_chars} chars")
-            full_content = full_content[:max_chars]
+        Chunks hold whole pages (or whole tables of oversized pages) up to
+        RATESHEET_AI_CHUNK_CHARS, so nothing is truncated. At most
+        RATESHEET_AI_CONCURRENCY requests are in flight; a failing chunk is
+        retried with exponential backoff and fails the sheet once retries
+        are exhausted, rather than silently dropping its programs.
+        """
+        chunks = chunk_pages(pages, getattr(settings, 'RATESHEET_AI_CHUNK_CHARS', 30000))
+        fingerprints = {page.number: page_fingerprint(page) for page in pages}
+        preamble = self._partial_sheet_note() if partial else ''
+        workers = max(1, min(getattr(settings, 'RATESHEET_AI_CONCURRENCY', 4), len(chunks)))
+        self.log(
+            f"Sending {len(pages)} pages to Gemini AI in {len(chunks)} chunks "
+            f"({workers} concurrent)"
+        )
 
-        return full_content
+        started = time.perf_counter()
+        results = []
+        retries = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._extract_chunk, chunk, preamble) for chunk in chunks]
+            try:
+                for number, (chunk, future) in enumerate(zip(chunks, futures), start=1):
+                    data, attempts = future.result()
+                    # Tag adjustments with the chunk's pages so a later partial
+                    # sheet can prune them once those pages are replaced.
+                    for adjustment in data.get('adjustments') or []:
+                        if isinstance(adjustment, dict):
+                            adjustment['source_pages'] = [fingerprints[n] for n in chunk.pages]
+                    results.append(data)
+                    retries += attempts - 1
+                    self.log(
+                        f"Chunk {number}/{len(chunks)} (pages {chunk.pages[0]}-{chunk.pages[-1]}, "
+                        f"{len(chunk)} chars): {len(data.get('programs') or [])} programs, "
+                        f"{len(data.get('adjustments') or [])} adjustments"
+                        + (f" after {attempts - 1} retries" if attempts > 1 else "")
+                    )
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+        elapsed = time.perf_counter() - started
+
+        merged = merge_extractions(results)
+        pages_per_minute = round(len(pages) * 60 / elapsed, 1) if elapsed > 0 else 0.0
+        merged['metadata']['throughput'] = {
+            'pages': len(pages),
+            'chunks': len(chunks),
+            'retries': retries,
+            'seconds': round(elapsed, 3),
+            'pages_per_minute': pages_per_minute,
+        }
+        self.log(
+            f"AI extraction throughput: {pages_per_minute} pages/minute "
+            f"({len(pages)} pages in {elapsed:.1f}s, {retries} retries); "
+            f"merge: {merged['metadata']['merge']}"
+        )
+        return merged
 
-    def _format_table(self, table: List[List[str]]) -> str:
+    def _extract_chunk(self, chunk: Chunk, preamble: str = '') -> Tuple[Dict[str, Any], int]:
         """
-        Format table as readable text for AI.
+        Extract one chunk, retrying with jittered exponential backoff.
 
-        Args:
-            table: Table data as list of lists
+        Runs in a worker thread, so it must not touch the database (and
+        therefore must not call ``self.log``).
 
         Returns:
-            Formatted table string
+            Tuple of (parsed JSON, attempts made)
         """
-        lines = []
-        for row in table:
-            # Join cells with | separator, handling None values
-            cells = [str(cell) if cell is not None else '' for cell in row]
-            lines.append(' | '.join(cells))
-        return '\n'.join(lines)
+        notes = [preamble] if preamble else []
+        if chunk.context:
+            notes.append(self.CONTINUATION_NOTE.format(context=chunk.context))
+        content = '\n\n'.join(notes + [chunk.content])
+        max_retries = getattr(settings, 'RATESHEET_AI_MAX_RETRIES', 3)
+        backoff = getattr(settings, 'RATESHEET_AI_RETRY_BACKOFF', 2.0)
+
+        attempt = 1
+        while True:
+            try:
+                return self._ai_extract_data(content), attempt
+            except RateSheetProcessingError as e:
+                if attempt > max_retries:
+                    raise RateSheetProcessingError(
+                        f"Pages {chunk.pages} failed after {attempt} attempts: {e}"
+                    ) from e
+                delay = backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+                logger.warning(
+                    f"RateSheet {self.rate_sheet.id}: pages {chunk.pages} attempt {attempt} "
+                    f"failed ({e}), retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    def _partial_sheet_note(self) -> str:
+        """Context for a sheet reduced to its changed pages."""
+        from pricing.models import LenderProgramOffering
+
+        names = sorted(
+            LenderProgramOffering.objects
+            .filter(lender_id=self.rate_sheet.lender_id)
+            .values_list('program_type__name', flat=True)
+        )
+        note = (
+            "NOTE: Only the pages that changed since this lender's previous rate sheet "
+            "are included. Extract what these pages contain."
+        )
+        if names:
+            note += (
+                " Programs already on file for this lender (use these exact names as "
+                f"program_name where they apply): {', '.join(names)}"
+            )
+        return note
 
     def _ai_extract_data(self, pdf_content: str) -> Dict[str, Any]:
         """
-        Use Gemini AI to extract structured data.
+        Use Gemini AI to extract structured data from one chunk.
+
+        Called from worker threads; reports through exceptions and the
+        module logger only.
 
         Args:
-            pdf_content: Extracted PDF content
+            pdf_content: Formatted PDF content
 
         Returns:
             Parsed JSON data from AI
@@ -275,7 +393,7 @@ Return ONLY this JSON structure:
             response_text = response.text.strip()
 
             # Log response for debugging
-            self.log(f"AI Response (first 500 chars): {response_text[:500]}")
+            logger.debug(f"AI Response (first 500 chars): {response_text[:500]}")
 
             # Parse JSON from response
             # Response should be clean JSON due to response_mime_type
@@ -291,22 +409,16 @@ Return ONLY this JSON structure:
             response_text = response_text.strip()
 
             # Parse JSON
-            data = json.loads(response_text)
-
-            self.log(f"Successfully parsed AI response")
-            return data
+            return json.loads(response_text)
 
         except json.JSONDecodeError as e:
-            error_msg = f"Failed to parse AI response as JSON: {str(e)}"
-            self.log(error_msg)
-            if 'response_text' in locals():
-                self.log(f"Raw response: {response_text[:1000]}")
-            raise RateSheetProcessingError(error_msg) from e
+            raise RateSheetProcessingError(
+                f"Failed to parse AI response as JSON: {str(e)}; "
+                f"raw response: {response_text[:1000]}"
+            ) from e
 
         except Exception as e:
-            error_msg = f"AI extraction failed: {str(e)}"
-            self.log(error_msg)
-            raise RateSheetProcessingError(error_msg) from e
+            raise RateSheetProcessingError(f"AI extraction failed: {str(e)}") from e
 
     def _validate_extraction(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -1,5 +1,4 @@
 import logging
-import pdfplumber
 from typing import Any, Dict
 from django.utils import timezone
 from .base import BaseRateSheetProcessor
@@ -11,6 +10,8 @@ class PdfPlumberProcessor(BaseRateSheetProcessor):
     PDF rate sheet processor using pdfplumber.
     Extracts text and tables from PDF files.
     """
+
+    ingests_results = True
     
     def process(self) -> Dict[str, Any]:
         """
@@ -18,31 +19,42 @@ class PdfPlumberProcessor(BaseRateSheetProcessor):
         For MVP, this logs the first few pages and counts pages.
         """
         try:
-            with pdfplumber.open(self.file_path) as pdf:
-                full_text = ""
-                full_tables = []
-                for page in pdf.pages:
-                    full_text += page.extract_text() + "\n"
-                    full_tables.extend(page.extract_tables())
+            self.begin_stage('extract')
+            pages = self.extract_pages()
+
+            # Only parse pages that changed since the lender's previous sheet
+            self.begin_stage('diff')
+            diff = self.diff_pages(pages, 'pdfplumber')
+            changed_numbers = set(diff.changed)
+            changed = [page for page in pages if page.number in changed_numbers]
+
+            full_text = "".join(f"{page.text}\n" for page in changed)
+            full_tables = [table for page in changed for table in page.tables]
             
             # Log preview
             self.log(f"Extracted {len(full_text)} chars and {len(full_tables)} tables.")
             
             # Simple routing based on filename or content
+            self.begin_stage('parse')
             parsed_data = {}
-            if "acra" in self.file_path.lower():
+            if changed and "acra" in self.file_path.lower():
                 parsed_data = self._parse_acra(full_text, full_tables)
+            parsed_data['metadata'] = {'partial': diff.partial or not changed}
             
             from ratesheets.services.ingestion import update_pricing_from_extraction
+            self.begin_stage('ingest')
             result = update_pricing_from_extraction(self.rate_sheet.lender, parsed_data)
             
             self.log(f"Ingestion Result: {result}")
             return parsed_data
 
         except Exception as e:
-            self.log(f"CRITICAL ERROR: {str(e)}")
+            self.log(f"CRITICAL ERROR: {str(e)}", level='error')
             raise e
 
+        finally:
+            self.flush_log()
+
     def _parse_acra(self, text, tables):
         """
         Specific logic for Acra Lending rate sheets.
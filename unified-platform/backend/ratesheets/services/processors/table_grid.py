@@ -0,0 +1,114 @@
+"""
+Deterministic rate sheet processor for FICO x LTV matrix layouts.
+
+Parses pricing grids straight out of pdfplumber tables (see
+``ratesheets.services.grid_parser``), so common matrix sheets are processed
+locally in milliseconds without an LLM. Sheets without a recognizable grid
+fall back to GeminiAIProcessor when it is available; the fallback extracts
+the whole sheet and records its page fingerprints as 'gemini_ai', so later
+sheets are diffed against the processor that produced the pricing.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from ratesheets.services.grid_parser import GridParserConfig, parse_pages
+
+from .base import BaseRateSheetProcessor, RateSheetProcessingError
+
+logger = logging.getLogger(__name__)
+
+
+class TableGridProcessor(BaseRateSheetProcessor):
+    """
+    Structural grid parser, configured per lender through the registry:
+
+        registry.configure_lender(lender, 'table_grid', program_name="Acra Non Prime")
+
+    or, for sheets with one titled grid per program:
+
+        registry.configure_lender(lender, 'table_grid', programs={
+            "DSCR": "Acra DSCR", "Non Prime": "Acra Non Prime",
+        })
+    """
+
+    def __init__(self, rate_sheet_instance, config: Optional[GridParserConfig] = None):
+        super().__init__(rate_sheet_instance)
+
+        if config is None:
+            from .factory import registry
+
+            lender_config = registry.get_lender_config(rate_sheet_instance.lender)
+            options = (lender_config or {}).get('options', {})
+            try:
+                config = GridParserConfig(**options)
+            except (TypeError, ValueError) as e:
+                raise RateSheetProcessingError(
+                    f"No table grid configuration for lender {rate_sheet_instance.lender_id}: {e}"
+                ) from e
+        self.config = config
+
+    def process(self) -> Dict[str, Any]:
+        """
+        Parse FICO x LTV grids from the sheet's changed pages.
+
+        Returns:
+            Dictionary with metadata, programs and adjustments
+        """
+        self.log("Starting table grid extraction")
+
+        try:
+            self.begin_stage('extract')
+            pages = self.extract_pages()
+            self.begin_stage('diff')
+            diff = self.diff_pages(pages, 'table_grid')
+            changed_numbers = set(diff.changed)
+            changed = [page for page in pages if page.number in changed_numbers]
+
+            self.begin_stage('parse')
+            started = time.perf_counter()
+            data = parse_pages(changed, self.config)
+            fingerprints = dict(zip((page.number for page in pages), diff.fingerprints))
+            for cell in data['adjustments']:
+                cell['source_pages'] = [fingerprints[cell['page']]]
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.log(
+                f"Parsed {len(data['metadata']['grids'])} grids "
+                f"({len(data['adjustments'])} cells) in {elapsed_ms:.1f}ms"
+            )
+
+            # A partial sheet with no grid on its changed pages has nothing to
+            # update; only a full sheet without any grid needs the LLM.
+            if not data['adjustments'] and not diff.partial and changed and self.config.fallback_to_ai:
+                fallback = self._ai_fallback(pages)
+                if fallback is not None:
+                    return fallback
+
+            data['metadata'].update({
+                'partial': diff.partial or not changed,
+                'pages_total': len(pages),
+                'pages_changed': diff.changed,
+                'page_fingerprints': diff.fingerprints,
+                'previous_rate_sheet_id': diff.previous_id,
+            })
+            return data
+        finally:
+            self.flush_log()
+
+    def _ai_fallback(self, pages: list) -> Optional[Dict[str, Any]]:
+        """Extract with GeminiAIProcessor, or None if it is unavailable."""
+        try:
+            from .gemini_ai import GeminiAIProcessor
+
+            processor = GeminiAIProcessor(self.rate_sheet)
+        except (ImportError, RateSheetProcessingError) as e:
+            self.log(f"No pricing grid found and AI fallback unavailable: {e}")
+            return None
+
+        # The grid pass found nothing on a full sheet, so the AI must see every
+        # page; it records the fingerprints under its own name.
+        processor.pages = pages
+        processor.compare_pages = False
+        self.log("No pricing grid found, falling back to AI extraction")
+        return processor.process()
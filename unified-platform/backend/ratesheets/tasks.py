@@ -1,19 +1,34 @@
-from celery import shared_task
+from celery import chain, shared_task
+from dataclasses import asdict
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from .models import RateSheet
+from .services import pipeline
+from .services.extraction import PageContent
+from .services.processors.base import RateSheetProcessingError
 from .services.processors.pdf_plumber import PdfPlumberProcessor
 from .services.processors.gemini_ai import GeminiAIProcessor
+from .services.processors.factory import registry
 from .services.ingestion import update_pricing_from_extraction
+from .ingestion.csv_reader import RateSheetCSVReader
+from .ingestion.fleet import FleetDownloader, refresh_rate_sheets, summarize
+from pathlib import Path
 import logging
+import time
 import traceback
 
 logger = logging.getLogger(__name__)
 
 @shared_task
-def process_ratesheet(ratesheet_id):
+def process_ratesheet(ratesheet_id, restart=False):
     """
     Celery task to process an uploaded rate sheet.
+
+    Queues the staged chain extract -> structure -> validate -> ingest,
+    each stage on its own queue. A sheet whose previous run failed part-way
+    resumes at the stage that failed; a completed sheet, or ``restart=True``,
+    is processed from scratch.
     """
     try:
         sheet = RateSheet.objects.get(id=ratesheet_id)
@@ -21,45 +36,196 @@ def process_ratesheet(ratesheet_id):
         logger.error(f"RateSheet {ratesheet_id} not found.")
         return
 
+    resume_at = pipeline.next_stage(sheet)
+    if restart or not sheet.pipeline.get('stages') or resume_at is None:
+        processor_name = _select_processor(sheet)
+        logger.info(f"Using {processor_name} for RateSheet {ratesheet_id}")
+        pipeline.reset(sheet, processor_name)
+        sheet.log = f"[{timezone.now()}] - Starting processing...\n"
+    else:
+        sheet.log += f"[{timezone.now()}] - Resuming processing at the {resume_at} stage...\n"
+
     sheet.status = RateSheet.STATUS_PROCESSING
-    sheet.log = f"[{timezone.now()}] - Starting processing...\n"
-    sheet.save(update_fields=['status', 'log'])
-    
+    sheet.save(update_fields=['status', 'log', 'pipeline'])
+
+    chain(
+        extract_ratesheet.si(ratesheet_id),
+        structure_ratesheet.si(ratesheet_id),
+        validate_ratesheet.si(ratesheet_id),
+        ingest_ratesheet.si(ratesheet_id),
+    ).apply_async()
+
+
+def _select_processor(sheet):
+    """Name of the processor for a sheet: lender-configured, else Gemini, else pdfplumber."""
+    lender_config = registry.get_lender_config(sheet.lender)
+    if lender_config:
+        return lender_config['processor']
+
+    # Check if Google API key is available for AI processing
+    google_api_key = getattr(settings, 'GOOGLE_API_KEY', None)
+    if google_api_key and sheet.file.name.lower().endswith('.pdf'):
+        return 'gemini_ai'
+
+    if not google_api_key:
+        logger.info(f"GOOGLE_API_KEY not configured, falling back to PdfPlumberProcessor for RateSheet {sheet.id}")
+    return 'pdfplumber'
+
+
+def _build_processor(sheet):
+    name = sheet.pipeline['processor']
+    if name == 'gemini_ai':
+        return GeminiAIProcessor(sheet)
+    if name == 'pdfplumber':
+        return PdfPlumberProcessor(sheet)
+    return registry.get_processor(name)(sheet)
+
+
+def _require(sheet, stage):
+    result = pipeline.stage_result(sheet, stage)
+    if result is None:
+        raise RateSheetProcessingError(
+            f"Output of the {stage} stage is missing; reprocess the sheet with restart=True"
+        )
+    return result
+
+
+def _run_stage(ratesheet_id, stage, compute, atomic=False):
+    """
+    Run one pipeline stage unless its output is already recorded.
+
+    ``compute(sheet)`` returns the stage output, which is stored by content
+    hash. On failure the sheet is marked failed and the exception re-raised,
+    which stops the chain; the recorded stages survive for a resume.
+    """
     try:
-        # Check if Google API key is available for AI processing
-        google_api_key = getattr(settings, 'GOOGLE_API_KEY', None)
-        use_gemini = google_api_key and sheet.file.name.lower().endswith('.pdf')
+        sheet = RateSheet.objects.select_related('lender').get(id=ratesheet_id)
+    except RateSheet.DoesNotExist:
+        logger.error(f"RateSheet {ratesheet_id} not found.")
+        return
 
-        if use_gemini:
-            logger.info(f"Using GeminiAIProcessor for RateSheet {ratesheet_id}")
-            processor = GeminiAIProcessor(sheet)
-            extracted_data = processor.process()
+    if pipeline.stage_result(sheet, stage) is not None:
+        logger.info(f"RateSheet {ratesheet_id}: {stage} stage already complete, skipping")
+        return
 
-            # Pass extracted data to ingestion service
-            ingestion_result = update_pricing_from_extraction(sheet.lender, extracted_data)
-            sheet.log += f"[{timezone.now()}] - Gemini AI extraction successful.\n"
-            sheet.log += f"[{timezone.now()}] - Ingestion result: {ingestion_result}\n"
+    def run():
+        pipeline.record_stage(sheet, stage, compute(sheet))
+        sheet.save(update_fields=['log', 'pipeline'])
 
+    started = time.perf_counter()
+    try:
+        if atomic:
+            with transaction.atomic():
+                run()
         else:
-            if not google_api_key:
-                logger.info(f"GOOGLE_API_KEY not configured, falling back to PdfPlumberProcessor for RateSheet {ratesheet_id}")
-            else:
-                logger.info(f"Using PdfPlumberProcessor for RateSheet {ratesheet_id}")
+            run()
+    except Exception as e:
+        logger.error(f"Error processing RateSheet {ratesheet_id} ({stage} stage): {e}")
+        sheet.status = RateSheet.STATUS_FAILED
+        sheet.log += f"\n[{timezone.now()}] - CRITICAL ERROR: {str(e)} ({stage} stage)\n{traceback.format_exc()}"
+        sheet.save(update_fields=['status', 'log'])
+        raise
+
+    logger.info(f"RateSheet {ratesheet_id}: {stage} stage finished in {time.perf_counter() - started:.2f}s")
 
-            processor = PdfPlumberProcessor(sheet)
-            extracted_data = processor.process()
 
-            # PdfPlumberProcessor already calls update_pricing_from_extraction internally
-            # but we log the result here for consistency
-            sheet.log += f"[{timezone.now()}] - PdfPlumber processing finished.\n"
+@shared_task(acks_late=True)
+def extract_ratesheet(ratesheet_id):
+    """CPU-bound stage: extract page text and tables with pdfplumber."""
+    def compute(sheet):
+        processor = _build_processor(sheet)
+        try:
+            pages = processor.extract_pages()
+        finally:
+            processor.flush_log()
+        sheet.log += f"[{timezone.now()}] - Extracted {len(pages)} pages.\n"
+        return {'pages': [asdict(page) for page in pages]}
+
+    _run_stage(ratesheet_id, 'extract', compute)
+
+
+@shared_task(acks_late=True)
+def structure_ratesheet(ratesheet_id):
+    """I/O-bound stage: turn the extracted pages into programs and adjustments."""
+    def compute(sheet):
+        extracted = _require(sheet, 'extract')
+        processor = _build_processor(sheet)
+        processor.pages = [PageContent(**page) for page in extracted['pages']]
+        data = processor.process()
+        sheet.log += f"[{timezone.now()}] - {sheet.pipeline['processor']} processing finished.\n"
+        return {'data': data, 'ingested': bool(processor.ingests_results)}
+
+    _run_stage(ratesheet_id, 'structure', compute)
+
+
+@shared_task(acks_late=True)
+def validate_ratesheet(ratesheet_id):
+    """Check the structured data and drop entries ingestion cannot store."""
+    def compute(sheet):
+        structured = _require(sheet, 'structure')
+        if structured['ingested']:
+            return structured
+
+        data, problems = pipeline.validate_extraction(structured['data'])
+        for problem in problems:
+            sheet.log += f"[{timezone.now()}] - WARNING: {problem}\n"
+        if isinstance(data, dict):
+            sheet.log += (
+                f"[{timezone.now()}] - Validated {len(data['programs'])} programs and "
+                f"{len(data['adjustments'])} adjustments ({len(problems)} dropped).\n"
+            )
+        return {'data': data, 'ingested': False}
+
+    _run_stage(ratesheet_id, 'validate', compute)
+
+
+@shared_task(acks_late=True)
+def ingest_ratesheet(ratesheet_id):
+    """Database stage: write the validated data to pricing and finish the sheet."""
+    def compute(sheet):
+        validated = _require(sheet, 'validate')
+        result = None
+        if not validated['ingested']:
+            result = update_pricing_from_extraction(sheet.lender, validated['data'])
+            sheet.log += f"[{timezone.now()}] - Ingestion result: {result}\n"
 
         sheet.status = RateSheet.STATUS_PROCESSED
         sheet.processed_at = timezone.now()
         sheet.log += f"[{timezone.now()}] - Processing finished successfully.\n"
         sheet.save()
-        
+
+        started_at = sheet.pipeline.get('started_at') or sheet.processed_at.isoformat()
+        transaction.on_commit(lambda: _enqueue_rematch(sheet.lender_id, started_at))
+        return {'result': str(result) if result is not None else None}
+
+    _run_stage(ratesheet_id, 'ingest', compute, atomic=True)
+
+
+def _enqueue_rematch(lender_id, since):
+    """Queue reverse matching for offerings changed by this rate sheet."""
+    from pricing.tasks import rematch_leads_for_lender
+
+    try:
+        rematch_leads_for_lender.delay(lender_id, since)
     except Exception as e:
-        logger.error(f"Error processing RateSheet {ratesheet_id}: {e}")
-        sheet.status = RateSheet.STATUS_FAILED
-        sheet.log += f"\n[{timezone.now()}] - CRITICAL ERROR: {str(e)}\n{traceback.format_exc()}"
-        sheet.save()
+        logger.warning(f"Could not queue lead re-match for lender {lender_id}: {e}")
+
+
+@shared_task
+def refresh_all_ratesheets():
+    """
+    Morning refresh: fetch every web-sourced sheet concurrently and queue
+    process_ratesheet for the ones that changed.
+    """
+    configs = RateSheetCSVReader(Path(settings.RATESHEET_SOURCES_CSV)).read_web_sources()
+    downloader = FleetDownloader(
+        Path(settings.RATESHEET_DOWNLOAD_DIR),
+        concurrency=settings.RATESHEET_FETCH_CONCURRENCY,
+        per_host=settings.RATESHEET_FETCH_PER_HOST,
+        timeout=settings.RATESHEET_FETCH_TIMEOUT,
+    )
+    started = time.perf_counter()
+    results = refresh_rate_sheets(configs, downloader)
+    summary = summarize(results, time.perf_counter() - started)
+    logger.info(f"Rate sheet refresh: {summary}")
+    return summary
@@ -1,11 +1,34 @@
+import tempfile
+import threading
+import time
 import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch
+from django.conf import settings
 from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from celery import current_app
-from pricing.models import Lender
-from ratesheets.tasks import process_ratesheet
-from ratesheets.models import RateSheet
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from pricing.models import Lender, LenderProgramOffering, RateAdjustment
+from ratesheets.ingestion.csv_reader import LenderRateSheetConfig
+from ratesheets.ingestion.fleet import FleetDownloader, match_lender, refresh_rate_sheets
+from ratesheets.services.chunking import chunk_pages, merge_extractions
+from ratesheets.services.extraction import PageContent, _page_ranges, extract_pages
+from ratesheets.services.grid_parser import (
+    GridParserConfig, parse_fico_band, parse_grid, parse_ltv_bands, parse_pages,
+)
+from ratesheets.services.ingestion import update_pricing_from_extraction
+from ratesheets.services.page_diff import diff_pages, page_fingerprint
+from ratesheets.services.pipeline import STAGES, content_key, stage_store, validate_extraction
+from ratesheets.services.processors.base import RateSheetProcessingError
+from ratesheets.services.processors.factory import registry
+from ratesheets.services.processors.gemini_ai import GeminiAIProcessor
+from ratesheets.services.processors.pdf_plumber import PdfPlumberProcessor
+from ratesheets.services.processors.table_grid import TableGridProcessor
+from ratesheets.tasks import extract_ratesheet, process_ratesheet
+from ratesheets.models import RateSheet, RateSheetEvent
 import os
 
 # --- Model Tests ---
@@ -64,7 +87,8 @@ class RateSheetProcessingTest(TestCase):
 
         self.assertEqual(self.ratesheet.status, RateSheet.STATUS_PROCESSED)
         self.assertIn("Processing finished successfully", self.ratesheet.log)
-        MockProcessor.assert_called_once_with(self.ratesheet)
+        # Constructed by the extract and structure stages
+        MockProcessor.assert_called_with(self.ratesheet)
         mock_instance.process.assert_called_once()
 
     @patch('ratesheets.tasks.GeminiAIProcessor')
@@ -78,10 +102,887 @@ class RateSheetProcessingTest(TestCase):
 
         self.assertEqual(self.ratesheet.status, RateSheet.STATUS_FAILED)
         self.assertIn("CRITICAL ERROR: Mocked processing failure", self.ratesheet.log)
-        MockProcessor.assert_called_once_with(self.ratesheet)
+        # Constructed by the extract and structure stages
+        MockProcessor.assert_called_with(self.ratesheet)
         mock_instance.process.assert_called_once()
     
     def tearDown(self):
         if self.ratesheet and self.ratesheet.file:
             if os.path.exists(self.ratesheet.file.path):
-                os.remove(self.ratesheet.file.path)
\ No newline at end of file
+                os.remove(self.ratesheet.file.path)
+
+# --- Ingestion Tests ---
+class AdjustmentIngestionTest(TestCase):
+
+    def setUp(self):
+        self.lender = Lender.objects.create(company_name="Ingestion Lender", include_states=["CA"])
+        self.program = {
+            'program_name': "Ingestion DSCR",
+            'program_type': 'dscr',
+            'base_rate': 7.0,
+        }
+
+    def _grid(self, points):
+        return [
+            {
+                'adjustment_type': RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV,
+                'row_min': fico, 'row_max': fico + 19,
+                'col_min': ltv, 'col_max': ltv + 5,
+                'adjustment_points': points,
+            }
+            for fico in range(640, 800, 20)
+            for ltv in range(50, 90, 5)
+        ]
+
+    def test_bulk_ingestion_uses_constant_queries(self):
+        adjustments = self._grid(0.25) + [
+            {'adjustment_type': RateAdjustment.ADJUSTMENT_TYPE_STATE, 'value_key': 'CA', 'adjustment_points': 0.125},
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            stats = update_pricing_from_extraction(
+                self.lender, {'programs': [self.program], 'adjustments': adjustments}
+            )
+
+        self.assertEqual(stats['adjustments_created'], 65)
+        self.assertGreater(stats['adjustment_rows_per_sec'], 0)
+        self.assertLess(len(ctx.captured_queries), 20)
+        offering = LenderProgramOffering.objects.get(lender=self.lender)
+        self.assertEqual(offering.adjustments.count(), 65)
+        self.assertEqual(offering.adjustments.get(value_key='CA').adjustment_points, 0.125)
+
+    def test_reingestion_diffs_existing_rows(self):
+        grid = self._grid(0.25)
+        update_pricing_from_extraction(self.lender, {'programs': [self.program], 'adjustments': grid})
+
+        changed = [dict(row) for row in grid[:-1]]
+        changed[0]['adjustment_points'] = 0.5
+        stats = update_pricing_from_extraction(
+            self.lender, {'programs': [self.program], 'adjustments': changed}
+        )
+
+        self.assertEqual(stats['adjustments_created'], 0)
+        self.assertEqual(stats['adjustments_updated'], 1)
+        self.assertEqual(stats['adjustments_unchanged'], 62)
+        self.assertEqual(stats['adjustments_deleted'], 1)
+        offering = LenderProgramOffering.objects.get(lender=self.lender)
+        self.assertEqual(offering.adjustments.count(), 63)
+        self.assertEqual(
+            offering.adjustments.get(row_min=640, col_min=50).adjustment_points, 0.5
+        )
+
+    def test_pruning_invalidates_lender_once(self):
+        grid = self._grid(0.25)
+        update_pricing_from_extraction(self.lender, {'programs': [self.program], 'adjustments': grid})
+
+        with patch('ratesheets.services.ingestion.quote_cache') as ingestion_cache, \
+                patch('pricing.signals.quote_cache') as signal_cache:
+            stats = update_pricing_from_extraction(
+                self.lender, {'programs': [self.program], 'adjustments': grid[:10]}
+            )
+
+        self.assertEqual(stats['adjustments_deleted'], 54)
+        ingestion_cache.invalidate_lender.assert_called_once_with(self.lender.pk)
+        signal_cache.invalidate_all.assert_not_called()
+
+    def test_price_ladder_is_stored_in_points(self):
+        program = dict(self.program, price_ladder=[[7.25, 100.375], [7.0, 99.5], ["n/a", 99.0]])
+
+        update_pricing_from_extraction(self.lender, {'programs': [program], 'adjustments': []})
+
+        offering = LenderProgramOffering.objects.get(lender=self.lender)
+        self.assertEqual(offering.price_ladder, [[7.0, -0.5], [7.25, 0.375]])
+
+    def test_adjustments_routed_to_their_program(self):
+        programs = [
+            dict(self.program, program_name="Acra DSCR"),
+            dict(self.program, program_name="Acra Platinum DSCR"),
+        ]
+        adjustments = (
+            [dict(row, program_name="Acra DSCR") for row in self._grid(0.25)]
+            + [dict(row, program_name="Acra Platinum DSCR") for row in self._grid(-0.25)]
+            + [
+                {'adjustment_type': RateAdjustment.ADJUSTMENT_TYPE_STATE, 'value_key': 'CA', 'adjustment_points': 0.125},
+                {'adjustment_type': RateAdjustment.ADJUSTMENT_TYPE_PURPOSE, 'value_key': 'purchase',
+                 'adjustment_points': 0.5, 'program_name': "Missing Program"},
+            ]
+        )
+
+        stats = update_pricing_from_extraction(
+            self.lender, {'programs': programs, 'adjustments': adjustments}
+        )
+
+        self.assertEqual(stats['adjustment_pairs'], 130)
+        self.assertEqual(stats['adjustment_pairs_unrouted'], 2 * 130)
+        self.assertEqual(stats['adjustments_shared'], 1)
+        self.assertEqual(stats['adjustments_unmatched'], 1)
+        self.assertIn("unknown program 'Missing Program'", stats['errors'][0])
+        for name, points in (("Acra DSCR", 0.25), ("Acra Platinum DSCR", -0.25)):
+            offering = LenderProgramOffering.objects.get(lender=self.lender, program_type__name=name)
+            grid = offering.adjustments.filter(adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV)
+            self.assertEqual(grid.count(), 64)
+            self.assertEqual(set(grid.values_list('adjustment_points', flat=True)), {points})
+            self.assertTrue(offering.adjustments.filter(value_key='CA').exists())
+            self.assertFalse(offering.adjustments.filter(value_key='purchase').exists())
+
+
+    def test_partial_extraction_merges_without_pruning(self):
+        platinum = {'program_name': "Ingestion Platinum", 'program_type': 'dscr', 'base_rate': 6.5}
+        update_pricing_from_extraction(self.lender, {
+            'programs': [self.program, platinum],
+            'adjustments': [
+                {'adjustment_type': RateAdjustment.ADJUSTMENT_TYPE_STATE, 'value_key': 'CA', 'adjustment_points': 0.125},
+                {'adjustment_type': RateAdjustment.ADJUSTMENT_TYPE_PURPOSE, 'value_key': 'purchase',
+                 'adjustment_points': 0.0, 'program_name': "Ingestion DSCR"},
+            ],
+        })
+
+        # Only the page holding the DSCR purpose grid changed.
+        stats = update_pricing_from_extraction(self.lender, {
+            'metadata': {'partial': True},
+            'programs': [],
+            'adjustments': [
+                {'adjustment_type': RateAdjustment.ADJUSTMENT_TYPE_PURPOSE, 'value_key': 'cash_out',
+                 'adjustment_points': -0.5, 'program_name': "Ingestion DSCR"},
+            ],
+        })
+
+        self.assertTrue(stats['partial'])
+        self.assertEqual(stats['programs_merged'], 1)
+        self.assertEqual(stats['adjustments_created'], 1)
+        self.assertEqual(stats['adjustments_deleted'], 0)
+        self.assertEqual(stats['errors'], [])
+        dscr = LenderProgramOffering.objects.get(lender=self.lender, program_type__name="Ingestion DSCR")
+        self.assertEqual(
+            set(dscr.adjustments.values_list('value_key', flat=True)), {'CA', 'purchase', 'cash_out'}
+        )
+        platinum_offering = LenderProgramOffering.objects.get(
+            lender=self.lender, program_type__name="Ingestion Platinum"
+        )
+        self.assertEqual(platinum_offering.adjustments.count(), 1)
+
+    def test_partial_extraction_prunes_cells_of_replaced_pages(self):
+        grid = [dict(row, source_pages=['grid-v1']) for row in self._grid(0.25)]
+        purpose = {'adjustment_type': RateAdjustment.ADJUSTMENT_TYPE_PURPOSE, 'value_key': 'purchase',
+                   'adjustment_points': 0.0, 'source_pages': ['purpose-v1']}
+        update_pricing_from_extraction(
+            self.lender, {'programs': [self.program], 'adjustments': grid + [purpose]}
+        )
+
+        # The grid page was re-extracted and lost its last row; the purpose
+        # page is unchanged and not part of the partial extraction.
+        regrid = [dict(row, source_pages=['grid-v2']) for row in self._grid(0.25) if row['row_min'] < 780]
+        stats = update_pricing_from_extraction(self.lender, {
+            'metadata': {'partial': True, 'page_fingerprints': ['grid-v2', 'purpose-v1']},
+            'programs': [],
+            'adjustments': regrid,
+        })
+
+        self.assertEqual(stats['adjustments_deleted'], 8)
+        self.assertEqual(stats['adjustments_unchanged'], 56)
+        offering = LenderProgramOffering.objects.get(lender=self.lender)
+        self.assertFalse(offering.adjustments.filter(row_min=780).exists())
+        self.assertEqual(offering.adjustments.get(value_key='purchase').source_pages, ['purpose-v1'])
+        grid_sources = offering.adjustments.filter(
+            adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV
+        ).values_list('source_pages', flat=True)
+        self.assertEqual({tuple(sources) for sources in grid_sources}, {('grid-v2',)})
+
+# --- Extraction Tests ---
+class PageExtractionTest(TestCase):
+    fixture_path = os.path.join(os.path.dirname(__file__), "fixtures", "acra.pdf")
+
+    def test_page_ranges_cover_every_page_once(self):
+        self.assertEqual(_page_ranges(10, 3), [(0, 4), (4, 7), (7, 10)])
+        self.assertEqual(_page_ranges(2, 4), [(0, 1), (1, 2)])
+
+    @override_settings(RATESHEET_PARALLEL_MIN_PAGES=1)
+    def test_parallel_extraction_matches_serial(self):
+        serial = extract_pages(self.fixture_path, workers=1)
+        parallel = extract_pages(self.fixture_path, workers=2)
+
+        self.assertEqual([p.number for p in parallel], [1])
+        self.assertEqual(parallel, serial)
+        self.assertIn("Dated:", serial[0].text)
+        self.assertTrue(serial[0].tables)
+
+    @override_settings(RATESHEET_PARALLEL_MIN_PAGES=1)
+    def test_daemonic_worker_falls_back_with_warning(self):
+        with patch('ratesheets.services.extraction.multiprocessing.current_process') as current, \
+                patch('ratesheets.services.extraction.ProcessPoolExecutor') as pool, \
+                self.assertLogs('ratesheets.services.extraction', 'WARNING') as logs:
+            current.return_value.daemon = True
+            pages = extract_pages(self.fixture_path, workers=2)
+
+        pool.assert_not_called()
+        self.assertEqual(pages, extract_pages(self.fixture_path, workers=1))
+        self.assertIn("daemonic", logs.output[0])
+
+
+# --- Extraction Cache Tests ---
+@override_settings(GOOGLE_API_KEY='fake-key', RATESHEET_EXTRACTION_CACHE_ENABLED=True)
+class ExtractionCacheTest(TestCase):
+    fixture_path = os.path.join(os.path.dirname(__file__), "fixtures", "acra.pdf")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lender = Lender.objects.create(company_name="Cache Test Lender")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(tmp.name, 'media'),
+            RATESHEET_EXTRACTION_CACHE_DIR=os.path.join(tmp.name, 'cache'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _ratesheet(self, name="sheet.pdf"):
+        with open(self.fixture_path, 'rb') as f:
+            upload = SimpleUploadedFile(name, f.read(), content_type="application/pdf")
+        return RateSheet.objects.create(lender=self.lender, name=name, file=upload)
+
+    def test_identical_file_reuses_extracted_pages(self):
+        first = PdfPlumberProcessor(self._ratesheet("monday.pdf"))
+        pages = first.extract_pages()
+        self.assertIn("Extraction cache miss: pdfplumber", first.rate_sheet.log)
+
+        second = PdfPlumberProcessor(self._ratesheet("tuesday.pdf"))
+        with patch('ratesheets.services.extraction.extract_pages') as mock_extract:
+            cached = second.extract_pages()
+
+        mock_extract.assert_not_called()
+        self.assertEqual(cached, pages)
+        self.assertIn("Extraction cache hit: pdfplumber", second.rate_sheet.log)
+
+    def test_ai_output_is_keyed_by_prompt_version(self):
+        extracted = {'metadata': {}, 'programs': [{'program_name': 'DSCR'}], 'adjustments': []}
+
+        with patch.object(GeminiAIProcessor, '_ai_extract_data', return_value=extracted) as mock_ai:
+            first = GeminiAIProcessor(self._ratesheet()).process()
+            second_processor = GeminiAIProcessor(self._ratesheet())
+            second = second_processor.process()
+            self.assertEqual(mock_ai.call_count, 1)
+            self.assertEqual(second['programs'], first['programs'])
+            self.assertIn("Extraction cache hit: gemini_ai", second_processor.rate_sheet.log)
+            self.assertIn("Extraction cache hit: pdfplumber", second_processor.rate_sheet.log)
+
+            with patch.object(GeminiAIProcessor, 'EXTRACTION_PROMPT', "A revised prompt"):
+                GeminiAIProcessor(self._ratesheet()).process()
+            self.assertEqual(mock_ai.call_count, 2)
+
+    @override_settings(RATESHEET_EXTRACTION_CACHE_ENABLED=False)
+    def test_disabled_cache_always_extracts(self):
+        for _ in range(2):
+            processor = PdfPlumberProcessor(self._ratesheet())
+            processor.extract_pages()
+            self.assertNotIn("Extraction cache", processor.rate_sheet.log)
+
+
+    def test_unchanged_resent_sheet_skips_ai_extraction(self):
+        extracted = {'metadata': {}, 'programs': [{'program_name': 'DSCR'}], 'adjustments': []}
+
+        with patch.object(GeminiAIProcessor, '_ai_extract_data', return_value=extracted) as mock_ai:
+            first = self._ratesheet("monday.pdf")
+            GeminiAIProcessor(first).process()
+            RateSheet.objects.filter(pk=first.pk).update(
+                status=RateSheet.STATUS_PROCESSED, processed_at=timezone.now()
+            )
+
+            second = self._ratesheet("tuesday.pdf")
+            data = GeminiAIProcessor(second).process()
+
+        self.assertEqual(mock_ai.call_count, 1)
+        self.assertTrue(data['metadata']['partial'])
+        self.assertEqual(data['metadata']['pages_changed'], [])
+        self.assertEqual(data['metadata']['previous_rate_sheet_id'], first.pk)
+        self.assertIn("skipping AI extraction", second.log)
+
+
+# --- Page Diff Tests ---
+class PageDiffTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lender = Lender.objects.create(company_name="Diff Test Lender")
+
+    def _sheet(self, pages=None, processor='gemini_ai', status=RateSheet.STATUS_PROCESSED):
+        fingerprints = {'processor': processor, 'pages': [page_fingerprint(p) for p in pages]} if pages else {}
+        return RateSheet.objects.create(
+            lender=self.lender, name="Sheet", file="rate_sheets/sheet.pdf", status=status,
+            processed_at=timezone.now(), page_fingerprints=fingerprints,
+        )
+
+    def _pages(self, *texts):
+        return [PageContent(number=i, text=text, tables=[[["FICO", "LTV"], ["700", "75"]]])
+                for i, text in enumerate(texts, start=1)]
+
+    def test_fingerprint_ignores_whitespace_but_not_tables(self):
+        page = PageContent(number=1, text="Rates  as of\n01/02", tables=[[["7.25"]]])
+        self.assertEqual(page_fingerprint(page), page_fingerprint(PageContent(2, "Rates as of 01/02", [[["7.25"]]])))
+        self.assertNotEqual(page_fingerprint(page), page_fingerprint(PageContent(1, page.text, [[["7.375"]]])))
+
+    def test_only_new_or_edited_pages_are_changed(self):
+        previous = self._sheet(self._pages("cover 01/02", "DSCR grid", "State LLPAs"))
+        current = self._sheet(status=RateSheet.STATUS_PROCESSING)
+
+        # Cover repriced, a page inserted before the unchanged grid pages.
+        diff = diff_pages(current, self._pages("cover 01/03", "New program", "DSCR grid", "State LLPAs"), 'gemini_ai')
+
+        self.assertEqual(diff.previous_id, previous.pk)
+        self.assertEqual(diff.changed, [1, 2])
+        self.assertTrue(diff.partial)
+
+    def test_no_comparable_previous_sheet_parses_everything(self):
+        self._sheet(self._pages("DSCR grid"), processor='pdfplumber')
+        self._sheet(self._pages("DSCR grid"), status=RateSheet.STATUS_FAILED)
+        current = self._sheet(status=RateSheet.STATUS_PROCESSING)
+
+        diff = diff_pages(current, self._pages("DSCR grid"), 'gemini_ai')
+
+        self.assertIsNone(diff.previous_id)
+        self.assertEqual(diff.changed, [1])
+        self.assertFalse(diff.partial)
+
+
+# --- AI Chunking Tests ---
+class ChunkingTest(TestCase):
+
+    def test_pages_are_packed_without_truncation(self):
+        pages = [
+            PageContent(number=1, text="a" * 40),
+            PageContent(number=2, text="b" * 40),
+            PageContent(number=3, text="c" * 150, tables=[[["FICO", "LTV"]], [["700", "-0.5"]]]),
+        ]
+
+        chunks = chunk_pages(pages, max_chars=140)
+
+        self.assertEqual([chunk.pages for chunk in chunks], [[1, 2], [3], [3]])
+        self.assertLessEqual(len(chunks[0]), 140)
+        self.assertGreater(len(chunks[1]), 140)  # an oversized section is sent whole
+        content = "\n".join(chunk.content for chunk in chunks)
+        self.assertIn("c" * 150, content)
+        self.assertIn("=== Page 3 Table 2 ===\n700 | -0.5", content)
+
+    def test_chunks_carry_the_heading_they_continue_from(self):
+        pages = [
+            PageContent(number=1, text="DSCR Select\nInvestor pricing\n" + "a" * 60),
+            PageContent(number=2, text="", tables=[[["FICO", "LTV"]] * 10]),
+            PageContent(number=3, text="Platinum\n" + "c" * 60),
+        ]
+
+        chunks = chunk_pages(pages, max_chars=100)
+
+        self.assertEqual([chunk.pages for chunk in chunks], [[1], [2], [3]])
+        self.assertEqual(chunks[0].context, '')
+        self.assertEqual(chunks[1].context, 'page 1, headed "DSCR Select / Investor pricing / ' + "a" * 60 + '"')
+        # Page 2 has no text of its own, so page 3 still continues from page 1
+        self.assertEqual(chunks[2].context, chunks[1].context)
+
+    def test_merge_deduplicates_programs_and_adjustments(self):
+        grid = {'adjustment_type': 'fico_ltv', 'row_min': 700, 'row_max': 719,
+                'col_min': 70, 'col_max': 75, 'adjustment_points': -0.5}
+        merged = merge_extractions([
+            {
+                'metadata': {'effective_date': '2026-01-02', 'lock_periods': [30]},
+                'programs': [{'program_name': "DSCR 30yr", 'base_rate': 7.25, 'min_fico': None}],
+                'adjustments': [dict(grid, program_name="DSCR 30yr")],
+            },
+            {
+                'metadata': {'effective_date': '', 'lock_periods': [30, 45]},
+                'programs': [{'program_name': "dscr  30YR", 'min_fico': 660}],
+                'adjustments': [
+                    dict(grid, program_name="dscr  30YR", row_min='700'),
+                    dict(grid, program_name="dscr  30YR", row_min=720, row_max=739, adjustment_points=-0.25),
+                ],
+            },
+        ])
+
+        self.assertEqual(merged['metadata']['effective_date'], '2026-01-02')
+        self.assertEqual(merged['metadata']['lock_periods'], [30, 45])
+        self.assertEqual(merged['programs'], [{'program_name': "DSCR 30yr", 'base_rate': 7.25, 'min_fico': 660}])
+        self.assertEqual(len(merged['adjustments']), 2)
+        self.assertEqual({a['program_name'] for a in merged['adjustments']}, {"DSCR 30yr"})
+        self.assertEqual(merged['metadata']['merge']['duplicate_programs'], 1)
+        self.assertEqual(merged['metadata']['merge']['duplicate_adjustments'], 1)
+        self.assertEqual(merged['metadata']['merge']['conflicts'], 0)
+
+
+@override_settings(
+    GOOGLE_API_KEY='fake-key',
+    RATESHEET_EXTRACTION_CACHE_ENABLED=False,
+    RATESHEET_AI_CHUNK_CHARS=500,
+    RATESHEET_AI_CONCURRENCY=2,
+    RATESHEET_AI_RETRY_BACKOFF=0,
+)
+class ChunkedAIExtractionTest(TestCase):
+    fixture_path = os.path.join(os.path.dirname(__file__), "fixtures", "acra.pdf")
+
+    def setUp(self):
+        lender = Lender.objects.create(company_name="Chunk Test Lender")
+        with open(self.fixture_path, 'rb') as f:
+            upload = SimpleUploadedFile("chunked.pdf", f.read(), content_type="application/pdf")
+        self.ratesheet = RateSheet.objects.create(lender=lender, name="Chunked", file=upload)
+        self.addCleanup(self.ratesheet.file.delete, save=False)
+
+    def test_chunks_are_extracted_with_retries_and_merged(self):
+        calls = []
+
+        def extract(content):
+            calls.append(content)
+            if len(calls) == 1:
+                raise RateSheetProcessingError("503 overloaded")
+            return {'programs': [{'program_name': "Acra DSCR"}], 'adjustments': []}
+
+        with patch.object(GeminiAIProcessor, '_ai_extract_data', side_effect=extract):
+            data = GeminiAIProcessor(self.ratesheet).process()
+
+        throughput = data['metadata']['throughput']
+        self.assertGreater(throughput['chunks'], 1)
+        self.assertEqual(len(calls), throughput['chunks'] + 1)
+        self.assertEqual(throughput['retries'], 1)
+        self.assertGreater(throughput['pages_per_minute'], 0)
+        self.assertEqual(data['programs'], [{'program_name': "Acra DSCR"}])
+        self.assertIn("pages/minute", self.ratesheet.log)
+        # Every chunk but the first is told which page heading it continues from
+        continued = [call for call in calls if "continues a longer rate sheet from page" in call]
+        self.assertTrue(continued)
+        self.assertLess(len(continued), len(calls))
+
+    @override_settings(RATESHEET_AI_MAX_RETRIES=1)
+    def test_chunk_failing_every_retry_fails_the_sheet(self):
+        with patch.object(
+            GeminiAIProcessor, '_ai_extract_data', side_effect=RateSheetProcessingError("quota")
+        ):
+            with self.assertRaisesRegex(RateSheetProcessingError, "failed after 2 attempts"):
+                GeminiAIProcessor(self.ratesheet).process()
+
+
+# --- Table Grid Tests ---
+class GridParserTest(TestCase):
+    config = GridParserConfig(program_name="Acra Non Prime")
+    fixture_path = os.path.join(os.path.dirname(__file__), "fixtures", "acra.pdf")
+
+    def test_fico_band_labels(self):
+        self.assertEqual(parse_fico_band("760 - 779", self.config), (760, 779))
+        self.assertEqual(parse_fico_band("≥ 780", self.config), (780, 850))
+        self.assertEqual(parse_fico_band("740+", self.config), (740, 850))
+        self.assertEqual(parse_fico_band("< 620", self.config), (300, 619))
+        self.assertIsNone(parse_fico_band("Cash-Out Refinance", self.config))
+        self.assertIsNone(parse_fico_band("6.250", self.config))
+
+    def test_ltv_bands_from_merged_header_cells(self):
+        header = "55.01- 60.01-\n≤ FICO & LTV 50.00% 50.01- 55.00%\n60.00% 65.00%"
+        self.assertEqual(
+            parse_ltv_bands(header),
+            [(0.0, 50.0), (50.01, 55.0), (55.01, 60.0), (60.01, 65.0)],
+        )
+        self.assertEqual(parse_ltv_bands("50.00% 60.00% 70.00%"), [])
+
+    def test_acra_fico_ltv_matrix(self):
+        tables = [table for page in extract_pages(self.fixture_path, workers=1) for table in page.tables]
+        grids = [parse_grid(table, self.config) for table in tables]
+
+        self.assertEqual([len(grid) for grid in grids], [0, 0, 78, 0, 0, 0, 0, 0])
+        cells = {(a['row_min'], a['col_min']): a for a in grids[2]}
+        self.assertEqual(cells[(780, 0.0)]['adjustment_points'], 1.0)
+        self.assertEqual(cells[(780, 0.0)]['row_max'], 850)
+        self.assertEqual(cells[(620, 60.01)]['adjustment_points'], -7.5)
+        self.assertEqual(cells[(620, 60.01)]['col_max'], 65.0)
+        self.assertNotIn((600, 75.01), cells)  # N/A: not eligible
+        self.assertEqual({a['program_name'] for a in grids[2]}, {"Acra Non Prime"})
+
+    def test_acra_rate_table_becomes_price_ladder(self):
+        data = parse_pages(extract_pages(self.fixture_path, workers=1), self.config)
+
+        self.assertEqual(data['metadata']['rate_tables'][0]['program'], "Acra Non Prime")
+        ladder = data['programs'][0]['price_ladder']
+        self.assertEqual(ladder[:2], [[6.25, 98.907], [6.375, 99.595]])
+        self.assertEqual(ladder, sorted(ladder))
+
+    def test_grids_are_assigned_to_their_titled_program(self):
+        def grid(corner):
+            return [
+                [corner, "≤ 50.00%", "50.01- 55.00%"],
+                ["≥ 780", "1.0", "0.75"],
+                ["760 - 779", "0.5", "0.25"],
+                ["740 - 759", "0.25", "0"],
+            ]
+
+        config = GridParserConfig(programs={"DSCR": "Acra DSCR", "Non Prime": "Acra Non Prime"})
+        pages = [
+            PageContent(
+                number=1,
+                text="DSCR Investor\nFICO & LTV\n≥ 780 1.0\nNon Prime Program\nFICO & LTV\n≥ 780 1.0",
+                tables=[grid("FICO & LTV"), grid("FICO & LTV")],
+            ),
+            PageContent(number=2, text="Adjustments", tables=[grid("Non Prime FICO/LTV")]),
+            PageContent(number=3, text="Untitled", tables=[grid("FICO")]),
+        ]
+
+        data = parse_pages(pages, config)
+
+        self.assertEqual(
+            [(g['page'], g['table'], g['program']) for g in data['metadata']['grids']],
+            [(1, 1, "Acra DSCR"), (1, 2, "Acra Non Prime"), (2, 1, "Acra Non Prime")],
+        )
+        self.assertEqual([p['program_name'] for p in data['programs']], ["Acra DSCR", "Acra Non Prime"])
+        self.assertEqual(
+            {(a['page'], a['program_name']) for a in data['adjustments']},
+            {(1, "Acra DSCR"), (1, "Acra Non Prime"), (2, "Acra Non Prime")},
+        )
+
+
+@override_settings(GOOGLE_API_KEY='fake-key')
+class TableGridProcessorTest(TestCase):
+    fixture_path = os.path.join(os.path.dirname(__file__), "fixtures", "acra.pdf")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(tmp.name, 'media'),
+            RATESHEET_EXTRACTION_CACHE_DIR=os.path.join(tmp.name, 'cache'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        current_app.conf.update(task_always_eager=True)
+
+        lender_configs = patch.dict(registry._lender_configs)
+        lender_configs.start()
+        self.addCleanup(lender_configs.stop)
+
+        self.lender = Lender.objects.create(company_name="Acra Lending")
+        registry.configure_lender("Acra Lending", 'table_grid', program_name="Acra Non Prime")
+
+    def _ratesheet(self, content):
+        upload = SimpleUploadedFile("sheet.pdf", content, content_type="application/pdf")
+        return RateSheet.objects.create(lender=self.lender, name="Sheet", file=upload)
+
+    def test_configured_lender_is_priced_without_the_llm(self):
+        with open(self.fixture_path, 'rb') as f:
+            sheet = self._ratesheet(f.read())
+
+        with patch.object(GeminiAIProcessor, '_ai_extract_data') as mock_ai:
+            process_ratesheet(sheet.id)
+
+        mock_ai.assert_not_called()
+        sheet.refresh_from_db()
+        self.assertEqual(sheet.status, RateSheet.STATUS_PROCESSED)
+        self.assertIn("Parsed 1 grids (78 cells)", sheet.log)
+        offering = LenderProgramOffering.objects.get(lender=self.lender, program_type__name="Acra Non Prime")
+        self.assertEqual(
+            offering.adjustments.filter(adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV).count(), 78
+        )
+
+    def test_sheet_without_grid_falls_back_to_ai(self):
+        sheet = self._ratesheet(b"%PDF-1.4")
+        pages = [PageContent(number=1, text="Bank statement program: call for pricing")]
+        extracted = {'programs': [{'program_name': "Acra Bank Statement"}], 'adjustments': []}
+
+        with patch.object(TableGridProcessor, 'extract_pages', return_value=pages), \
+                patch.object(GeminiAIProcessor, 'extract_pages', return_value=pages), \
+                patch.object(GeminiAIProcessor, '_ai_extract_data', return_value=extracted) as mock_ai:
+            data = registry.get_processor_for_lender(sheet)(sheet).process()
+
+        mock_ai.assert_called_once()
+        self.assertEqual(data['metadata']['extraction_method'], 'gemini_ai')
+        self.assertEqual(data['programs'], extracted['programs'])
+        self.assertIn("falling back to AI extraction", sheet.log)
+        sheet.refresh_from_db()
+        self.assertEqual(sheet.page_fingerprints['processor'], 'gemini_ai')
+
+    def test_ai_fallback_extracts_the_whole_sheet(self):
+        pages = [PageContent(number=1, text="Bank statement program"), PageContent(number=2, text="Call us")]
+        previous = self._ratesheet(b"%PDF-1.4")
+        previous.status = RateSheet.STATUS_PROCESSED
+        previous.processed_at = timezone.now()
+        previous.page_fingerprints = {'processor': 'gemini_ai', 'pages': [page_fingerprint(pages[0])]}
+        previous.save()
+        sheet = self._ratesheet(b"%PDF-1.4")
+
+        with patch.object(TableGridProcessor, 'extract_pages', return_value=pages), \
+                patch.object(GeminiAIProcessor, '_ai_extract_data', return_value={}) as mock_ai:
+            data = registry.get_processor_for_lender(sheet)(sheet).process()
+
+        self.assertIn("Bank statement program", mock_ai.call_args.args[0])
+        self.assertFalse(data['metadata']['partial'])
+        self.assertEqual(data['metadata']['pages_changed'], [1, 2])
+
+
+# --- Processing Log Tests ---
+@override_settings(RATESHEET_LOG_FLUSH_SECONDS=3600, RATESHEET_LOG_FLUSH_EVENTS=50)
+class ProcessingLogTest(TestCase):
+
+    def setUp(self):
+        lender = Lender.objects.create(company_name="Log Test Lender")
+        self.sheet = RateSheet.objects.create(lender=lender, name="Log Sheet", file="rate_sheets/log.pdf")
+        self.processor = PdfPlumberProcessor(self.sheet)
+
+    def test_log_lines_are_written_in_batches(self):
+        with CaptureQueriesContext(connection) as ctx:
+            for i in range(120):
+                self.processor.log(f"Table {i} Row 0")
+            self.processor.flush_log()
+
+        # 3 flushes (50, 50, 20 events), each one INSERT plus one UPDATE
+        self.assertEqual(len(ctx.captured_queries), 6)
+        self.assertEqual(self.sheet.events.count(), 120)
+        self.sheet.refresh_from_db()
+        self.assertEqual(self.sheet.log.count("\n"), 120)
+
+    def test_stage_boundary_flushes_and_tags_events(self):
+        self.processor.begin_stage('extract')
+        self.processor.log("Extracted 3 pages")
+        self.assertFalse(self.sheet.events.exists())
+
+        self.processor.begin_stage('parse')
+        self.processor.log("Parse failed", level=RateSheetEvent.LEVEL_ERROR)
+        self.processor.flush_log()
+
+        self.assertEqual(
+            list(self.sheet.events.values_list('stage', 'level', 'message')),
+            [('extract', 'info', "Extracted 3 pages"), ('parse', 'error', "Parse failed")],
+        )
+
+
+# --- Fleet Download Tests ---
+class _RateSheetHost(BaseHTTPRequestHandler):
+    """Local stand-in for lender websites, with ETag support."""
+    sheets = {}
+    requests = []
+    delay = 0.0
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests.append((self.path, self.headers.get('If-None-Match')))
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        try:
+            time.sleep(cls.delay)
+            body = cls.sheets.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            etag = f'"{uuid.uuid5(uuid.NAMESPACE_OID, body.decode())}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Type', 'application/pdf')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class FleetDownloadTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _RateSheetHost)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        settings_override = override_settings(MEDIA_ROOT=os.path.join(tmp.name, 'media'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        _RateSheetHost.sheets = {'/acra-dscr.pdf': b"%PDF dscr v1", '/acra-nonprime.pdf': b"%PDF np v1"}
+        _RateSheetHost.requests = []
+        _RateSheetHost.delay = 0.0
+        _RateSheetHost.max_active = 0
+        self.downloader = FleetDownloader(os.path.join(tmp.name, 'downloads'), concurrency=8, per_host=2)
+
+    def _configs(self, *paths):
+        return [
+            LenderRateSheetConfig(lender_name=f"Acra {path.strip('/').split('.')[0]}", url=self.base_url + path,
+                                  program_type='NonQM')
+            for path in paths
+        ]
+
+    def test_conditional_requests_only_report_changed_sheets(self):
+        configs = self._configs('/acra-dscr.pdf', '/acra-nonprime.pdf', '/missing.pdf')
+
+        first = self.downloader.fetch_all(configs)
+        self.assertEqual([r.status for r in first], ['changed', 'changed', 'failed'])
+        with open(first[0].path, 'rb') as f:
+            self.assertEqual(f.read(), b"%PDF dscr v1")
+
+        _RateSheetHost.sheets['/acra-nonprime.pdf'] = b"%PDF np v2"
+        second = self.downloader.fetch_all(configs)
+
+        self.assertEqual([r.status for r in second], ['unchanged', 'changed', 'failed'])
+        self.assertEqual(second[0].http_status, 304)
+        self.assertEqual(second[0].bytes, 0)
+        self.assertIsNotNone(dict(_RateSheetHost.requests[-3:])['/acra-dscr.pdf'])
+        with open(second[1].path, 'rb') as f:
+            self.assertEqual(f.read(), b"%PDF np v2")
+
+    def test_fetches_run_concurrently_within_the_per_host_limit(self):
+        paths = [f'/sheet-{i}.pdf' for i in range(6)]
+        _RateSheetHost.sheets = {path: path.encode() for path in paths}
+        _RateSheetHost.delay = 0.2
+
+        started = time.perf_counter()
+        results = self.downloader.fetch_all(self._configs(*paths))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual({r.status for r in results}, {'changed'})
+        self.assertEqual(_RateSheetHost.max_active, 2)
+        self.assertLess(elapsed, 6 * 0.2)
+
+    def test_refresh_creates_and_queues_changed_sheets(self):
+        acra = Lender.objects.create(company_name="Acra")
+        configs = self._configs('/acra-dscr.pdf', '/acra-nonprime.pdf')
+        configs.append(LenderRateSheetConfig("Unknown Lender", self.base_url + '/acra-dscr.pdf', 'NonQM'))
+
+        with patch('ratesheets.tasks.process_ratesheet.delay') as mock_delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            results = refresh_rate_sheets(configs, self.downloader)
+
+        sheets = RateSheet.objects.filter(lender=acra)
+        self.assertEqual(sheets.count(), 2)
+        self.assertEqual(sorted(c.args[0] for c in mock_delay.call_args_list), sorted(s.id for s in sheets))
+        self.assertIsNone(results[2].rate_sheet_id)
+
+        with patch('ratesheets.tasks.process_ratesheet.delay') as mock_delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            refresh_rate_sheets(configs, self.downloader)
+        mock_delay.assert_not_called()
+
+    def test_match_lender_prefers_exact_then_longest_prefix(self):
+        acra, acra_dscr = Lender(company_name="Acra"), Lender(company_name="Acra DSCR")
+        self.assertIs(match_lender("acra dscr", [acra, acra_dscr]), acra_dscr)
+        self.assertIs(match_lender("Acra DSCR Platinum", [acra, acra_dscr]), acra_dscr)
+        self.assertIs(match_lender("Acra Non Prime", [acra, acra_dscr]), acra)
+        self.assertIsNone(match_lender("Acrabank", [acra]))
+
+
+# --- Staged Pipeline Tests ---
+@override_settings(GOOGLE_API_KEY='fake-key')
+class StagedPipelineTest(TestCase):
+    fixture_path = os.path.join(os.path.dirname(__file__), "fixtures", "acra.pdf")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(tmp.name, 'media'),
+            RATESHEET_EXTRACTION_CACHE_DIR=os.path.join(tmp.name, 'cache'),
+            RATESHEET_STAGE_DIR=os.path.join(tmp.name, 'stages'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        current_app.conf.update(task_always_eager=True)
+
+        lender_configs = patch.dict(registry._lender_configs)
+        lender_configs.start()
+        self.addCleanup(lender_configs.stop)
+
+        self.lender = Lender.objects.create(company_name="Acra Lending")
+        registry.configure_lender("Acra Lending", 'table_grid', program_name="Acra Non Prime")
+        with open(self.fixture_path, 'rb') as f:
+            upload = SimpleUploadedFile("sheet.pdf", f.read(), content_type="application/pdf")
+        self.sheet = RateSheet.objects.create(lender=self.lender, name="Sheet", file=upload)
+
+    def _adjustment_count(self):
+        offering = LenderProgramOffering.objects.get(lender=self.lender, program_type__name="Acra Non Prime")
+        return offering.adjustments.count()
+
+    def test_stage_outputs_are_stored_by_content_hash(self):
+        process_ratesheet.delay(self.sheet.id)
+
+        self.sheet.refresh_from_db()
+        self.assertEqual(self.sheet.status, RateSheet.STATUS_PROCESSED)
+        self.assertEqual(self.sheet.pipeline['processor'], 'table_grid')
+        stages = self.sheet.pipeline['stages']
+        self.assertEqual(list(stages), list(STAGES))
+        for key in stages.values():
+            self.assertEqual(content_key(stage_store().get(key)), key)
+        self.assertEqual(self._adjustment_count(), 78)
+
+    def test_failed_ingestion_resumes_without_redoing_extraction(self):
+        with patch('ratesheets.tasks.update_pricing_from_extraction', side_effect=Exception("Database unavailable")):
+            process_ratesheet.delay(self.sheet.id)
+
+        self.sheet.refresh_from_db()
+        self.assertEqual(self.sheet.status, RateSheet.STATUS_FAILED)
+        self.assertIn("CRITICAL ERROR: Database unavailable (ingest stage)", self.sheet.log)
+        self.assertEqual(list(self.sheet.pipeline['stages']), ['extract', 'structure', 'validate'])
+
+        with patch.object(TableGridProcessor, 'extract_pages') as mock_extract, \
+                patch.object(TableGridProcessor, 'process') as mock_process:
+            process_ratesheet.delay(self.sheet.id)
+
+        mock_extract.assert_not_called()
+        mock_process.assert_not_called()
+        self.sheet.refresh_from_db()
+        self.assertEqual(self.sheet.status, RateSheet.STATUS_PROCESSED)
+        self.assertIn("Resuming processing at the ingest stage", self.sheet.log)
+        self.assertEqual(self._adjustment_count(), 78)
+
+    def test_completed_sheet_is_processed_from_scratch(self):
+        process_ratesheet.delay(self.sheet.id)
+
+        with patch.object(TableGridProcessor, 'process', autospec=True,
+                          side_effect=lambda processor: {'programs': [], 'adjustments': []}) as mock_process:
+            process_ratesheet.delay(self.sheet.id)
+
+        mock_process.assert_called_once()
+        self.sheet.refresh_from_db()
+        self.assertTrue(self.sheet.log.endswith("Processing finished successfully.\n"))
+        self.assertNotIn("Resuming", self.sheet.log)
+
+    def test_redelivered_stage_is_a_no_op(self):
+        process_ratesheet.delay(self.sheet.id)
+
+        with patch.object(TableGridProcessor, 'extract_pages') as mock_extract:
+            extract_ratesheet(self.sheet.id)
+
+        mock_extract.assert_not_called()
+
+    def test_stages_are_routed_to_their_own_queues(self):
+        routes = settings.CELERY_TASK_ROUTES
+        for stage in STAGES:
+            self.assertEqual(routes[f'ratesheets.tasks.{stage}_ratesheet']['queue'], settings.RATESHEET_QUEUES[stage])
+        self.assertEqual(len(set(settings.RATESHEET_QUEUES.values())), len(STAGES))
+
+    def test_validation_drops_entries_ingestion_cannot_store(self):
+        data, problems = validate_extraction({
+            'programs': [{'program_name': "DSCR"}, {'program_type': 'dscr'}],
+            'adjustments': [
+                {'adjustment_type': 'purpose', 'value_key': 'purchase', 'adjustment_points': '0.25'},
+                {'adjustment_type': 'state', 'value_key': 'CA', 'adjustment_points': 'call'},
+                {'value_key': 'investment', 'adjustment_points': -0.5},
+            ],
+        })
+
+        self.assertEqual(data['metadata'], {})
+        self.assertEqual([p['program_name'] for p in data['programs']], ["DSCR"])
+        self.assertEqual([a['value_key'] for a in data['adjustments']], ['purchase'])
+        self.assertEqual(len(problems), 3)
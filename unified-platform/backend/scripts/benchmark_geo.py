@@ -0,0 +1,103 @@
+"""
+Microbenchmark the great-circle distance kernels in ``cms.services.geo``.
+
+For each point count (1k/10k/100k by default) this times, per query:
+the scalar ``haversine`` loop the proximity services used to run, the
+batched ``distances_from`` kernel, and a k=5 KD-tree query; plus one
+``distance_matrix`` pass from a small set of origins. No database access.
+
+Usage:
+    python scripts/benchmark_geo.py --sizes 1000 10000 100000 \
+        --output benchmark-results/geo.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import django
+
+# Setup Django Environment
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.dev')
+django.setup()
+
+from decimal import Decimal
+
+from cms.services.geo import CoordinateArray, distance_matrix, distances_from, haversine
+from cms.services.spatial_index import KDTree
+
+
+def random_rows(rng, count):
+    """(id, Decimal latitude, Decimal longitude) rows across the continental US."""
+    return [
+        (i, Decimal(f"{rng.uniform(25, 49):.6f}"), Decimal(f"{rng.uniform(-124, -67):.6f}"))
+        for i in range(count)
+    ]
+
+
+def timed(fn, repeat):
+    """Best-of-``repeat`` wall time of ``fn()`` in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def bench_size(rng, count, repeat, origins):
+    rows = random_rows(rng, count)
+    lat, lon = 34.05, -118.24
+
+    build_ms = timed(lambda: CoordinateArray.from_rows(rows), 1)
+    coords = CoordinateArray.from_rows(rows)
+    tree = KDTree(coords.ids, coords.points())
+    origin_coords = CoordinateArray.from_rows(random_rows(rng, origins))
+
+    return {
+        'points': count,
+        'build_coords_ms': round(build_ms, 3),
+        'scalar_one_to_many_ms': round(
+            timed(lambda: [haversine(lat, lon, r_lat, r_lon) for _, r_lat, r_lon in rows], repeat), 3
+        ),
+        'batched_one_to_many_ms': round(timed(lambda: distances_from(lat, lon, coords), repeat), 3),
+        'kdtree_k5_ms': round(timed(lambda: tree.nearest(lat, lon, k=5), repeat), 4),
+        f'matrix_{origins}_to_many_ms': round(timed(lambda: distance_matrix(origin_coords, coords), 1), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--origins', type=int, default=10, help='Origins in the many-to-many pass')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the JSON report to this path')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print("--- Starting Geo Kernel Benchmark ---")
+    results = []
+    for count in args.sizes:
+        result = bench_size(rng, count, args.repeat, args.origins)
+        results.append(result)
+        print(
+            f"{count:>7d} points: scalar {result['scalar_one_to_many_ms']:9.3f}ms  "
+            f"batched {result['batched_one_to_many_ms']:9.3f}ms  "
+            f"kd-tree k=5 {result['kdtree_k5_ms']:7.4f}ms  "
+            f"matrix {args.origins}x{count} {result[f'matrix_{args.origins}_to_many_ms']:9.3f}ms"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'seed': args.seed, 'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+"""
+Benchmark the quote and qualify paths against a synthetic lender catalog.
+
+Generates N lenders, M ProgramTypes, K LenderProgramOfferings with dense
+FICO x LTV RateAdjustment grids (plus matching legacy LoanPrograms for
+QualifyView), replays a mixed workload and writes a JSON report with
+p50/p95/p99 latency, queries per request and allocations per operation.
+Everything runs inside a transaction that is rolled back at the end.
+
+Usage:
+    python scripts/benchmark_pricing.py --offerings 2000 --requests 2000 \
+        --output benchmark-results/pricing.json
+
+Point DATABASE_URL at a migrated scratch database to keep dev data untouched.
+Compare two reports with ``--compare previous.json``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+import django
+
+# Setup Django Environment
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.dev')
+django.setup()
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from api.views import QualifyView
+from loans import choices as loan_choices
+from loans.models import Lender as LoanLender, LoanProgram
+from loans.services.eligibility import program_eligibility
+from pricing import choices
+from pricing.models import (
+    Lender,
+    LenderProgramOffering,
+    ProgramType,
+    RateAdjustment,
+)
+from pricing.services.engine import pricing_engine
+from pricing.services.matching import LoanMatchingService, get_quals_for_loan_program
+from pricing.services.quote_cache import quote_cache
+
+STATES = ['CA', 'TX', 'FL', 'NY', 'WA', 'AZ', 'CO', 'GA', 'IL', 'NC']
+PROPERTY_TYPES = [choices.PROPERTY_TYPE_RESIDENTIAL, choices.PROPERTY_TYPE_COMMERCIAL]
+ENTITY_TYPES = [
+    choices.BORROWING_ENTITY_TYPE_INDIVIDUAL,
+    choices.BORROWING_ENTITY_TYPE_LLC,
+    choices.BORROWING_ENTITY_TYPE_TRUST,
+]
+PURPOSES = [choices.LOAN_PURPOSE_PURCHASE, choices.LOAN_PURPOSE_REFINANCE]
+OCCUPANCY = [
+    choices.OCCUPANCY_OWNER_OCCUPIED,
+    choices.OCCUPANCY_SECOND_HOME,
+    choices.OCCUPANCY_INVESTMENT,
+]
+FICO_BANDS = [(620, 659), (660, 679), (680, 699), (700, 719), (720, 739), (740, 759), (760, 850)]
+LTV_BANDS = [(0, 50), (50.01, 60), (60.01, 65), (65.01, 70), (70.01, 75), (75.01, 80), (80.01, 85), (85.01, 90)]
+
+
+def _sample(rng, values):
+    return rng.sample(values, rng.randint(1, len(values)))
+
+
+def build_catalog(rng, lenders, program_types, offerings, grid_density):
+    """Create the synthetic catalog with bulk inserts; returns offering ids."""
+    lender_objs = Lender.objects.bulk_create([
+        Lender(company_name=f"Bench Lender {i}", include_states=_sample(rng, STATES))
+        for i in range(lenders)
+    ])
+    type_objs = ProgramType.objects.bulk_create([
+        ProgramType(
+            name=f"Bench Program {i}",
+            slug=f"bench-program-{i}",
+            category='non_qm',
+            property_types=_sample(rng, PROPERTY_TYPES),
+            entity_types=_sample(rng, ENTITY_TYPES),
+            purposes=_sample(rng, PURPOSES),
+            occupancy=_sample(rng, OCCUPANCY),
+        )
+        for i in range(program_types)
+    ])
+
+    pairs = [(lo, to) for lo in lender_objs for to in type_objs]
+    rng.shuffle(pairs)
+    offering_objs = []
+    for lender, program_type in pairs[:offerings]:
+        min_rate = round(rng.uniform(5.5, 9.0), 3)
+        offering_objs.append(LenderProgramOffering(
+            lender=lender,
+            program_type=program_type,
+            min_rate=min_rate,
+            max_rate=min_rate + rng.choice([1.0, 1.5, 2.0]),
+            min_points=0,
+            max_points=rng.choice([1.0, 2.0, 3.0]),
+            min_fico=rng.choice([600, 620, 660, 680, 700]),
+            max_ltv=rng.choice([65.0, 70.0, 75.0, 80.0, 85.0, 90.0]),
+            min_loan=Decimal(rng.choice([75000, 100000, 150000])),
+            max_loan=Decimal(rng.choice([1000000, 2000000, 3000000])),
+        ))
+    offering_objs = LenderProgramOffering.objects.bulk_create(offering_objs)
+
+    adjustments = []
+    for offering in offering_objs:
+        for fico_min, fico_max in FICO_BANDS:
+            for ltv_min, ltv_max in LTV_BANDS:
+                if rng.random() > grid_density:
+                    continue
+                adjustments.append(RateAdjustment(
+                    offering=offering,
+                    adjustment_type=RateAdjustment.ADJUSTMENT_TYPE_FICO_LTV,
+                    row_min=fico_min, row_max=fico_max,
+                    col_min=ltv_min, col_max=ltv_max,
+                    adjustment_points=round(rng.uniform(-0.5, 2.0), 3),
+                ))
+        for adjustment_type, value_key in (
+            (RateAdjustment.ADJUSTMENT_TYPE_PURPOSE, rng.choice(PURPOSES)),
+            (RateAdjustment.ADJUSTMENT_TYPE_OCCUPANCY, rng.choice(OCCUPANCY)),
+            (RateAdjustment.ADJUSTMENT_TYPE_STATE, rng.choice(STATES)),
+        ):
+            adjustments.append(RateAdjustment(
+                offering=offering,
+                adjustment_type=adjustment_type,
+                value_key=value_key,
+                adjustment_points=round(rng.uniform(-0.25, 0.75), 3),
+            ))
+    RateAdjustment.objects.bulk_create(adjustments, batch_size=2000)
+
+    # Legacy catalog used by QualifyView, one program per offering.
+    loan_lenders = LoanLender.objects.bulk_create([
+        LoanLender(company_name=lender.company_name, include_states=lender.include_states)
+        for lender in lender_objs
+    ])
+    loan_lender_by_name = {lender.company_name: lender for lender in loan_lenders}
+    LoanProgram.objects.bulk_create([
+        LoanProgram(
+            name=f"{o.program_type.name} ({o.lender.company_name})",
+            lender=loan_lender_by_name[o.lender.company_name],
+            min_loan_amount=o.min_loan,
+            max_loan_amount=o.max_loan,
+            min_credit=o.min_fico,
+            max_loan_to_value=Decimal(str(o.max_ltv)),
+            potential_rate_min=o.min_rate,
+            potential_rate_max=o.max_rate,
+            property_types=o.program_type.property_types,
+            purpose=o.program_type.purposes,
+            occupancy=o.program_type.occupancy,
+            reserve_requirement=6,
+            max_compensation=2,
+            lender_fee=1000,
+            prepayment_penalty=loan_choices.PPP_NONE,
+            prepayment_cost=loan_choices.PPP_NONE,
+            potential_cost_min=0,
+            potential_cost_max=1,
+            min_dscr=1.0,
+        )
+        for o in offering_objs
+    ], batch_size=1000)
+
+    # bulk_create bypasses the save signals that normally invalidate these.
+    pricing_engine.invalidate()
+    program_eligibility.invalidate()
+    quote_cache.clear()
+    return [o.pk for o in offering_objs], len(adjustments)
+
+
+def random_scenario(rng):
+    loan_amount = rng.choice([150000, 250000, 400000, 650000, 900000, 1500000])
+    return {
+        'property_type': rng.choice(PROPERTY_TYPES),
+        'entity_type': rng.choice(ENTITY_TYPES),
+        'purpose': rng.choice(PURPOSES),
+        'occupancy': rng.choice(OCCUPANCY),
+        'state': rng.choice(STATES),
+        'loan_amount': float(loan_amount),
+        'ltv': round(rng.uniform(50, 90), 2),
+        'estimated_credit_score': rng.randint(620, 800),
+    }
+
+
+def make_operations(rng, offering_ids):
+    factory = APIRequestFactory()
+    qualify_view = QualifyView.as_view()
+
+    def quote():
+        LoanMatchingService.get_quotes_with_adjustments(random_scenario(rng))
+
+    def qualify():
+        scenario = random_scenario(rng)
+        request = factory.post('/api/v1/qualify/', {
+            'loan_amount': int(scenario['loan_amount']),
+            'property_value': int(scenario['loan_amount'] * 100 / scenario['ltv']),
+            'loan_purpose': scenario['purpose'],
+            'property_type': scenario['property_type'],
+            'property_state': scenario['state'],
+            'occupancy': scenario['occupancy'],
+            'credit_score': scenario['estimated_credit_score'],
+        }, format='json')
+        response = qualify_view(request)
+        assert response.status_code == 200, response.data
+
+    def reverse():
+        offering = LenderProgramOffering.objects.select_related(
+            'lender', 'program_type'
+        ).get(pk=rng.choice(offering_ids))
+        list(get_quals_for_loan_program(offering))
+
+    return {'quote': quote, 'qualify': qualify, 'reverse': reverse}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def replay(operations, workload, alloc_samples):
+    """Run the workload; returns per-operation latency, query and allocation samples."""
+    samples = {name: {'latency_ms': [], 'queries': [], 'alloc_kb': []} for name in operations}
+
+    for name in workload:
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            operations[name]()
+            elapsed = time.perf_counter() - started
+        samples[name]['latency_ms'].append(elapsed * 1000)
+        samples[name]['queries'].append(len(ctx.captured_queries))
+
+    # Allocations are measured in a separate pass; tracemalloc distorts timing.
+    tracemalloc.start()
+    for name in workload[:alloc_samples]:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        operations[name]()
+        samples[name]['alloc_kb'].append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+    tracemalloc.stop()
+    return samples
+
+
+def summarize(samples):
+    report = {}
+    for name, data in samples.items():
+        latencies = sorted(data['latency_ms'])
+        if not latencies:
+            continue
+        queries = data['queries']
+        allocs = data['alloc_kb']
+        report[name] = {
+            'requests': len(latencies),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(latencies[-1], 3),
+            'mean_queries': round(sum(queries) / len(queries), 2),
+            'max_queries': max(queries),
+            'mean_peak_alloc_kb': round(sum(allocs) / len(allocs), 1) if allocs else None,
+        }
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\n--- Compared with {previous_path} ({previous.get('commit')}) ---")
+    for name, stats in current['operations'].items():
+        before = previous.get('operations', {}).get(name)
+        if not before:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_queries'):
+            old, new = before[key], stats[key]
+            change = ((new - old) / old * 100) if old else 0.0
+            print(f"{name:8s} {key:13s} {old:10.3f} -> {new:10.3f} ({change:+.1f}%)")
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, weight = part.split('=')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def run_benchmark(args):
+    rng = random.Random(args.seed)
+    print("--- Starting Pricing Benchmark ---")
+
+    with transaction.atomic():
+        started = time.perf_counter()
+        offering_ids, adjustment_count = build_catalog(
+            rng, args.lenders, args.program_types, args.offerings, args.grid_density
+        )
+        print(
+            f"Catalog: {len(offering_ids)} offerings, {adjustment_count} adjustments "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+        operations = make_operations(rng, offering_ids)
+        mix = parse_mix(args.mix)
+        unknown = set(mix) - set(operations)
+        if unknown:
+            raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+        names = list(mix)
+        workload = rng.choices(names, weights=[mix[n] for n in names], k=args.requests)
+
+        # Cold start: first quote compiles the engine, first qualify builds the index.
+        cold = {}
+        for name in ('quote', 'qualify'):
+            if name in mix:
+                started = time.perf_counter()
+                operations[name]()
+                cold[name] = round((time.perf_counter() - started) * 1000, 3)
+
+        for name in workload[:args.warmup]:
+            operations[name]()
+
+        samples = replay(operations, workload, args.alloc_samples)
+        report = {
+            'benchmark': 'pricing',
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'parameters': {
+                'lenders': args.lenders,
+                'program_types': args.program_types,
+                'offerings': len(offering_ids),
+                'adjustments': adjustment_count,
+                'requests': args.requests,
+                'mix': mix,
+                'seed': args.seed,
+            },
+            'cold_start_ms': cold,
+            'operations': summarize(samples),
+            'quote_cache': quote_cache.stats(),
+        }
+        transaction.set_rollback(True)
+
+    # The catalog was rolled back; drop anything compiled from it.
+    pricing_engine.invalidate()
+    program_eligibility.invalidate()
+    quote_cache.clear()
+
+    for name, stats in report['operations'].items():
+        print(
+            f"{name:8s} n={stats['requests']:5d} p50={stats['p50_ms']:8.3f}ms "
+            f"p95={stats['p95_ms']:8.3f}ms p99={stats['p99_ms']:8.3f}ms "
+            f"queries={stats['mean_queries']:.2f} alloc={stats['mean_peak_alloc_kb']}KB"
+        )
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lenders', type=int, default=50)
+    parser.add_argument('--program-types', type=int, default=40)
+    parser.add_argument('--offerings', type=int, default=1000)
+    parser.add_argument('--grid-density', type=float, default=0.8,
+                        help='Fraction of FICO x LTV grid cells with an adjustment')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--alloc-samples', type=int, default=200)
+    parser.add_argument('--mix', default='quote=0.6,qualify=0.3,reverse=0.1',
+                        help='Operation weights, e.g. quote=0.6,qualify=0.3,reverse=0.1')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the JSON report to this path')
+    parser.add_argument('--compare', help='Previous JSON report to compare against')
+    run_benchmark(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()